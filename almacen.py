@@ -0,0 +1,234 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+RUTA_BD = os.environ.get('ELOTTOIA_BD', "elottoia.db")
+LIMITE_CARGA = 10_000
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS generaciones (
+    id INTEGER PRIMARY KEY,
+    usuario TEXT NOT NULL,
+    modo TEXT,
+    filtros TEXT,
+    semilla INTEGER,
+    indice INTEGER,
+    muestreo INTEGER,
+    creado REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_generaciones_usuario ON generaciones (usuario, id);
+
+CREATE TABLE IF NOT EXISTS boletos (
+    id INTEGER PRIMARY KEY,
+    usuario TEXT NOT NULL,
+    codigo INTEGER NOT NULL,
+    generacion INTEGER REFERENCES generaciones (id) ON DELETE SET NULL,
+    creado REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_boletos_usuario ON boletos (usuario, id);
+CREATE INDEX IF NOT EXISTS idx_boletos_codigo ON boletos (usuario, codigo);
+CREATE INDEX IF NOT EXISTS idx_boletos_generacion ON boletos (generacion);
+
+CREATE TABLE IF NOT EXISTS favoritas (
+    usuario TEXT NOT NULL,
+    codigo INTEGER NOT NULL,
+    creado REAL NOT NULL,
+    PRIMARY KEY (usuario, codigo)
+) WITHOUT ROWID;
+"""
+
+
+def conectar(ruta):
+    conexion = sqlite3.connect(ruta, timeout=30)
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.execute("PRAGMA synchronous=NORMAL")
+    conexion.execute("PRAGMA foreign_keys=ON")
+    return conexion
+
+
+class AlmacenBoletos:
+    """Boletos, favoritas y metadatos de generación por usuario en un archivo SQLite.
+
+    Las escrituras se encolan y un único hilo las aplica por lotes, cada lote
+    en una sola transacción, así que guardar un boleto no bloquea la sesión.
+    Las lecturas usan una conexión por hilo y ven las escrituras pendientes
+    porque antes se vacía la cola (`sincronizar`). Los ids de los boletos los
+    asigna el propio almacén al encolarlos, así la sesión puede borrar una fila
+    concreta sin esperar a la escritura (un único almacén escribe en la base).
+    """
+
+    def __init__(self, ruta=RUTA_BD, intervalo=0.2, max_lote=1000):
+        self.ruta = ruta
+        self.intervalo = intervalo
+        self.max_lote = max_lote
+        self._cola = queue.Queue()
+        self._local = threading.local()
+        with conectar(ruta) as conexion:
+            conexion.executescript(ESQUEMA)
+            # Bases creadas antes de guardar la versión del muestreo de cada generación
+            if 'muestreo' not in {fila[1] for fila in conexion.execute("PRAGMA table_info(generaciones)")}:
+                conexion.execute("ALTER TABLE generaciones ADD COLUMN muestreo INTEGER")
+            self._siguiente_id = (conexion.execute("SELECT MAX(id) FROM boletos").fetchone()[0] or 0) + 1
+        self._lock_ids = threading.Lock()
+        self._hilo = threading.Thread(target=self._escritor, name="almacen-boletos", daemon=True)
+        self._hilo.start()
+        atexit.register(self.cerrar)
+
+    # ---------- escritura por lotes ----------
+
+    def _escritor(self):
+        conexion = conectar(self.ruta)
+        activo = True
+        while activo:
+            lote = [self._cola.get()]
+            limite = time.monotonic() + self.intervalo
+            while len(lote) < self.max_lote and lote[-1] is not None:
+                try:
+                    lote.append(self._cola.get(timeout=max(limite - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            try:
+                with conexion:
+                    for operacion in lote:
+                        if operacion is None:
+                            activo = False
+                        else:
+                            operacion(conexion)
+            except Exception:
+                # Cualquier fallo se limita a su lote: el hilo sigue vivo para las escrituras siguientes
+                logger.exception("No se pudo guardar un lote de %s operaciones", len(lote))
+            finally:
+                for _ in lote:
+                    self._cola.task_done()
+        conexion.close()
+
+    def _encolar(self, operacion):
+        self._cola.put(operacion)
+
+    def sincronizar(self):
+        """Espera a que se hayan aplicado todas las escrituras encoladas"""
+        if self._hilo.is_alive():
+            self._cola.join()
+
+    def cerrar(self):
+        if self._hilo.is_alive():
+            self._cola.put(None)
+            self._hilo.join(timeout=10)
+
+    def agregar_boletos(self, usuario, codigos, modo=None, filtros=None, semilla=None, indice=None, muestreo=None):
+        """Guarda boletos (códigos enteros) y, si se indica el modo, la generación que los produjo.
+
+        Devuelve los ids (int64) asignados a los boletos, en el mismo orden.
+        """
+        codigos = [int(c) for c in np.asarray(codigos).ravel()]
+        if not codigos:
+            return np.empty(0, dtype=np.int64)
+        with self._lock_ids:
+            ids = np.arange(self._siguiente_id, self._siguiente_id + len(codigos), dtype=np.int64)
+            self._siguiente_id += len(codigos)
+        creado = time.time()
+        filtros = json.dumps(filtros, ensure_ascii=False, default=str) if filtros is not None else None
+
+        def operacion(conexion):
+            generacion = None
+            if modo is not None:
+                generacion = conexion.execute(
+                    "INSERT INTO generaciones (usuario, modo, filtros, semilla, indice, muestreo, creado) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (usuario, modo, filtros, semilla, indice, muestreo, creado)
+                ).lastrowid
+            conexion.executemany(
+                "INSERT INTO boletos (id, usuario, codigo, generacion, creado) VALUES (?, ?, ?, ?, ?)",
+                [(i, usuario, c, generacion, creado) for i, c in zip(ids.tolist(), codigos)]
+            )
+        self._encolar(operacion)
+        return ids
+
+    def borrar_boletos(self, usuario, ids):
+        """Borra los boletos del usuario con esos ids (los que devolvió agregar_boletos o cargar_boletos)"""
+        filas = [(usuario, int(i)) for i in np.asarray(ids).ravel()]
+        if filas:
+            self._encolar(lambda conexion: conexion.executemany(
+                "DELETE FROM boletos WHERE usuario = ? AND id = ?", filas
+            ))
+
+    def vaciar_boletos(self, usuario):
+        self._encolar(lambda conexion: conexion.execute("DELETE FROM boletos WHERE usuario = ?", (usuario,)))
+
+    def agregar_favorita(self, usuario, codigo):
+        creado = time.time()
+        self._encolar(lambda conexion: conexion.execute(
+            "INSERT OR IGNORE INTO favoritas (usuario, codigo, creado) VALUES (?, ?, ?)",
+            (usuario, int(codigo), creado)
+        ))
+
+    def quitar_favorita(self, usuario, codigo):
+        self._encolar(lambda conexion: conexion.execute(
+            "DELETE FROM favoritas WHERE usuario = ? AND codigo = ?", (usuario, int(codigo))
+        ))
+
+    # ---------- lectura ----------
+
+    def _lectura(self):
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = self._local.conexion = conectar(self.ruta)
+        return conexion
+
+    def cargar_boletos(self, usuario, limite=LIMITE_CARGA):
+        """(ids, códigos) de los últimos `limite` boletos del usuario en orden de guardado (una consulta sobre el índice)"""
+        self.sincronizar()
+        filas = self._lectura().execute(
+            "SELECT id, codigo FROM boletos WHERE usuario = ? ORDER BY id DESC LIMIT ?", (usuario, int(limite))
+        ).fetchall()[::-1]
+        return (np.array([f[0] for f in filas], dtype=np.int64),
+                np.array([f[1] for f in filas], dtype=np.int32))
+
+    def cargar_favoritas(self, usuario):
+        self.sincronizar()
+        filas = self._lectura().execute(
+            "SELECT codigo FROM favoritas WHERE usuario = ? ORDER BY creado", (usuario,)
+        ).fetchall()
+        return [f[0] for f in filas]
+
+    def generaciones(self, usuario, limite=100):
+        """Últimas generaciones del usuario con cuántos boletos conserva cada una"""
+        self.sincronizar()
+        return pd.read_sql_query(
+            "SELECT g.id, g.modo, g.filtros, g.semilla, g.indice, g.muestreo, datetime(g.creado, 'unixepoch') AS creado, "
+            "(SELECT COUNT(*) FROM boletos b WHERE b.generacion = g.id) AS boletos "
+            "FROM generaciones g WHERE g.usuario = ? ORDER BY g.id DESC LIMIT ?",
+            self._lectura(), params=(usuario, int(limite))
+        )
+
+    def generacion(self, usuario, semilla, indice):
+        """Última generación guardada del usuario con ese (semilla, índice), como dict; None si no hay"""
+        self.sincronizar()
+        cursor = self._lectura().execute(
+            "SELECT modo, filtros, muestreo FROM generaciones WHERE usuario = ? AND semilla = ? AND indice = ? "
+            "ORDER BY id DESC LIMIT 1", (usuario, int(semilla), int(indice))
+        )
+        fila = cursor.fetchone()
+        return dict(zip([c[0] for c in cursor.description], fila)) if fila else None
+
+
+_almacen = None
+_lock_almacen = threading.Lock()
+
+
+def obtener_almacen(ruta=RUTA_BD):
+    """Almacén único por proceso (compartido por todas las sesiones)"""
+    global _almacen
+    with _lock_almacen:
+        if _almacen is None:
+            _almacen = AlmacenBoletos(ruta)
+        return _almacen
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+from filtros import evaluar_filtros_lote
+
+MAX_BOLETOS = 1_000_000
+
+_ES_DIGITO = np.zeros(256, dtype=bool)
+_ES_DIGITO[48:58] = True
+_ES_LETRA = np.zeros(256, dtype=bool)
+_ES_LETRA[65:91] = True
+_ES_LETRA[97:123] = True
+
+
+def leer_boletos(datos):
+    """Extrae boletos de un CSV/TXT sin recorrer las líneas en Python.
+
+    Se toman los 7 últimos números de cada línea (5 números + 2 estrellas),
+    así que sirve tanto para '1 - 2 - 3 - 4 - 5 ⭐ 1 - 2' como para CSV con
+    fecha delante. Los números pegados a letras (cabeceras como N1, E2) se
+    ignoran. Devuelve (números, estrellas, líneas descartadas).
+    """
+    if isinstance(datos, str):
+        datos = datos.encode('utf-8')
+    b = np.frombuffer(datos + b'\n', dtype=np.uint8)
+    digito = _ES_DIGITO[b]
+    anterior = np.concatenate([[False], digito[:-1]])
+    siguiente = np.concatenate([digito[1:], [False]])
+    inicios = np.flatnonzero(digito & ~anterior)
+    finales = np.flatnonzero(digito & ~siguiente)
+
+    # Descartar números pegados a letras (cabeceras)
+    letra = _ES_LETRA[b]
+    pegado = letra[np.maximum(inicios - 1, 0)] & (inicios > 0) | letra[np.minimum(finales + 1, len(b) - 1)]
+    inicios, finales = inicios[~pegado], finales[~pegado]
+
+    # Valor de cada número (1 o 2 cifras; el resto se marca inválido)
+    longitud = finales - inicios + 1
+    valores = (b[inicios] - 48).astype(np.int16)
+    dos = longitud == 2
+    valores[dos] = valores[dos] * 10 + (b[finales[dos]] - 48)
+    valores[longitud > 2] = -1
+
+    # Línea de cada número y últimos 7 de cada línea
+    saltos = np.flatnonzero(b == 10)
+    lineas = np.searchsorted(saltos, inicios)
+    por_linea = np.bincount(lineas, minlength=len(saltos))
+    fin_linea = np.cumsum(por_linea)
+    validas_forma = por_linea >= 7
+    indices = fin_linea[validas_forma, None] - 7 + np.arange(7)
+    matriz = valores[indices] if len(indices) else np.empty((0, 7), np.int16)
+
+    nums = np.sort(matriz[:, :5], axis=1)
+    estrellas = np.sort(matriz[:, 5:], axis=1)
+    validas = (
+        (nums[:, 0] >= 1) & (nums[:, 4] <= 50) & (np.diff(nums, axis=1) > 0).all(axis=1)
+        & (estrellas[:, 0] >= 1) & (estrellas[:, 1] <= 12) & (estrellas[:, 0] < estrellas[:, 1])
+    )
+    no_vacias = por_linea > 0
+    descartadas = int(no_vacias.sum() - validas.sum())
+    return nums[validas][:MAX_BOLETOS].astype(np.int8), estrellas[validas][:MAX_BOLETOS].astype(np.int8), descartadas
+
+
+def analizar_lote(nums, estrellas, predictor, filtros):
+    """Tabla con filtros personalizados + análisis predictivo para todos los boletos"""
+    tabla = pd.DataFrame(nums, columns=['N1', 'N2', 'N3', 'N4', 'N5'])
+    tabla['E1'] = estrellas[:, 0]
+    tabla['E2'] = estrellas[:, 1]
+    resultado_filtros = evaluar_filtros_lote(nums, estrellas=estrellas, **filtros)
+    analisis = predictor.analizar_lote(nums, estrellas)
+    return pd.concat([tabla, analisis, resultado_filtros], axis=1)
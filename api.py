@@ -0,0 +1,335 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import numpy as np
+from boletos import formatear_combinacion, mascaras_boletos, parsear_combinacion
+from estrategias import ESTRATEGIAS, buscar_estrategia, obtener_estrategia
+from generador import generar_filtrados
+from metricas import activar_exportacion, obtener_metricas
+from premios import CATEGORIAS, aciertos, categoria, fecha_sorteo, indice_sorteo, premios_historicos
+from vigilante import datos_actuales
+
+logger = logging.getLogger(__name__)
+
+_duracion = obtener_metricas().histograma(
+    'elottoia_api_peticion_segundos', "Duración de las peticiones a la API por ruta y estado HTTP", ('ruta', 'estado'))
+
+HOST = os.environ.get('ELOTTOIA_API_HOST', "127.0.0.1")
+PUERTO = int(os.environ.get('ELOTTOIA_API_PUERTO', "0")) or 8502
+MAX_BOLETOS = 10_000
+MAX_CUERPO = 1024 ** 2
+MAX_BACKTEST = 2_000
+
+
+class ErrorPeticion(ValueError):
+    """Petición mal formada: se responde 400 (o el estado indicado) con el mensaje"""
+
+    def __init__(self, mensaje, estado=400):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+# ============================================
+# 🧾 Validación de parámetros
+# ============================================
+
+def _entero(valor, nombre, minimo=None, maximo=None, defecto=None):
+    if valor is None:
+        return defecto
+    try:
+        valor = int(valor)
+    except (TypeError, ValueError):
+        raise ErrorPeticion(f"'{nombre}' debe ser un entero")
+    if (minimo is not None and valor < minimo) or (maximo is not None and valor > maximo):
+        raise ErrorPeticion(f"'{nombre}' debe estar entre {minimo} y {maximo}")
+    return valor
+
+
+def _estrategia(consulta):
+    """Estrategia de ?modo= con los parámetros que declara tomados de la consulta"""
+    valor = consulta.get('modo') or "aleatorio"
+    nombre = buscar_estrategia(valor)
+    if nombre is None:
+        raise ErrorPeticion(f"Modo desconocido: {valor} ({', '.join(e.clave for e in ESTRATEGIAS.values())})")
+    try:
+        return obtener_estrategia(nombre, **{
+            p.nombre: consulta[p.nombre] for p in ESTRATEGIAS[nombre].parametros if p.nombre in consulta
+        })
+    except ValueError as e:
+        raise ErrorPeticion(str(e))
+
+
+def _rng(semilla):
+    return np.random.default_rng(_entero(semilla, 'semilla', minimo=0))
+
+
+def _boleto(valor):
+    """(números, estrellas) de un boleto en texto '1 - 2 - 3 - 4 - 5 ⭐ 1 - 2' o {numeros, estrellas}"""
+    try:
+        if isinstance(valor, str):
+            nums, estrellas = parsear_combinacion(valor)
+        else:
+            nums, estrellas = sorted(map(int, valor['numeros'])), sorted(map(int, valor['estrellas']))
+    except (KeyError, IndexError, TypeError, ValueError):
+        raise ErrorPeticion(f"Boleto no válido: {valor!r}")
+    if (len(set(nums)) != 5 or len(set(estrellas)) != 2
+            or not all(1 <= n <= 50 for n in nums) or not all(1 <= e <= 12 for e in estrellas)):
+        raise ErrorPeticion(f"Boleto no válido: {valor!r} (5 números del 1 al 50 y 2 estrellas del 1 al 12)")
+    return nums, estrellas
+
+
+def _boletos(cuerpo):
+    """Matrices (n, 5) y (n, 2) de 'boletos' (lista), 'combinacion' o 'numeros'/'estrellas' del cuerpo"""
+    if 'boletos' in cuerpo:
+        lista = cuerpo['boletos']
+        if not isinstance(lista, list) or not 1 <= len(lista) <= MAX_BOLETOS:
+            raise ErrorPeticion(f"'boletos' debe ser una lista de 1 a {MAX_BOLETOS} boletos")
+    elif 'combinacion' in cuerpo:
+        lista = [cuerpo['combinacion']]
+    else:
+        lista = [cuerpo]
+    pares = [_boleto(b) for b in lista]
+    return np.array([p[0] for p in pares]), np.array([p[1] for p in pares])
+
+
+def _respuesta_boletos(nums, estrellas):
+    return {
+        'boletos': [formatear_combinacion(n, e) for n, e in zip(nums.tolist(), estrellas.tolist())],
+        'numeros': nums.tolist(),
+        'estrellas': estrellas.tolist(),
+    }
+
+
+# ============================================
+# 🛣️ Rutas (sin estado: todo sale de la instantánea compartida)
+# ============================================
+
+def salud(datos, consulta, cuerpo):
+    return {'estado': "ok", 'version': datos.version, 'sorteos': len(datos.fechas)}
+
+
+def generar(datos, consulta, cuerpo):
+    """Boletos de una estrategia: ?modo=aleatorio|frecuencia|hibrido|ponderado&n=1&semilla= y sus parámetros"""
+    estrategia = _estrategia(consulta)
+    n = _entero(consulta.get('n'), 'n', 1, MAX_BOLETOS, defecto=1)
+    nums, estrellas = estrategia.generar_lote(n, datos, _rng(consulta.get('semilla')))
+    return {'modo': estrategia.nombre, 'parametros': estrategia.valores, **_respuesta_boletos(nums, estrellas)}
+
+
+def estrategias(datos, consulta, cuerpo):
+    """Estrategias registradas con sus parámetros"""
+    return {'estrategias': [e.describir() for e in ESTRATEGIAS.values()]}
+
+
+def backtest(datos, consulta, cuerpo):
+    """Premios de n boletos de una estrategia en todo el histórico: ?modo=&n=100&semilla="""
+    estrategia = _estrategia(consulta)
+    n = _entero(consulta.get('n'), 'n', 1, MAX_BACKTEST, defecto=100)
+    resultado = estrategia.evaluar(n, datos, _rng(consulta.get('semilla')))
+    return {'modo': estrategia.nombre, 'parametros': estrategia.valores, **resultado}
+
+
+def generar_filtrada(datos, consulta, cuerpo):
+    """Boletos distintos que cumplen {filtros: especificación de filtros.FILTROS, n, semilla}"""
+    especificacion = cuerpo.get('filtros') or {}
+    if not isinstance(especificacion, dict):
+        raise ErrorPeticion("'filtros' debe ser un objeto")
+    n = _entero(cuerpo.get('n'), 'n', 1, MAX_BOLETOS, defecto=1)
+    nums, estrellas = generar_filtrados(especificacion, n, rng=_rng(cuerpo.get('semilla')))
+    return {'solicitados': n, **_respuesta_boletos(nums, estrellas)}
+
+
+def analizar(datos, consulta, cuerpo):
+    """Análisis del predictor de una combinación o, con 'boletos', de un lote"""
+    nums, estrellas = _boletos(cuerpo)
+    if 'boletos' in cuerpo:
+        return {'analisis': datos.predictor.analizar_lote(nums, estrellas).to_dict(orient='records')}
+    resultado = datos.predictor.analizar_combinacion(formatear_combinacion(nums[0].tolist(), estrellas[0].tolist()))
+    return {'combinacion': formatear_combinacion(nums[0].tolist(), estrellas[0].tolist()), **resultado}
+
+
+def premios(datos, consulta, cuerpo):
+    """Aciertos y categoría en el sorteo de 'fecha' (o el último); con 'historico' también en todos los sorteos"""
+    nums, estrellas = _boletos(cuerpo)
+    try:
+        indice = indice_sorteo(datos, cuerpo.get('fecha'))
+    except ValueError as e:
+        raise ErrorPeticion(str(e), 404 if cuerpo.get('fecha') else 400)
+    aciertos_numeros, aciertos_estrellas = aciertos(mascaras_boletos(nums, estrellas), datos.mascaras[indice])
+    respuesta = {
+        'fecha': fecha_sorteo(datos, indice),
+        'resultados': [
+            {'aciertos_numeros': a, 'aciertos_estrellas': b, 'categoria': c}
+            for a, b, c in zip(aciertos_numeros.tolist(), aciertos_estrellas.tolist(),
+                               categoria(aciertos_numeros, aciertos_estrellas).tolist())
+        ],
+    }
+    if cuerpo.get('historico'):
+        conteo = premios_historicos(nums, estrellas, datos)
+        for fila, veces in zip(respuesta['resultados'], conteo):
+            fila['historico'] = {str(c): int(veces[c]) for c in sorted(CATEGORIAS.values()) if veces[c]}
+    return respuesta
+
+
+_cache_estadisticas = {}
+_lock_estadisticas = threading.Lock()
+
+
+def estadisticas(datos, consulta, cuerpo):
+    """Frecuencias, huecos y más frecuentes; el JSON se guarda por versión del histórico"""
+    tipo = consulta.get('tipo', "numeros")
+    if tipo not in ("numeros", "estrellas"):
+        raise ErrorPeticion("'tipo' debe ser numeros o estrellas")
+    clave = (datos.version, tipo)
+    with _lock_estadisticas:
+        obtener_metricas().contar_cache('api_estadisticas', clave in _cache_estadisticas)
+        if clave not in _cache_estadisticas:
+            frecuencias = datos.estadisticas.frecuencias(tipo)
+            huecos = datos.estadisticas.huecos(tipo)
+            if any(version != datos.version for version, _ in _cache_estadisticas):
+                _cache_estadisticas.clear()
+            _cache_estadisticas[clave] = _codificar({
+                'tipo': tipo,
+                'version': datos.version,
+                'sorteos': len(datos.fechas),
+                'frecuencias': {str(k): int(v) for k, v in frecuencias.items()},
+                'huecos': {str(k): int(v) for k, v in huecos.items()},
+                'frecuentes': datos.frecuentes(15 if tipo == "numeros" else 5, tipo),
+            })
+        return _cache_estadisticas[clave]
+
+
+RUTAS = {
+    ('GET', '/salud'): salud,
+    ('GET', '/generar'): generar,
+    ('GET', '/estrategias'): estrategias,
+    ('GET', '/backtest'): backtest,
+    ('POST', '/generar/filtrada'): generar_filtrada,
+    ('POST', '/analizar'): analizar,
+    ('POST', '/premios'): premios,
+    ('GET', '/estadisticas'): estadisticas,
+}
+
+
+def _defecto_json(valor):
+    if isinstance(valor, np.ndarray):
+        return valor.tolist()
+    if isinstance(valor, np.generic):
+        return valor.item()
+    raise TypeError(f"No serializable: {type(valor).__name__}")
+
+
+def _codificar(objeto):
+    return json.dumps(objeto, ensure_ascii=False, separators=(',', ':'), default=_defecto_json).encode('utf-8')
+
+
+# ============================================
+# 🌐 Servidor HTTP
+# ============================================
+
+class ManejadorAPI(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # conexiones persistentes (keep-alive)
+    disable_nagle_algorithm = True  # cabeceras y cuerpo van en escrituras separadas
+    server_version = "ElottoIA-API"
+
+    def do_GET(self):
+        self._atender('GET')
+
+    def do_POST(self):
+        self._atender('POST')
+
+    def _atender(self, metodo):
+        inicio = time.perf_counter()
+        url = urlsplit(self.path)
+        ruta = url.path.rstrip('/') or '/'
+        try:
+            manejador = RUTAS.get((metodo, ruta))
+            if manejador is None:
+                existe = any(r == ruta for _, r in RUTAS)
+                raise ErrorPeticion(f"{metodo} {ruta} no existe", 405 if existe else 404)
+            consulta = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            cuerpo = self._cuerpo() if metodo == 'POST' else {}
+            resultado = manejador(datos_actuales(), consulta, cuerpo)
+            self._enviar(200, resultado if isinstance(resultado, bytes) else _codificar(resultado))
+        except ErrorPeticion as e:
+            self._enviar(e.estado, _codificar({'error': str(e)}))
+        except ValueError as e:  # p. ej. filtros desconocidos o valores fuera de rango
+            self._enviar(400, _codificar({'error': str(e)}))
+        except Exception:
+            logger.exception("Error atendiendo %s %s", metodo, self.path)
+            self._enviar(500, _codificar({'error': "Error interno"}))
+        # Solo las rutas conocidas como etiqueta, para no crear una serie por URL
+        _duracion.observar(time.perf_counter() - inicio, ruta if (metodo, ruta) in RUTAS else "otra", str(self._estado))
+
+    def _cuerpo(self):
+        longitud = _entero(self.headers.get('Content-Length'), 'Content-Length', 0, defecto=0)
+        if longitud > MAX_CUERPO:
+            self.close_connection = True
+            raise ErrorPeticion("Cuerpo demasiado grande", 413)
+        if not longitud:
+            return {}
+        try:
+            cuerpo = json.loads(self.rfile.read(longitud))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise ErrorPeticion("El cuerpo debe ser JSON")
+        if not isinstance(cuerpo, dict):
+            raise ErrorPeticion("El cuerpo debe ser un objeto JSON")
+        return cuerpo
+
+    def _enviar(self, estado, contenido):
+        self._estado = estado
+        self.send_response(estado)
+        self.send_header('Content-Type', "application/json; charset=utf-8")
+        self.send_header('Content-Length', str(len(contenido)))
+        self.end_headers()
+        self.wfile.write(contenido)
+
+    def log_message(self, formato, *args):
+        logger.debug("%s - %s", self.address_string(), formato % args)
+
+
+class ServidorAPI(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def crear_servidor(host=HOST, puerto=PUERTO):
+    return ServidorAPI((host, puerto), ManejadorAPI)
+
+
+_servidor = None
+_lock_servidor = threading.Lock()
+
+
+def obtener_api(host=HOST, puerto=PUERTO):
+    """Servidor de la API único por proceso, atendiendo en un hilo de fondo junto a la app"""
+    global _servidor
+    with _lock_servidor:
+        if _servidor is None:
+            _servidor = crear_servidor(host, puerto)
+            threading.Thread(target=_servidor.serve_forever, name="api-http", daemon=True).start()
+            logger.info("API escuchando en http://%s:%s", *_servidor.server_address[:2])
+        return _servidor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API HTTP de ElottoIA (JSON)")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--puerto", type=int, default=PUERTO)
+    argumentos = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    activar_exportacion()
+    datos_actuales()  # carga el histórico antes de aceptar peticiones
+    servidor = crear_servidor(argumentos.host, argumentos.puerto)
+    logger.info("API escuchando en http://%s:%s", argumentos.host, servidor.server_address[1])
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
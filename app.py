@@ -1,105 +1,56 @@
 import streamlit as st
 import pandas as pd
-import random
-
-def generar_candidata():
-    nums = sorted(random.sample(range(1, 51), 5))
-    stars = sorted(random.sample(range(1, 13), 2))
-    return nums, stars  
+import numpy as np
+from boletos import codigo_a_texto, exportar_codigos, formatear_combinacion, importar_codigos, parsear_combinacion, texto_a_codigo
+from generador import VERSION_MUESTREO, FlujoSesion, generar_filtrados, generar_lote_restringido
+from estrategias import ESTRATEGIAS, obtener_estrategia
+from vigilante import datos_actuales, obtener_vigilante
+from restricciones import RestriccionesHistoricas
+from filtros import TOTAL_ESTRELLAS, TOTAL_NUMEROS, compilar_filtros, especificacion_formulario
+from metricas import Tramos, activar_exportacion, obtener_metricas
+
+# Métricas operativas (el registro es del proceso: en cada ejecución se recuperan las mismas)
+_metricas = obtener_metricas()
+_combinaciones = _metricas.contador('elottoia_combinaciones_total', "Combinaciones generadas por modo", ('modo',))
+_emergencias = _metricas.contador(
+    'elottoia_combinacion_emergencia_total', "Veces que se sirvió la combinación de emergencia 1 - 2 - 3 - 4 - 5 ⭐ 1 - 2",
+    ('modo',))
+_filtradas = _metricas.contador(
+    'elottoia_combinacion_filtrada_total',
+    "Resultado de generar_combinacion_filtrada: filtrada, restringida (suma relajada), sin_filtrar o sin_resultado",
+    ('resultado',))
+_bytes_leidos = _metricas.contador(
+    'elottoia_lectura_bytes_total', "Bytes leídos de los archivos del histórico", ('archivo', 'motivo'))
+_secciones = _metricas.histograma('elottoia_seccion_segundos', "Duración de cada sección de la página", ('seccion',))
+_ejecuciones = _metricas.histograma('elottoia_ejecucion_segundos', "Duración de main() en cada ejecución (rerun)")
+
+def generar_candidata(rng=None):
+    rng = rng if rng is not None else np.random.default_rng()
+    nums = sorted(rng.choice(50, 5, replace=False) + 1)
+    stars = sorted(rng.choice(12, 2, replace=False) + 1)
+    return [int(n) for n in nums], [int(e) for e in stars]
 
 def cumple_filtros_personalizados(nums, tipo_numeros, consecutivos, suma_min, suma_max, termina_en, rango_1_25, rango_26_50):
-    razones = []
-    cumple = True
-    
-    # 1. Filtro pares/impares
-    pares = [n for n in nums if n % 2 == 0]  # Corregido: usar 'nums' en lugar de 'numeros'
-    impares = [n for n in nums if n % 2 != 0]  # Corregido: usar 'nums' en lugar de 'numeros'
-
-    if tipo_numeros == "Pares" and len(pares) < len(impares):
-        cumple = False
-        razones.append("- No tiene mayoría de pares")
-    elif tipo_numeros == "Impares" and len(impares) < len(pares):
-        cumple = False
-        razones.append("- No tiene mayoría de impares")
-    elif tipo_numeros == "Mezcla equilibrada" and abs(len(pares) - len(impares)) > 1:
-        cumple = False
-        razones.append("- No tiene mezcla equilibrada")
-
-    # 2. Filtro consecutivos
-    numeros_ordenados = sorted(nums)  # Corregido: usar 'nums' en lugar de 'numeros'
-    consecutivos_detectados = any(
-        numeros_ordenados[i] + 1 == numeros_ordenados[i + 1]
-        for i in range(len(numeros_ordenados) - 1)
+    filtro = compilar_filtros(especificacion_formulario(
+        tipo_numeros, consecutivos, suma_min, suma_max, termina_en, rango_1_25, rango_26_50
+    ))
+    razones = filtro.razones(nums)
+    num_pares = sum(1 for n in nums if n % 2 == 0)
+    return not razones, razones, sum(nums), num_pares, len(nums) - num_pares
+
+def generar_filtrada(tipo_numeros, consecutivos, suma_min, suma_max, termina_en, rango_1_25, rango_26_50, max_intentos=20000, restricciones=None, extra=None, rng=None):
+    """Genera una combinación que cumpla los filtros evaluando candidatos por lotes vectorizados"""
+    especificacion = especificacion_formulario(
+        tipo_numeros, consecutivos, suma_min, suma_max, termina_en, rango_1_25, rango_26_50
     )
-    if consecutivos == "Evitar consecutivos" and consecutivos_detectados:
-        cumple = False
-        razones.append("- Contiene números consecutivos")
-    elif consecutivos == "Permitir consecutivos" and not consecutivos_detectados:
-        cumple = False
-        razones.append("- No tiene números consecutivos")
-
-    # 3. Filtro suma
-    suma_total = sum(nums)  # Corregido: usar 'nums' en lugar de 'numeros'
-    if suma_min > 0 and suma_total < suma_min:
-        cumple = False
-        razones.append(f"- Suma total menor que {suma_min}")
-    if suma_max < 500 and suma_total > suma_max:
-        cumple = False
-        razones.append(f"- Suma total mayor que {suma_max}")
-
-    # 4. Filtro terminaciones
-    if termina_en:
-        terminaciones = [str(n)[-1] for n in nums]  # Corregido: usar 'nums' en lugar de 'numeros'
-        if not any(t in terminaciones for t in termina_en):
-            cumple = False
-            razones.append("- No tiene ninguna de las terminaciones requeridas")
-
-    # 5. Filtro rango 1-25
-    nums_1_25 = [n for n in nums if 1 <= n <= 25]  # Corregido: usar 'nums' en lugar de 'numeros'
-    if len(nums_1_25) < rango_1_25:
-        cumple = False
-        razones.append(f"- Tiene menos de {rango_1_25} números entre 1 y 25")
-
-    # 6. Filtro rango 26-50
-    nums_26_50 = [n for n in nums if 26 <= n <= 50]  # Corregido: usar 'nums' en lugar de 'numeros'
-    if len(nums_26_50) < rango_26_50:
-        cumple = False
-        razones.append(f"- Tiene menos de {rango_26_50} números entre 26 y 50")
-
-    return cumple, razones, suma_total, len(pares), len(impares)
-
-def generar_filtrada(tipo_numeros, consecutivos, suma_min, suma_max, termina_en, rango_1_25, rango_26_50, max_intentos=1000):
-    for _ in range(max_intentos):
-        nums, stars = generar_candidata()
-        cumple, razones, suma_total, num_pares, num_impares = cumple_filtros_personalizados(
-            nums, tipo_numeros, consecutivos, suma_min, suma_max, termina_en, rango_1_25, rango_26_50
-        )
-        if cumple:
-            return nums, stars, razones, suma_total, num_pares, num_impares
-    return None, None, ["No se encontró combinación válida con los filtros actuales"], 0, 0, 0
-def generar_filtrada(tipo_numeros, consecutivos, suma_min, suma_max, termina_en, rango_1_25, rango_26_50, max_intentos=100):
-    for _ in range(max_intentos):
-        nums, stars = generar_candidata()
-        cumple, razones, suma_total, num_pares, num_impares = cumple_filtros_personalizados(
-            nums, tipo_numeros, consecutivos, suma_min, suma_max, termina_en, rango_1_25, rango_26_50
-        )
-        if cumple:
-            return nums, stars, razones, suma_total, num_pares, num_impares
+    especificacion.update(extra or {})
+    nums, stars = generar_filtrados(especificacion, 1, restricciones, max_intentos, rng)
+    if len(nums):
+        nums, stars = nums[0].tolist(), stars[0].tolist()
+        num_pares = sum(1 for n in nums if n % 2 == 0)
+        return nums, stars, [], sum(nums), num_pares, 5 - num_pares
     return None, None, ["No se encontró una combinación válida con los filtros actuales"], 0, 0, 0
 
-@st.cache_data
-def obtener_numeros_frecuentes(csv_path="Histórico.csv", top_n=15, tipo="numeros"):
-    df = pd.read_csv(csv_path)
-
-    if tipo == "numeros":
-        columnas = ['N1', 'N2', 'N3', 'N4', 'N5']
-    else:  # tipo == "estrellas"
-        columnas = ['E1', 'E2']
-
-    datos = pd.concat([df[col] for col in columnas])
-    frecuentes = datos.value_counts().head(top_n).index.tolist()
-    return frecuentes
-
 st.markdown("""
     <style>
     div.stButton > button {
@@ -134,9 +85,9 @@ st.markdown("<h3 style='color:#FFD700;'>🎯 ¡ElottoIA Premium! Tu aliado intel
 st.markdown("---")
 
 import matplotlib.pyplot as plt
-import random
 import time
 import base64
+import hashlib
 import pandas as pd
 import numpy as np
 from io import BytesIO
@@ -144,7 +95,20 @@ from itertools import combinations
 from collections import Counter, defaultdict
 import re
 import os
-from simulador_predictivo import PredictorCombinaciones  
+import secrets
+from ruedas import generar_rueda
+from analisis_lote import leer_boletos, analizar_lote
+from historico import MESES
+from itemsets import minar_itemsets
+from significancia import ALFA, FAMILIAS, SIMULACIONES, analizar_significancia, inusuales
+from diagnosticos import diagnosticar
+from pares_estrellas import TOTAL_PARES, MotorParesEstrellas, etiqueta_par
+from historial_boletos import HistorialBoletos
+from almacen import obtener_almacen
+from memoria import informe_memoria, obtener_registro, usuarios_soportados
+from tareas import TERMINADA, TareaRechazada, mapa_calor_png, obtener_pool
+from api import obtener_api
+from exportacion import EXTENSIONES, TABLAS_HISTORICO, TIPOS_MIME, exportar, formatos_disponibles, tabla_boletos
 
 # ============================================
 # 🏗️ Configuración de la aplicación
@@ -180,12 +144,8 @@ def set_background(image_file):
     except Exception as e:
         st.error(f"Error cargando fondo: {str(e)}")
 
-# Configuración de fondos
-backgrounds = {
-    "Aleatorio": "fondo_aleatorio.jpg",
-    "Frecuencia": "fondo_frecuencia.jpg",
-    "Híbrido": "fondo_hibrido.jpg"
-}
+# Configuración de fondos (uno por estrategia registrada)
+backgrounds = {nombre: estrategia.fondo for nombre, estrategia in ESTRATEGIAS.items()}
 
 # ============================================
 # 🌍 Sistema de traducciones completo (Actualizado)
@@ -976,6 +936,15 @@ claves_totales = {
             "Português": "_**Híbrido**_: Mix aleatório e de frequência otimizado por IA.",
             "Nederlands": "_**Hybride**_: AI-geoptimaliseerde willekeurige en frequentiemix."
         },
+        "weighted_mode": {
+            "Español": "_**Ponderado**_: Cualquier número puede salir, con más probabilidad cuanto más ha salido.",
+            "English": "_**Weighted**_: Any number can come up, more likely the more often it has been drawn.",
+            "Français": "_**Pondéré**_: Tout numéro peut sortir, d'autant plus probable qu'il est sorti souvent.",
+            "Italiano": "_**Ponderato**_: Qualsiasi numero può uscire, più probabile quanto più spesso è uscito.",
+            "Deutsch": "_**Gewichtet**_: Jede Zahl ist möglich, umso wahrscheinlicher, je öfter sie gezogen wurde.",
+            "Português": "_**Ponderado**_: Qualquer número pode sair, mais provável quanto mais vezes saiu.",
+            "Nederlands": "_**Gewogen**_: Elk nummer kan vallen, waarschijnlijker naarmate het vaker getrokken is."
+        },
         "mode_label": {
             "Español": "Modo de generación",
             "English": "Generation mode",
@@ -1067,98 +1036,231 @@ for idioma in claves_totales["access"].keys():
 # ============================================
 # 🎰 Funciones principales del juego
 # ============================================
-def generar_combinacion(modo):
+def generar_combinacion(modo, rng=None, datos=None):
     """Versión ultra-robusta que siempre retorna un valor"""
+    rng = rng if rng is not None else np.random.default_rng()
     try:
-        # Generación de números principales
-        if modo == "Frecuencia":
-            frecuentes = obtener_numeros_frecuentes("Histórico.csv", top_n=15, tipo="numeros")
-            frecuentes_estrellas = obtener_numeros_frecuentes("Histórico.csv", top_n=5, tipo="estrellas")
-            nums = sorted(random.sample(frecuentes, 5))
-            stars = sorted(random.sample(frecuentes_estrellas, 2))
-        elif modo == "Híbrido":
-            frecuentes = obtener_numeros_frecuentes("Histórico.csv", top_n=15, tipo="numeros")
-            frecuentes_estrellas = obtener_numeros_frecuentes("Histórico.csv", top_n=5, tipo="estrellas")
-
-            nums_base = random.sample(frecuentes, 3)
-            nums_extra = random.sample([n for n in range(1, 51) if n not in nums_base], 2)
-            nums = sorted(nums_base + nums_extra)
-
-            estrella_base = random.sample(frecuentes_estrellas, 1)
-            estrella_extra = random.sample([e for e in range(1, 13) if e not in estrella_base], 1)
-            stars = sorted(estrella_base + estrella_extra)
-
-        else:  # Aleatorio
-            nums = sorted(random.sample(range(1, 51), 5))
-            stars = sorted(random.sample(range(1, 13), 2))
+        # Las tablas de la estrategia (frecuentes, pesos) ya están precalculadas para esta versión del histórico
+        datos = datos if datos is not None else datos_actuales()
+        nums, stars = obtener_estrategia(modo).generar(datos, rng)
 
+        _combinaciones.inc(modo)
         return f"{' - '.join(map(str, nums))} ⭐ {' - '.join(map(str, stars))}"
 
     except Exception as e:
         st.error(f"Error crítico al generar combinación: {str(e)}")
         # Combinación de emergencia garantizada
+        _emergencias.inc(modo)
         return "1 - 2 - 3 - 4 - 5 ⭐ 1 - 2"
-def generar_combinacion_filtrada(modo, suma_min=130, suma_max=135, max_intentos=100):
+def generar_combinacion_filtrada(modo, suma_min=130, suma_max=135, max_intentos=100, restricciones=None, rng=None, datos=None):
+    rng = rng if rng is not None else np.random.default_rng()
     for _ in range(max_intentos):
-        combinacion = generar_combinacion(modo)
+        combinacion = generar_combinacion(modo, rng, datos)
         try:
             numeros = [int(x) for x in combinacion.split("⭐")[0].split("-")]
             suma = sum(numeros)
-            if suma_min <= suma <= suma_max:
+            if suma_min <= suma <= suma_max and (restricciones is None or restricciones.admite(*parsear_combinacion(combinacion))):
+                _filtradas.inc('filtrada')
                 return combinacion
         except:
             continue
+    # Con restricciones históricas, se relaja la suma pero nunca las restricciones
+    if restricciones is not None:
+        nums, stars = generar_lote_restringido(
+            modo, 1, restricciones, datos if datos is not None else datos_actuales(), rng=rng
+        )
+        if len(nums):
+            _filtradas.inc('restringida')
+            return formatear_combinacion(nums[0].tolist(), stars[0].tolist())
+        # Nunca se sirve un boleto que las restricciones excluyen
+        _filtradas.inc('sin_resultado')
+        return None
     # Si tras muchos intentos no encuentra una válida, se devuelve la última sin filtrar
-    return generar_combinacion(modo)
+    _filtradas.inc('sin_filtrar')
+    return generar_combinacion(modo, rng, datos)
 
 # ============================================
 # 📊 Funciones de análisis de datos
 # ============================================
 
-def cargar_datos_frecuencia():
-    """Carga los datos de frecuencia con manejo de errores"""
+@_metricas.cache_contada('tablas_anuales', st.cache_resource(show_spinner=False, max_entries=4))
+def tablas_anuales(_datos, version):
+    """Matrices de apariciones número×año y estrella×año de una versión de los datos (compartidas, de solo lectura)"""
+    tabla = _datos.estadisticas.tabla_anual('numeros').rename_axis(index='Número', columns='Año')
+    tabla_e = _datos.estadisticas.tabla_anual('estrellas').rename_axis(index='Estrella', columns='Año')
+    return tabla, tabla_e
+
+
+def ejecutar_pesado(clave, funcion, *args, mensaje="Calculando...", esperar=True):
+    """Ejecuta un trabajo pesado en el pool de procesos compartido mostrando si está en cola o en ejecución.
+
+    Devuelve el resultado, o None si se rechazó, falló, agotó su tiempo o
+    (con esperar=False) aún no ha terminado.
+    """
+    pool = obtener_pool()
     try:
-        if os.path.exists("Histórico.csv"):
-            return pd.read_csv("Histórico.csv")
-
-        # Datos de ejemplo si no existe el archivo
-        st.warning("Archivo de frecuencia no encontrado. Usando datos de ejemplo.")
-        data = {
-            "año": [2020, 2020, 2021, 2021] * 10,
-            "tipo": ["numero", "estrella"] * 20,
-            "valor": list(range(1, 51)) + list(range(1, 13)) + 
-                     list(range(1, 51)) + list(range(1, 13))
-        }
-        return pd.DataFrame(data)
-    except Exception as e:
-        st.error(f"Error cargando datos: {str(e)}")
-        return pd.DataFrame()
+        tarea = pool.enviar(clave, funcion, *args, sesion=st.session_state.pesados.nombre)
+    except TareaRechazada as e:
+        st.warning(f"⏳ {e}")
+        return None
+    if tarea.activa and not esperar:
+        return None
+    if tarea.activa:
+        estado = st.empty()
+        while not pool.esperar(tarea, 0.5):
+            posicion = pool.posicion(tarea)
+            situacion = f"en cola (puesto {posicion})" if posicion else "ejecutando"
+            estado.info(f"⏳ {mensaje} {situacion} · {time.monotonic() - tarea.creada:.0f} s")
+        estado.empty()
+    if isinstance(tarea.error, ValueError):
+        st.warning(str(tarea.error))
+        return None
+    if tarea.estado != TERMINADA:
+        st.error(f"{mensaje} {tarea.estado}: {tarea.error}")
+        return None
+    return tarea.resultado
+
+
+def significancia_historico(datos, esperar=True):
+    """Contrastes de significancia del histórico; el resultado se guarda en el pool por versión de los datos"""
+    return ejecutar_pesado(('significancia', datos.version), analizar_significancia,
+                           datos.numeros, datos.estrellas, datos.fechas, SIMULACIONES, ALFA, 0, 1,
+                           mensaje="Simulando históricos aleatorios:", esperar=esperar)
+
+
+@_metricas.cache_contada('diagnosticos_historico', st.cache_resource(show_spinner=False, max_entries=2))
+def diagnosticos_historico(_datos, version):
+    """Contrastes de aleatoriedad del histórico (vectorizados, < 1 s), cacheados por versión de los datos"""
+    return diagnosticar(_datos.numeros, _datos.estrellas, _datos.fechas)
+
+
+@_metricas.cache_contada('motor_pares_estrellas', st.cache_resource(show_spinner=False, max_entries=4))
+def motor_pares_estrellas(_datos, version):
+    """Motor de pares de estrellas de una versión de los datos (de solo lectura, compartido)"""
+    return MotorParesEstrellas(_datos.fechas, _datos.numeros, _datos.estrellas)
+
+
+@_metricas.cache_contada('figura_comparativa', st.cache_data(show_spinner=False, max_entries=16))
+def figura_comparativa(_datos, version, titulo, visibles=(7, 14)):
+    """Gráfica con la evolución anual de los 50 números; las no seleccionadas quedan ocultas en la leyenda"""
+    import plotly.graph_objects as go
+    tabla, _ = tablas_anuales(_datos, version)
+    fig = go.Figure()
+    anios = tabla.columns.tolist()
+    for numero, fila in zip(tabla.index, tabla.to_numpy()):
+        fig.add_trace(go.Scatter(
+            x=anios, y=fila, mode='lines+markers', name=str(numero),
+            visible=True if numero in visibles else 'legendonly'
+        ))
+    fig.update_layout(title=titulo, hovermode='x unified', xaxis_title='Año', yaxis_title='Frecuencia',
+                      legend_title_text='Número')
+    return fig
+
+
+@_metricas.cache_contada('figura_transiciones', st.cache_data(show_spinner=False, max_entries=2))
+def figura_transiciones(_datos, version):
+    """Mapa de calor de los residuos de la matriz de transición entre sorteos consecutivos"""
+    import plotly.graph_objects as go
+    residuos = diagnosticos_historico(_datos, version)['residuos_transicion']
+    fig = go.Figure(go.Heatmap(z=residuos.to_numpy(), x=residuos.columns, y=residuos.index,
+                               colorscale='RdBu', reversescale=True, zmid=0))
+    fig.update_layout(height=600, xaxis_title='Número siguiente', yaxis_title='Número', yaxis_autorange='reversed')
+    return fig
+
+
+PATRON_USUARIO = r"[A-Za-z0-9_-]{8,64}"
+
+
+def usuario_actual(usuario=None):
+    """Identificador del usuario en la URL (?usuario=...); si no hay uno válido se crea"""
+    if hasattr(st, 'query_params'):
+        usuario = usuario or st.query_params.get('usuario')
+    else:
+        usuario = usuario or st.experimental_get_query_params().get('usuario', [None])[0]
+    if not usuario or not re.fullmatch(PATRON_USUARIO, usuario):
+        usuario = secrets.token_urlsafe(12)
+    if hasattr(st, 'query_params'):
+        st.query_params['usuario'] = usuario
+    else:
+        st.experimental_set_query_params(usuario=usuario)
+    return usuario
+
+
+def borrar_seleccion_historial(clave_editor, posiciones):
+    """Borra las filas marcadas en la página del historial (se ejecuta antes de volver a dibujar)"""
+    edicion = st.session_state.get(clave_editor) or {}
+    filas = [int(fila) for fila, cambios in edicion.get('edited_rows', {}).items() if cambios.get('Borrar')]
+    st.session_state.historial.borrar(np.asarray(posiciones)[filas])
+
+
+def preparar_csv_historial(pesados, historial):
+    """Genera el CSV del historial solo cuando se pide (queda guardado hasta el próximo cambio)"""
+    pesados['historial_csv'] = (historial.version, b"".join(historial.csv_por_bloques()))
+
+
+def alternar_favorita(almacen, codigo):
+    """Añade o quita la favorita según la casilla del boleto mostrado"""
+    if st.session_state[f'chk_favorito_{codigo}']:
+        st.session_state.favoritas.add(codigo)
+        almacen.agregar_favorita(st.session_state.usuario, codigo)
+    else:
+        st.session_state.favoritas.discard(codigo)
+        almacen.quitar_favorita(st.session_state.usuario, codigo)
+
+
+def quitar_favoritas_seleccionadas(almacen):
+    """Quita de la sesión y del almacén las favoritas marcadas (antes de volver a dibujar)"""
+    for codigo in st.session_state.get('quitar_favoritas') or []:
+        st.session_state.favoritas.discard(codigo)
+        st.session_state.pop(f'chk_favorito_{codigo}', None)
+        almacen.quitar_favorita(st.session_state.usuario, codigo)
+    st.session_state.quitar_favoritas = []
+
+
+@_metricas.cache_contada('exportar_tabla_historico', st.cache_resource(show_spinner=False, max_entries=32))
+def exportar_tabla_historico(_datos, version, tabla, formato):
+    """Bytes de una tabla del histórico; se cachea por versión de los datos"""
+    return exportar(TABLAS_HISTORICO[tabla](_datos), formato)
+
 
 # ============================================
 # 🖥️ Interfaz de usuario principal (Actualizada)
 # ============================================
 
 def main():
+    tramos = Tramos(_secciones)
     # Configuración inicial
+    # historial y favoritas guardan códigos enteros de boleto (boletos.codificar)
+    if 'flujo' not in st.session_state:
+        st.session_state.flujo = FlujoSesion()
+    # Una sola instantánea del histórico por ejecución (se recarga sola en segundo plano)
+    datos = datos_actuales()
+    # API HTTP para integraciones, en el mismo proceso (comparte histórico y cachés)
+    if os.environ.get('ELOTTOIA_API_PUERTO'):
+        obtener_api()
+    # Endpoint /metrics y volcado a archivo, si ELOTTOIA_METRICAS_PUERTO / ELOTTOIA_METRICAS_ARCHIVO están definidas
+    activar_exportacion()
+    # Boletos y favoritas persisten en SQLite por usuario (identificado en la URL)
+    almacen = obtener_almacen()
+    if 'usuario' not in st.session_state:
+        st.session_state.usuario = usuario_actual()
     if 'historial' not in st.session_state:
-        st.session_state.historial = []
+        st.session_state.historial = HistorialBoletos.desde_almacen(almacen, st.session_state.usuario)
     if 'favoritas' not in st.session_state:
-        st.session_state.favoritas = []
+        st.session_state.favoritas = set(almacen.cargar_favoritas(st.session_state.usuario))
     if 'combinacion_generada' not in st.session_state:
         st.session_state.combinacion_generada = False
     if 'ultima_combinacion' not in st.session_state:
         st.session_state.ultima_combinacion = ''
-    if 'historial' not in st.session_state:
-        st.session_state.historial = []
     if 'combinacion_filtrada_actual' not in st.session_state:
         st.session_state.combinacion_filtrada_actual = None
-    if 'favoritas' not in st.session_state:
-        st.session_state.favoritas = []
-    if 'combinacion_generada' not in st.session_state:
-        st.session_state.combinacion_generada = False
-    if 'ultima_combinacion' not in st.session_state:
-        st.session_state.ultima_combinacion = ''
+    # Resultados grandes de la sesión: el registro del proceso los descarta si la sesión queda inactiva
+    if 'pesados' not in st.session_state:
+        st.session_state.pesados = obtener_registro().nueva()
+    pesados = st.session_state.pesados
+    pesados.tocar()
     
+    tramos.marcar('inicio')
     # Configuración de la barra lateral
     lang = st.sidebar.selectbox(
         "Idioma / Language", 
@@ -1217,32 +1319,16 @@ def main():
     """, unsafe_allow_html=True)
     st.sidebar.markdown(f"**{sidebar_text['mode_header']}**")
 
-    # Botón Aleatorio
-    col_r1, col_r2 = st.sidebar.columns([1, 2])
-    with col_r1:
-        st.image('aleatoriobarra.png', width=60)
-    with col_r2:
-        if st.button('Aleatorio', key='btn_aleatorio'):
-            st.session_state['modo'] = 'Aleatorio'
-    st.sidebar.markdown(sidebar_text['random_mode'])
-
-    # Botón Frecuencia
-    col_f1, col_f2 = st.sidebar.columns([1, 2])
-    with col_f1:
-        st.image('frecuenciabarra.png', width=60)
-    with col_f2:
-        if st.button('Frecuencia', key='btn_frecuencia'):
-            st.session_state['modo'] = 'Frecuencia'
-    st.sidebar.markdown(sidebar_text['frequency_mode'])
-
-    # Botón Híbrido
-    col_h1, col_h2 = st.sidebar.columns([1, 2])
-    with col_h1:
-        st.image('hibridobarra.png', width=60)
-    with col_h2:
-        if st.button('Híbrido', key='btn_hibrido'):
-            st.session_state['modo'] = 'Híbrido'
-    st.sidebar.markdown(sidebar_text['hybrid_mode'])
+    # Un botón por estrategia registrada
+    for nombre, estrategia in ESTRATEGIAS.items():
+        col_img, col_boton = st.sidebar.columns([1, 2])
+        if estrategia.imagen:
+            with col_img:
+                st.image(estrategia.imagen, width=60)
+        with col_boton:
+            if st.button(nombre, key=f'btn_{estrategia.clave}'):
+                st.session_state['modo'] = nombre
+        st.sidebar.markdown(sidebar_text.get(estrategia.texto_barra, f"_**{nombre}**_: {estrategia.descripcion}."))
 
     # Establecer modo por defecto si no está definido
     if 'modo' not in st.session_state:
@@ -1252,19 +1338,144 @@ def main():
 
     set_background(backgrounds.get(mode, backgrounds['Aleatorio']))
 
+    # Restricciones frente al histórico y a la sesión
+    with st.sidebar.expander("🕰️ Restricciones históricas"):
+        excluir_ganadoras = st.checkbox("Excluir combinaciones ganadoras pasadas", key='excluir_ganadoras')
+        max_coincidencias = st.slider("Máximo de números en común con cualquier sorteo (5 = sin límite)", 3, 5, 5, key='max_coincidencias')
+        excluir_sesion = st.checkbox("Excluir combinaciones del historial y favoritas", key='excluir_sesion')
+    restricciones = None
+    if excluir_ganadoras or max_coincidencias < 5 or excluir_sesion:
+        restricciones = RestriccionesHistoricas(
+            datos.mascaras,
+            max_coincidencias=max_coincidencias,
+            excluir_ganadoras=excluir_ganadoras,
+            excluidas=[*st.session_state.historial.codigos, *st.session_state.favoritas] if excluir_sesion else ()
+        )
+
+    # Semilla de la sesión: cada boleto se reproduce a partir de (semilla, índice)
+    with st.sidebar.expander("🎲 Semilla de la sesión"):
+        flujo = st.session_state.flujo
+        st.caption(f"Semilla: {flujo.semilla} · Boletos generados: {flujo.contador}")
+        nueva_semilla = st.text_input("Reutilizar una semilla", key='nueva_semilla')
+        if st.button("🔁 Aplicar semilla", key='btn_aplicar_semilla') and nueva_semilla.strip().isdigit():
+            st.session_state.flujo = FlujoSesion(int(nueva_semilla))
+            st.success("Semilla aplicada: la secuencia de boletos se repetirá.")
+        # Reproducir un boleto del botón principal a partir de (semilla, índice)
+        col_semilla, col_indice = st.columns(2)
+        semilla_reproducir = col_semilla.text_input("Semilla", value=str(flujo.semilla), key='semilla_reproducir')
+        indice_reproducir = col_indice.number_input("Índice", min_value=0, value=0, step=1, key='indice_reproducir')
+        if st.button("🔎 Reproducir boleto", key='btn_reproducir') and semilla_reproducir.strip().isdigit():
+            semilla_r, indice_r = int(semilla_reproducir), int(indice_reproducir)
+            guardada = almacen.generacion(st.session_state.usuario, semilla_r, indice_r)
+            modo_r = guardada['modo'] if guardada else mode
+            if modo_r not in ESTRATEGIAS:
+                st.warning(f"Ese índice es de una generación '{modo_r}': solo se reproducen los boletos del botón principal.")
+            else:
+                if guardada and guardada['muestreo'] != VERSION_MUESTREO:
+                    st.warning("Ese boleto se generó con otra versión del muestreo: el resultado no coincidirá.")
+                boleto = generar_combinacion_filtrada(
+                    modo_r, restricciones=restricciones, rng=FlujoSesion(semilla_r).rng(indice_r), datos=datos
+                )
+                st.code(boleto or "—")
+                st.caption(f"Modo {modo_r}, con las restricciones históricas actuales.")
+        st.markdown("📤 Historial compartible")
+        st.code(exportar_codigos(st.session_state.historial.codigos) or "—")
+        historial_importado = st.text_input("📥 Importar historial", key='historial_importado')
+        if st.button("📥 Importar", key='btn_importar_historial') and historial_importado.strip():
+            try:
+                st.session_state.historial.extender(importar_codigos(historial_importado), modo='importado')
+            except ValueError:
+                st.warning("Texto de historial no válido.")
+
+    # Usuario del almacén persistente: el mismo enlace recupera boletos y favoritas en otra visita
+    with st.sidebar.expander("👤 Mis boletos guardados"):
+        st.caption(f"Usuario: {st.session_state.usuario} · {len(st.session_state.historial):,} boletos · "
+                   f"{len(st.session_state.favoritas):,} favoritas".replace(",", "."))
+        st.caption("Guarda el enlace de esta página (incluye ?usuario=...) para recuperarlos.")
+        otro_usuario = st.text_input("🔑 Abrir otro usuario", key='otro_usuario')
+        if st.button("📂 Cargar", key='btn_cargar_usuario') and re.fullmatch(PATRON_USUARIO, otro_usuario.strip()):
+            st.session_state.usuario = usuario_actual(otro_usuario.strip())
+            st.session_state.historial = HistorialBoletos.desde_almacen(almacen, st.session_state.usuario)
+            st.session_state.favoritas = set(almacen.cargar_favoritas(st.session_state.usuario))
+            st.success("Boletos y favoritas cargados.")
+        if st.session_state.favoritas:
+            st.multiselect("⭐ Favoritas", sorted(st.session_state.favoritas), format_func=codigo_a_texto,
+                           key='quitar_favoritas')
+            st.button("🗑️ Quitar de favoritas", key='btn_quitar_favoritas',
+                      on_click=quitar_favoritas_seleccionadas, args=(almacen,))
+        # Cada generación guardada: modo, filtros, semilla e índice del flujo, fecha y boletos que conserva
+        if st.checkbox("🕘 Ver generaciones recientes", key='ver_generaciones'):
+            st.dataframe(almacen.generaciones(st.session_state.usuario), hide_index=True)
+
+    # Memoria del proceso y de las sesiones, para dimensionar el dyno
+    with st.sidebar.expander("🧠 Memoria"):
+        if st.checkbox("Calcular informe de memoria", key='ver_informe_memoria'):
+            registro = obtener_registro()
+            informe = informe_memoria(
+                {'datos': datos, 'tablas anuales': tablas_anuales(datos, datos.version),
+                 'diagnósticos': diagnosticos_historico(datos, datos.version),
+                 'pares de estrellas': motor_pares_estrellas(datos, datos.version)},
+                st.session_state, registro
+            )
+            col_proc, col_comp = st.columns(2)
+            col_proc.metric("Proceso (MB)", informe['proceso_mb'], help=f"Pico: {informe['pico_mb']} MB")
+            col_comp.metric("Compartido (MB)", informe['compartido_mb'])
+            col_ses, col_num = st.columns(2)
+            col_ses.metric("Esta sesión (MB)", informe['sesion_mb'])
+            col_num.metric("Sesiones", informe['sesiones'])
+            st.caption(f"Objetos pesados de las sesiones: {informe['pesados_mb']} de {informe['presupuesto_mb']} MB "
+                       "(se descartan primero los de las sesiones inactivas).")
+            memoria_dyno = st.number_input("Memoria del dyno (MB)", 128, 16384, 512, step=128, key='memoria_dyno')
+            st.caption(f"≈ {usuarios_soportados(informe, memoria_dyno):,} sesiones como esta caben en "
+                       f"{memoria_dyno:,} MB.".replace(",", "."))
+            st.dataframe(registro.informe(), use_container_width=True, hide_index=True)
+            st.dataframe(pd.Series(informe['sesion'], name='MB').head(10), use_container_width=True)
+
+    # Estado del pool compartido de trabajos pesados
+    with st.sidebar.expander("⚙️ Análisis en segundo plano"):
+        resumen_pool = obtener_pool().resumen()
+        col_ejec, col_cola = st.columns(2)
+        col_ejec.metric("Ejecutando", f"{resumen_pool['ejecutando']} / {resumen_pool['procesos']}")
+        col_cola.metric("En cola", resumen_pool['en_cola'])
+        st.caption(f"Resultados guardados: {resumen_pool['resultados_guardados']} · reutilizados: "
+                   f"{resumen_pool['aciertos_cache']} · rechazados: {resumen_pool['rechazadas']} · "
+                   f"tiempo agotado: {resumen_pool['agotadas']}")
+
+    # Alta manual del último sorteo (solo con la clave de administración configurada)
+    with st.sidebar.expander(text['manual_title']):
+        clave_admin = os.environ.get('ELOTTOIA_ADMIN_CLAVE')
+        if not clave_admin:
+            st.caption("Define la variable de entorno ELOTTOIA_ADMIN_CLAVE para habilitar el alta de sorteos.")
+        else:
+            with st.form('form_alta_sorteo', clear_on_submit=True):
+                fecha_sorteo = st.date_input("Fecha del sorteo", key='fecha_sorteo')
+                nums_sorteo = st.multiselect("Números", list(range(1, 51)), max_selections=5, key='nums_sorteo')
+                estrellas_sorteo = st.multiselect("Estrellas", list(range(1, 13)), max_selections=2, key='estrellas_sorteo')
+                clave = st.text_input("Clave de administración", type='password', key='clave_alta_sorteo')
+                enviado = st.form_submit_button(text['manual_entry'])
+            if enviado:
+                if clave != clave_admin:
+                    st.error("Clave incorrecta.")
+                else:
+                    try:
+                        datos = obtener_vigilante().agregar_sorteo(fecha_sorteo, nums_sorteo, estrellas_sorteo)
+                        st.success(f"Sorteo del {fecha_sorteo:%d/%m/%Y} registrado (histórico v{datos.version}).")
+                    except ValueError as e:
+                        st.warning(str(e))
+
     # Sección del archivo neural
     with st.sidebar.expander(sidebar_text['neural_title']):
         try:
             ruta_archivo = 'euromillones_convertido.txt'
-            if not os.path.exists(ruta_archivo):
+            if datos.huellas.get(ruta_archivo) is None:
                 st.error(sidebar_text['neural_error'].format(ruta_archivo))
             else:
-                with open(ruta_archivo, 'r', encoding='utf-8') as archivo:
-                    datos = [linea.strip() for linea in archivo if ';' in linea and len(linea.strip().split(';')) >= 2]
+                lineas_neural = [linea.strip() for linea in datos.lineas_convertido if ';' in linea and len(linea.strip().split(';')) >= 2]
 
-                st.success(sidebar_text['neural_loaded'].format(len(datos)))
+                st.success(sidebar_text['neural_loaded'].format(len(lineas_neural)))
+                st.caption(f"🗂️ Histórico v{datos.version} · {len(datos.numeros)} sorteos")
 
-                anios = sorted(set(linea.split(';')[0] for linea in datos if linea.split(';')[0].isdigit()))
+                anios = sorted(set(linea.split(';')[0] for linea in lineas_neural if linea.split(';')[0].isdigit()))
                 if not anios:
                     st.warning(sidebar_text['neural_warning'])
                 else:
@@ -1273,50 +1484,61 @@ def main():
                         anios,
                         key='anio_neural_sidebar'
                     )
-                    coincidencias = [linea for linea in datos if linea.startswith(anio_seleccionado)]
+                    coincidencias = [linea for linea in lineas_neural if linea.startswith(anio_seleccionado)]
                     st.write(sidebar_text['neural_combinations'].format(len(coincidencias), anio_seleccionado))
                     st.text("\n".join(coincidencias[:20]))
 
         except Exception as e:
             st.error(f"Error al procesar el archivo neural: {str(e)}")
 
+    tramos.marcar('barra_lateral')
     # Contenido principal
     st.markdown("""<div style='position: absolute; top: 10px; right: 20px; background-color: #ff0040;
     color: white; padding: 8px 14px; border-radius: 8px; font-family: monospace; font-size: 16px; box-shadow: 2px 2px 10px #000; z-index:999;'>
     🟢 ELOTTOIA <br><span style='font-size: 12px;'>Terminal IA Active</span></div>""", unsafe_allow_html=True)
 
 
-    # Mostrar mensajes de inicio
+    # Mostrar mensajes de inicio (la pausa solo en la primera ejecución de la sesión)
     for msg, delay in zip(['access', 'init', 'success'], [0.5, 1, 1.2]):
         st.markdown(f"##### {text.get(msg, msg)}")
-        time.sleep(delay)
+        if 'inicio_mostrado' not in st.session_state:
+            time.sleep(delay)
+    st.session_state.inicio_mostrado = True
+    tramos.marcar('mensajes_inicio')
 
     st.markdown('---')
     st.markdown(f"#### {text['combo']}")
 
     # Generar combinación
     if st.button(text['generate'], key='btn_generar_unico_123'):
-        combinacion = generar_combinacion_filtrada(mode)
-        st.session_state.ultima_combinacion = combinacion
-        st.session_state.historial.append(combinacion)
-        st.session_state.combinacion_generada = True
+        indice, rng = st.session_state.flujo.siguiente()
+        combinacion = generar_combinacion_filtrada(mode, restricciones=restricciones, rng=rng, datos=datos)
+        if combinacion is None:
+            st.warning("Ninguna combinación cumple las restricciones históricas actuales: prueba a relajarlas.")
+        else:
+            st.session_state.ultima_combinacion = combinacion
+            st.session_state.historial.agregar(
+                texto_a_codigo(combinacion), modo=mode, semilla=st.session_state.flujo.semilla, indice=indice,
+                muestreo=VERSION_MUESTREO,
+                filtros={'excluir_ganadoras': excluir_ganadoras, 'max_coincidencias': max_coincidencias,
+                         'excluir_sesion': excluir_sesion}
+            )
+            st.session_state.combinacion_generada = True
 
     # Mostrar combinación generada
     if st.session_state.combinacion_generada:
         combinacion = st.session_state.ultima_combinacion
         st.markdown(f'<p style="color:white; font-size:24px;"><strong>{combinacion}</strong></p>', unsafe_allow_html=True)
 
-        # Opción para marcar como favorita
-        if st.checkbox('⭐ ' + text['favorites'], key='chk_favorito_456'):
-            if combinacion not in st.session_state.favoritas:
-                st.session_state.favoritas.append(combinacion)
+        # Opción para marcar como favorita (la casilla refleja si ya lo es; al desmarcarla se quita)
+        codigo = texto_a_codigo(combinacion)
+        st.checkbox('⭐ ' + text['favorites'], value=codigo in st.session_state.favoritas,
+                    key=f'chk_favorito_{codigo}', on_change=alternar_favorita, args=(almacen, codigo))
 
         # Análisis predictivo
         try:
             with st.spinner(text.get("analizando", "Analizando combinación...")):
-                with open("todos los años de euromillones desglosados por mes.txt", "r", encoding="utf-8") as f:
-                    lineas = f.readlines()
-                predictor = PredictorCombinaciones(lineas)
+                predictor = datos.predictor
                 analisis = predictor.analizar_combinacion(combinacion)
 
                 with st.expander(text["advanced_analysis_title"], expanded=True):
@@ -1334,38 +1556,73 @@ def main():
                     col2.progress(analisis["similitud_parcial"]/100)
                     st.markdown(text["predictive_note"], unsafe_allow_html=True)
 
-                    st.markdown(f"**{text['common_numbers']}**")
-                    st.success(", ".join(map(str, analisis["detalle_numeros"]["comunes"])))
-
-                    st.markdown(f"**{text['rare_numbers']}**")
-                    st.error(", ".join(map(str, analisis["detalle_numeros"]["raros"])))
-
-                    if analisis["pares_riesgo"]:
-                        st.markdown(f"**{text['common_pairs_warning']}**")
-                        st.write(analisis["pares_riesgo"])
+                    # Solo se señalan desviaciones que superan lo esperable por azar (simulación + q-valores)
+                    significancia = significancia_historico(datos, esperar=False)
+                    if significancia is None:
+                        st.caption("🧪 Calculando en segundo plano qué desviaciones son significativas...")
+                    else:
+                        nums_combinacion, _ = parsear_combinacion(combinacion)
+                        frecuencias_sig = significancia['frecuencia_numeros'].set_index('elemento')
+                        inusuales_nums = frecuencias_sig.loc[[str(n) for n in nums_combinacion]]
+                        inusuales_nums = inusuales_nums[inusuales_nums['significativo']]
+                        comunes = inusuales_nums.index[inusuales_nums['direccion'] == 'alto'].tolist()
+                        raros = inusuales_nums.index[inusuales_nums['direccion'] == 'bajo'].tolist()
+                        if comunes:
+                            st.markdown(f"**{text['common_numbers']}**")
+                            st.success(", ".join(comunes))
+                        if raros:
+                            st.markdown(f"**{text['rare_numbers']}**")
+                            st.error(", ".join(raros))
+
+                        pares_sig = significancia['pares'].set_index('elemento')
+                        pares_combinacion = [f"{a}-{b}" for a, b in combinations(nums_combinacion, 2)]
+                        pares_riesgo = pares_sig.loc[pares_combinacion]
+                        pares_riesgo = pares_riesgo[pares_riesgo['significativo']]
+                        if len(pares_riesgo):
+                            st.markdown(f"**{text['common_pairs_warning']}**")
+                            st.write(pares_riesgo['observado'].to_dict())
+                        if not comunes and not raros and not len(pares_riesgo):
+                            st.caption("🧪 Ningún número ni par de esta combinación se desvía del azar de forma significativa "
+                                       f"(simulación de {SIMULACIONES:,} históricos".replace(",", ".") + ", corrección de Benjamini-Hochberg).")
         except Exception as e:
             st.error(f"Error en análisis predictivo: {str(e)}")
 
     st.markdown("---")
     st.subheader("📜 Historial de combinaciones guardadas")
 
-    if st.session_state.historial:  # Ahora seguro que existe
-        for idx, comb in enumerate(st.session_state.historial):
-            col1, col2 = st.columns([4, 1])
-            with col1:
-                st.markdown(f"🔢 {comb}")
-            with col2:
-                if st.button("❌ Borrar", key=f"borrar_{idx}"):
-                    st.session_state.historial.pop(idx)
-                    st.experimental_rerun()
-    
-    # Botón para borrar todo (FUERA del bucle)
-        if st.button("🗑️ Borrar todo el historial", key="borrar_historial_total"):
-            st.session_state.historial.clear()
-            st.success("Historial borrado correctamente.")
-            st.experimental_rerun()
+    historial = st.session_state.historial
+    if len(historial):
+        # Solo se dibuja la página visible: el coste no depende del tamaño del historial
+        col_busqueda, col_tamano = st.columns([3, 1])
+        busqueda = col_busqueda.text_input("🔍 Buscar (números y, tras ⭐, estrellas)", key='buscar_historial')
+        tamano_pagina = col_tamano.selectbox("Por página", [10, 25, 50, 100], index=1, key='tamano_pagina_historial')
+        posiciones = historial.buscar(busqueda)
+        paginas = max(-(-len(posiciones) // tamano_pagina), 1)
+        numero_pagina = st.number_input(f"Página (de {paginas})", 1, paginas, 1, key='pagina_historial')
+        tabla_pagina, seleccion = historial.pagina(posiciones, numero_pagina, tamano_pagina)
+        tabla_pagina.insert(0, 'Borrar', False)
+        clave_editor = f"editor_historial_{historial.version}_{numero_pagina}_{tamano_pagina}_{busqueda}"
+        st.data_editor(tabla_pagina, hide_index=True, use_container_width=True, disabled=['Nº', 'Combinación'],
+                       key=clave_editor)
+        st.caption(f"{len(posiciones):,} de {len(historial):,} combinaciones".replace(",", "."))
+
+        col_borrar, col_duplicados, col_todo = st.columns(3)
+        col_borrar.button("❌ Borrar seleccionadas", key='borrar_seleccion_historial',
+                          on_click=borrar_seleccion_historial, args=(clave_editor, seleccion))
+        col_duplicados.button("🧹 Quitar duplicadas", key='deduplicar_historial', on_click=historial.deduplicar)
+        col_todo.button("🗑️ Borrar todo el historial", key="borrar_historial_total", on_click=historial.vaciar)
+
+        # El CSV se genera al pedirlo, no en cada clic: solo se descarga si está al día con el historial
+        csv_historial = pesados.get('historial_csv', (None, None))
+        if csv_historial[0] == historial.version:
+            st.download_button(f"⬇️ {text['export']}", csv_historial[1],
+                               file_name="elottoia_historial.csv", mime="text/csv", key='btn_exportar_historial_csv')
+        else:
+            st.button(f"📄 {text['export']}", key='btn_preparar_historial_csv',
+                      on_click=preparar_csv_historial, args=(pesados, historial))
     else:
         st.info("No hay combinaciones en el historial aún.")
+    tramos.marcar('generacion')
 # ==========================================
 # 🎯 Después de generar la combinación
 # Mostrar la opción de aplicar filtros personalizados
@@ -1375,7 +1632,8 @@ def main():
     st.subheader("🎯 Aplicar Filtros Personalizados")
 
     with st.expander("🎛️ Filtros avanzados para tu combinación", expanded=False):
-      with st.form(key="formulario_filtros_avanzados_v2"):
+      # Sin st.form: cada cambio recalcula al momento cuántas combinaciones cumplen los filtros
+      with st.container():
         tipo_numeros = st.radio("🧮 Tipo de Números:", ["Pares", "Impares", "Mezcla equilibrada"])
         consecutivos = st.radio("🔗 Secuencias Consecutivas:", ["Permitir consecutivos", "Evitar consecutivos"])
         suma_min = st.number_input("➗ Suma mínima de números", min_value=0, max_value=500, value=0, step=1)
@@ -1383,12 +1641,45 @@ def main():
         termina_en_str = st.text_input("🔢 Filtrar terminaciones (ej: 1,3,7)", value="")
         rango_1_25 = st.slider("📈 Mínimo de números entre 1–25", 0, 5, 0)
         rango_26_50 = st.slider("📉 Mínimo de números entre 26-50", 0, 5, 0)
-        submit_filtros_nuevos = st.form_submit_button("🎲 Generar nueva combinación válida")
+        max_por_decena = st.slider("🔟 Máximo de números en la misma decena", 1, 5, 5)
+        amplitud = st.slider("↔️ Amplitud (mayor − menor)", 4, 49, (4, 49))
+        max_salto = st.slider("🪜 Salto máximo entre números seguidos", 1, 46, 46)
+        fijos = st.multiselect("📌 Números fijos", list(range(1, 51)), max_selections=5)
+        prohibidos = st.multiselect("🚫 Números prohibidos", list(range(1, 51)))
+        paridad_estrellas = st.radio("⭐ Paridad de estrellas:", ["Cualquiera", "Pares", "Impares", "Mixta"], horizontal=True)
+        suma_estrellas = st.slider("⭐ Suma de estrellas", 3, 23, (3, 23))
+
+        # Filtros adicionales (solo se incluyen los que restringen algo)
+        filtros_extra = {
+            'max_por_decena': max_por_decena if max_por_decena < 5 else None,
+            'amplitud': amplitud if amplitud != (4, 49) else None,
+            'max_salto': max_salto if max_salto < 46 else None,
+            'fijos': fijos or None,
+            'prohibidos': prohibidos or None,
+            'paridad_estrellas': paridad_estrellas if paridad_estrellas != "Cualquiera" else None,
+            'suma_estrellas': suma_estrellas if suma_estrellas != (3, 23) else None,
+        }
+        termina_en = [x.strip() for x in termina_en_str.split(",") if x.strip().isdigit()] if termina_en_str else None
+        especificacion_actual = especificacion_formulario(
+            tipo_numeros, consecutivos, suma_min, suma_max, termina_en, rango_1_25, rango_26_50
+        )
+        especificacion_actual.update(filtros_extra)
+        filtro_actual = compilar_filtros(especificacion_actual)
+        factibles = filtro_actual.contar_factibles()
+        st.info(
+            f"🎯 {factibles['numeros']:,} de {TOTAL_NUMEROS:,} combinaciones de números cumplen estos filtros "
+            f"({factibles['total']:,} de {TOTAL_NUMEROS * TOTAL_ESTRELLAS:,} boletos con estrellas)".replace(",", ".")
+        )
+        if st.checkbox("📊 Ver selectividad de cada filtro", key="ver_selectividad"):
+            st.dataframe(filtro_actual.selectividad(), use_container_width=True)
+
+        submit_filtros_nuevos = st.button("🎲 Generar nueva combinación válida", key="btn_generar_filtrada")
 
     if submit_filtros_nuevos:
-        termina_en = [x.strip() for x in termina_en_str.split(",") if x.strip().isdigit()] if termina_en_str else None
+        indice, rng = st.session_state.flujo.siguiente()
         resultado = generar_filtrada(
-            tipo_numeros, consecutivos, suma_min, suma_max, termina_en, rango_1_25, rango_26_50
+            tipo_numeros, consecutivos, suma_min, suma_max, termina_en, rango_1_25, rango_26_50,
+            restricciones=restricciones, extra=filtros_extra, rng=rng
         )
 
         if resultado[0] is not None:
@@ -1396,24 +1687,163 @@ def main():
             combinacion_texto = " - ".join(map(str, nueva_nums)) + " ⭐ " + " - ".join(map(str, nueva_stars))
             st.session_state.combinacion_filtrada_actual = combinacion_texto
 
-            if 'historial' not in st.session_state:
-                st.session_state.historial = []
-            st.session_state.historial.append(combinacion_texto)    
+            st.session_state.historial.agregar(texto_a_codigo(combinacion_texto), modo='filtrada',
+                                               filtros=especificacion_actual, semilla=st.session_state.flujo.semilla,
+                                               indice=indice, muestreo=VERSION_MUESTREO)
             st.success("✅ ¡Nueva combinación generada con éxito!")
             st.write("🔢 Combinación:", combinacion_texto)
             st.write(f"📊 Pares: {num_pares}, Impares: {num_impares}, Suma total: {suma_total}")
 
             # Botón de guardar solo se muestra cuando hay una combinación generada
             if st.button("💾 Guardar esta combinación en el historial", key="guardar_filtrada_unico"):
-                if 'historial' not in st.session_state:
-                    st.session_state.historial = []
-                st.session_state.historial.append(combinacion_texto)
+                st.session_state.historial.agregar(texto_a_codigo(combinacion_texto))
                 st.success("💾 Combinación guardada con éxito en el historial.")
                 st.session_state.combinacion_filtrada_actual = None
                 st.experimental_rerun()
         else:
             st.warning("No se pudo generar una combinación con los filtros actuales")
-            
+            selectividad = filtro_actual.selectividad()
+            if not selectividad.empty:
+                culpable = selectividad.sort_values('pasa_solo_%').iloc[0]
+                st.caption(
+                    f"El filtro más restrictivo es '{culpable['filtro']}' (solo pasa el {culpable['pasa_solo_%']}% "
+                    f"de las combinaciones); en conjunto cumplen {factibles['total']:,} boletos.".replace(",", ".")
+                )
+
+    tramos.marcar('filtros')
+    # ==========================================
+    # 🎡 Sistema reducido (rueda) para peñas
+    # ==========================================
+    st.markdown("---")
+    st.subheader("🎡 Sistema reducido para peñas")
+
+    with st.expander("🎡 Generar rueda de boletos a partir de tus números", expanded=False):
+        pool_rueda = st.multiselect("🔢 Números del pool (5–25)", list(range(1, 51)), key="pool_rueda")
+        presupuesto = st.number_input("🎟️ Número máximo de boletos", min_value=1, max_value=500, value=50, step=1)
+        tipo_rueda = st.radio("🎯 Objetivo", ["Cubrir pares", "Cubrir tríos", "Garantía"], horizontal=True)
+        if tipo_rueda == "Cubrir pares":
+            aciertos, garantia = 2, 2
+        elif tipo_rueda == "Cubrir tríos":
+            aciertos, garantia = 3, 3
+        else:
+            col_k, col_m = st.columns(2)
+            aciertos = col_k.number_input("Si aciertan del pool", min_value=1, max_value=5, value=4)
+            garantia = col_m.number_input("Garantizar en un boleto", min_value=1, max_value=5, value=3)
+
+        if st.button("🎡 Generar rueda", key="btn_generar_rueda"):
+            indice, rng = st.session_state.flujo.siguiente()
+            rueda = ejecutar_pesado(
+                ('rueda', st.session_state.flujo.semilla, indice, tuple(pool_rueda), int(presupuesto), int(aciertos), int(garantia)),
+                generar_rueda, pool_rueda, int(presupuesto), int(aciertos), int(garantia), None, rng,
+                mensaje="Construyendo rueda:"
+            )
+            if rueda is not None:
+                st.session_state.rueda_actual = rueda
+
+        rueda = st.session_state.get('rueda_actual')
+        if rueda:
+            col1, col2 = st.columns(2)
+            col1.metric("Cobertura alcanzada", f"{rueda['cobertura']}%")
+            col2.metric("Boletos", len(rueda['combinaciones']))
+            st.caption(f"{rueda['cubiertos']} de {rueda['total']} subconjuntos cubiertos")
+            st.dataframe(pd.DataFrame({'Combinación': rueda['combinaciones']}), use_container_width=True)
+            if st.button("💾 Añadir la rueda al historial", key="guardar_rueda"):
+                st.session_state.historial.extender([texto_a_codigo(c) for c in rueda['combinaciones']], modo='rueda',
+                                                    filtros={'pool': pool_rueda}, semilla=st.session_state.flujo.semilla)
+                st.success("💾 Rueda guardada en el historial.")
+
+    tramos.marcar('rueda')
+    # ==========================================
+    # 📤 Comprobación de boletos en bloque
+    # ==========================================
+    st.markdown("---")
+    st.subheader("📤 Comprobar boletos en bloque")
+
+    with st.expander("📤 Subir o pegar boletos (hasta 1.000.000)", expanded=False):
+        archivo_boletos = st.file_uploader("Archivo CSV/TXT con una combinación por línea", type=["csv", "txt"], key="archivo_boletos")
+        texto_boletos = st.text_area(f"✍️ {text['manual_entry']} (una por línea: 1 - 2 - 3 - 4 - 5 ⭐ 1 - 2)", key="texto_boletos")
+        st.caption("Se aplican los filtros personalizados configurados arriba.")
+
+        if st.button("🔍 Analizar boletos", key="btn_analizar_lote"):
+            contenido = archivo_boletos.getvalue() if archivo_boletos is not None else texto_boletos.encode("utf-8")
+            _bytes_leidos.inc('subida', 'boletos', cantidad=len(contenido))
+            nums_lote, estrellas_lote, descartadas = leer_boletos(contenido)
+            if len(nums_lote) == 0:
+                st.warning("No se encontró ninguna combinación válida.")
+                pesados.pop('lote_resultado')
+            else:
+                filtros_lote = dict(
+                    tipo_numeros=tipo_numeros, consecutivos=consecutivos, suma_min=suma_min, suma_max=suma_max,
+                    termina_en=[x.strip() for x in termina_en_str.split(",") if x.strip().isdigit()] if termina_en_str else None,
+                    rango_1_25=rango_1_25, rango_26_50=rango_26_50, extra=filtros_extra
+                )
+                clave_lote = ('lote', datos.version, hashlib.sha1(contenido).hexdigest(), repr(filtros_lote))
+                pesados['lote_resultado'] = ejecutar_pesado(
+                    clave_lote, analizar_lote, nums_lote, estrellas_lote, datos.predictor, filtros_lote,
+                    mensaje=text.get("analizando", "Analizando combinación...")
+                )
+                if descartadas:
+                    st.info(f"{descartadas} líneas descartadas por formato no válido.")
+
+        resultado_lote = pesados.get('lote_resultado')
+        if resultado_lote is not None:
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Boletos analizados", f"{len(resultado_lote):,}")
+            col2.metric("Cumplen los filtros", f"{int(resultado_lote['cumple'].sum()):,}")
+            col3.metric("Fuerza media", f"{resultado_lote['fuerza'].mean():.2f}%")
+
+            col_orden, col_dir = st.columns([3, 1])
+            columna_orden = col_orden.selectbox("Ordenar por", list(resultado_lote.columns), index=list(resultado_lote.columns).index('fuerza'))
+            descendente = col_dir.checkbox("Descendente", value=True, key="orden_lote_desc")
+            ordenado = resultado_lote.sort_values(columna_orden, ascending=not descendente, kind='stable')
+            st.dataframe(ordenado.head(5000), use_container_width=True)
+            st.download_button(
+                "⬇️ Descargar resultados (CSV)",
+                ordenado.to_csv(index=False).encode("utf-8"),
+                file_name="analisis_boletos.csv",
+                mime="text/csv"
+            )
+
+    tramos.marcar('boletos_en_bloque')
+    # Exportación para análisis externo (Parquet/Arrow con pyarrow, CSV siempre)
+    st.markdown("---")
+    st.markdown("### 💾 Exportar datos")
+    with st.expander("📦 Descargar histórico, estadísticas y boletos", expanded=False):
+        formato = st.radio("Formato", formatos_disponibles(), horizontal=True, key="formato_exportacion")
+        tablas_exportables = {
+            "🗓️ Sorteos del histórico": 'sorteos',
+            "📊 Frecuencias y huecos": 'frecuencias',
+            f"🔗 {text['export_pairs']}": 'pares',
+            f"📅 {text['export_monthly']}": 'mensual',
+            f"📋 {text['export'].replace(' (CSV)', '')}": 'historial',
+        }
+        if pesados.get('lote_resultado') is not None:
+            tablas_exportables["📤 Resultados del análisis en bloque"] = 'lote'
+        etiqueta = st.selectbox("Tabla", list(tablas_exportables), key="tabla_exportacion")
+        tabla = tablas_exportables[etiqueta]
+
+        if tabla == 'historial':
+            contenido_exportado = exportar(tabla_boletos(st.session_state.historial.codigos), formato)
+        elif tabla == 'lote':
+            clave = (id(pesados.get('lote_resultado')), formato)
+            if pesados.get('lote_exportado', (None,))[0] != clave:
+                pesados['lote_exportado'] = (clave, exportar(pesados.get('lote_resultado'), formato))
+            contenido_exportado = pesados.get('lote_exportado')[1]
+        else:
+            contenido_exportado = exportar_tabla_historico(datos, datos.version, tabla, formato)
+        st.download_button(
+            f"⬇️ {etiqueta} ({formato})",
+            contenido_exportado,
+            file_name=f"elottoia_{tabla}{EXTENSIONES[formato]}",
+            mime=TIPOS_MIME[formato],
+            key="btn_descargar_exportacion"
+        )
+        if tabla in TABLAS_HISTORICO:
+            st.caption(f"{len(contenido_exportado) / 1024:,.1f} KB · desde consola: python exportacion.py {tabla} --formato {formato}")
+        else:
+            st.caption(f"{len(contenido_exportado) / 1024:,.1f} KB")
+
+    tramos.marcar('exportacion')
     st.markdown("---")
     st.header("📊 Análisis Estadístico de Frecuencia")
     st.info("""
@@ -1423,35 +1853,11 @@ def main():
     st.markdown("---")
     st.header(text['frequency_heatmap'])
     try:
-        with open('euromillones_convertido.txt', 'r', encoding='utf-8') as f:
-            lineas = f.readlines()[1:]  # Saltar encabezado si existe
-
-        data = []
-        data_e = []
-        for linea in lineas:
-            partes = linea.strip().split(';')
-            if len(partes) == 3:
-                anio = partes[0]
-                numeros = partes[1].split(',')
-                estrellas = partes[2].split(',')
-                for num in numeros:
-                    if num.isdigit():
-                        data.append((int(num), anio))
-                for est in estrellas:
-                    if est.isdigit():
-                        data_e.append((int(est), anio))
-
-        df = pd.DataFrame(data, columns=['Número', 'Año'])
-        df_e = pd.DataFrame(data_e, columns=['Estrella', 'Año'])
-
-        # Tabla de frecuencia de números
-        tabla = pd.crosstab(df['Número'], df['Año'])
-        tabla = tabla.sort_index().reindex(range(1, 51), fill_value=0)
+        # Matrices densas número×año y estrella×año, construidas una vez por versión de los datos
+        tabla, tabla_e = tablas_anuales(datos, datos.version)
         st.dataframe(tabla, use_container_width=True)
 
         # Tabla de frecuencia de estrellas
-        tabla_e = pd.crosstab(df_e['Estrella'], df_e['Año'])
-        tabla_e = tabla_e.sort_index().reindex(range(1, 13), fill_value=0)
         st.markdown('---')
         st.header(text['frecuencia_estrellas'])
         st.dataframe(tabla_e, use_container_width=True)
@@ -1460,15 +1866,16 @@ def main():
         # Heatmap de frecuencia
         st.markdown('---')
         st.header(text['heatmap_title'])
-        import seaborn as sns
-        fig, ax = plt.subplots(figsize=(14, 10))
-        sns.heatmap(tabla, annot=True, fmt='d', cmap='Blues', ax=ax)
-        ax.set_title(text['frequency_heatmap'])
-        st.pyplot(fig)
+        # Se dibuja en el pool de procesos una vez por versión e idioma y el PNG se comparte
+        png_mapa = ejecutar_pesado(('mapa_calor', datos.version, text['frequency_heatmap']), mapa_calor_png,
+                                   tabla, text['frequency_heatmap'], mensaje="Dibujando el mapa de calor:")
+        if png_mapa is not None:
+            st.image(png_mapa, use_column_width=True)
 
     except Exception as e:
         st.error(f"Error al generar análisis: {str(e)}")
 
+    tramos.marcar('mapa_calor')
     # Análisis avanzado
     st.markdown('---')
     st.header(text['analysis_title'])
@@ -1476,46 +1883,123 @@ def main():
         # Top 5 estrellas por año
         st.markdown(f"_{text['top_stars_help']}_")
         st.subheader(text['top5_stars_title'])
-        top5_estrellas = df_e.groupby(['Año', 'Estrella']).size().reset_index(name='Frecuencia')
-        top5_tabla = top5_estrellas.sort_values(['Año', 'Frecuencia'], ascending=[True, False])
-        top5_tabla = top5_tabla.groupby('Año').head(5).reset_index(drop=True)
+        orden = np.argsort(-tabla_e.to_numpy(), axis=0, kind='stable')[:5]
+        top5_tabla = pd.DataFrame({
+            'Año': np.repeat(tabla_e.columns.to_numpy(), len(orden)),
+            'Estrella': tabla_e.index.to_numpy()[orden.T.ravel()],
+            'Frecuencia': np.take_along_axis(tabla_e.to_numpy(), orden, axis=0).T.ravel()
+        })
         st.dataframe(top5_tabla, use_container_width=True)
 
         # Pares de estrellas más repetidas por año
         st.markdown(f"_{text['pairs_help']}_")
         st.subheader(text['star_pairs_title'])
-        pares_por_anio = {}
-        for linea in lineas:
-            partes = linea.strip().split(';')
-            if len(partes) == 3:
-                anio = partes[0]
-                estrellas = tuple(sorted(partes[2].split(',')))
-                if anio not in pares_por_anio:
-                    pares_por_anio[anio] = []
-                pares_por_anio[anio].append(tuple(estrellas))
-
-        resultado_pares = []
-        for anio, pares in pares_por_anio.items():
-            conteo = Counter(pares)
-            top = conteo.most_common(1)[0]
-            resultado_pares.append({'Año': anio, 'Par Más Repetido': f'{top[0][0]} y {top[0][1]}', 'Veces': top[1]})
-        df_pares = pd.DataFrame(resultado_pares).sort_values('Año')
-        st.dataframe(df_pares, use_container_width=True)
+        motor_pares = motor_pares_estrellas(datos, datos.version)
+        k_pares = st.slider("Pares por año", 1, 5, 1, key='k_pares_estrellas')
+        st.dataframe(motor_pares.top_por_anio(k_pares), use_container_width=True)
+
+        with st.expander("🔍 Ranking completo, tendencia y afinidades de los pares de estrellas"):
+            col_anio, col_mes = st.columns(2)
+            anio_par = col_anio.selectbox("Año", ["Todos"] + motor_pares.anios.tolist(), key='anio_ranking_pares')
+            mes_par = col_mes.selectbox("Mes", ["Todos"] + MESES, key='mes_ranking_pares')
+            st.dataframe(motor_pares.ranking(
+                anio=None if anio_par == "Todos" else anio_par,
+                mes=None if mes_par == "Todos" else MESES.index(mes_par) + 1
+            ), use_container_width=True)
+
+            st.markdown("**📅 Par más repetido en cada mes del año (todos los años)**")
+            top_meses = motor_pares.top_por_mes(1)
+            top_meses['Mes'] = [MESES[m - 1] for m in top_meses['Mes']]
+            st.dataframe(top_meses, use_container_width=True)
+
+            st.markdown("**📈 Tendencia** (variación de la cuota anual del par, en puntos porcentuales por año)")
+            tendencias = motor_pares.tendencias().sort_values()
+            col_sube, col_baja = st.columns(2)
+            col_sube.dataframe(tendencias.tail(5)[::-1].rename('Sube'), use_container_width=True)
+            col_baja.dataframe(tendencias.head(5).rename('Baja'), use_container_width=True)
+            par_sel = st.selectbox("Evolución de un par", [etiqueta_par(i) for i in range(TOTAL_PARES)], key='par_tendencia')
+            indice_par = [etiqueta_par(i) for i in range(TOTAL_PARES)].index(par_sel)
+            st.line_chart(pd.DataFrame({'Veces': motor_pares.matriz_anual()[:, indice_par]}, index=motor_pares.anios))
+
+            st.markdown("**🔗 Afinidad número-estrellas** (lift > 1: aparecen juntos más de lo esperado)")
+            st.dataframe(motor_pares.top_afinidades(10), use_container_width=True)
+
+        # Tríos y cuartetos frecuentes (minería de conjuntos sobre bitsets de sorteos)
+        st.subheader(text['common_trios'])
+        col_tam, col_sop, col_est = st.columns(3)
+        tamano_conjuntos = col_tam.radio("Tamaño", [3, 4], horizontal=True, key='tamano_itemsets')
+        min_soporte = col_sop.number_input("Soporte mínimo (sorteos)", 1, 100, 3, key='min_soporte_itemsets')
+        con_estrellas = col_est.checkbox("Incluir estrellas", key='itemsets_con_estrellas')
+        conjuntos = ejecutar_pesado(
+            ('itemsets', datos.version, tamano_conjuntos, int(min_soporte), con_estrellas), minar_itemsets,
+            datos.numeros, datos.estrellas, int(min_soporte), (tamano_conjuntos,), con_estrellas,
+            mensaje=text['calculating_trios']
+        )
+        if conjuntos is None:
+            conjuntos = pd.DataFrame(columns=['Combinación', 'Tamaño', 'Números', 'Estrellas', 'Soporte',
+                                              'Soporte esperado', 'Lift'])
+        st.caption(f"{len(conjuntos):,} combinaciones con soporte ≥ {int(min_soporte)}. "
+                   "Lift = soporte / soporte esperado si todos los números fuesen equiprobables.".replace(",", "."))
+        st.dataframe(conjuntos.head(500), use_container_width=True)
+        formato_conjuntos = formatos_disponibles()[0]
+        st.download_button(
+            f"⬇️ {text['export_trios']} ({formato_conjuntos})",
+            exportar(conjuntos, formato_conjuntos),
+            file_name=f"elottoia_conjuntos_{tamano_conjuntos}{EXTENSIONES[formato_conjuntos]}",
+            mime=TIPOS_MIME[formato_conjuntos],
+            key='btn_exportar_itemsets'
+        )
+
+        # Desviaciones significativas frente a históricos simulados
+        with st.expander("🧪 ¿Qué es realmente inusual? (pruebas de significancia)"):
+            significancia = significancia_historico(datos)
+            if significancia is not None:
+                st.markdown(f"Se comparan los datos reales con {SIMULACIONES:,} históricos simulados de {len(datos.numeros):,} sorteos".replace(",", ".")
+                            + f" y se corrigen los p-valores por comparaciones múltiples (q < {ALFA}).")
+                tabla_inusual = inusuales(significancia)
+                if len(tabla_inusual):
+                    st.dataframe(tabla_inusual, use_container_width=True)
+                else:
+                    st.success("Ninguna frecuencia, par ni racha se sale de lo esperable por azar.")
+                familia_sel = st.selectbox("Ver todos los contrastes de", list(FAMILIAS), format_func=lambda f: FAMILIAS[f][2],
+                                           key='familia_significancia')
+                st.dataframe(significancia[familia_sel].sort_values('p_valor'), use_container_width=True)
+
+        # Diagnóstico de aleatoriedad del sorteo
+        with st.expander("🔬 Diagnóstico de aleatoriedad del sorteo"):
+            diagnostico = diagnosticos_historico(datos, datos.version)
+            st.markdown("Contrastes clásicos sobre todo el histórico: p-valores altos indican que los sorteos "
+                        "se comportan como un bombo sin memoria.")
+            st.dataframe(diagnostico['resumen'], use_container_width=True)
+            pest_ajuste, pest_anios, pest_rachas, pest_retardos, pest_transicion = st.tabs(
+                ["χ² números y estrellas", "χ² por año", "Rachas", "Solapamiento", "Transiciones"])
+            with pest_ajuste:
+                st.dataframe(diagnostico['numeros'], use_container_width=True)
+                st.caption("Las estrellas se contrastan por etapas según las que había en juego.")
+                st.dataframe(diagnostico['estrellas'], use_container_width=True)
+            with pest_anios:
+                st.dataframe(diagnostico['anios'], use_container_width=True)
+            with pest_rachas:
+                st.dataframe(diagnostico['rachas'].sort_values('p'), use_container_width=True)
+            with pest_retardos:
+                st.caption("Números en común entre un sorteo y el que sale k sorteos después (0,5 si no hay memoria).")
+                st.dataframe(diagnostico['retardos'], use_container_width=True)
+            with pest_transicion:
+                st.caption("Residuos estandarizados: número del sorteo (fila) → número del sorteo siguiente (columna).")
+                st.plotly_chart(figura_transiciones(datos, datos.version), use_container_width=True)
 
         # Porcentaje de aparición de números
         st.markdown(f"_{text['percentage_help']}_")
         st.subheader(text['percentage_table_title'])
-        total_sorteos = len(lineas)
-        porcentaje = df['Número'].value_counts().sort_index() / total_sorteos * 100
+        total_sorteos = datos.estadisticas.sorteos
+        porcentaje = tabla.sum(axis=1) / max(total_sorteos, 1) * 100
         df_porcentaje = pd.DataFrame({'Número': porcentaje.index, 'Porcentaje (%)': porcentaje.values.round(2)})
         st.dataframe(df_porcentaje, use_container_width=True)
 
         # Evolución de un número por año
         st.subheader(text['evolution_title'])
         num_sel = st.slider(text['select_number_slider'], 1, 50, 7)
-        df_num = df[df['Número'] == num_sel]
-        evolucion = df_num['Año'].value_counts().sort_index()
-        df_evolucion = pd.DataFrame({'Año': evolucion.index, 'Frecuencia': evolucion.values})
+        df_evolucion = pd.DataFrame({'Año': tabla.columns, 'Frecuencia': tabla.loc[num_sel].to_numpy()})
         fig3, ax3 = plt.subplots()
         ax3.plot(df_evolucion['Año'], df_evolucion['Frecuencia'], marker='o')
         ax3.set_title(text['evolution_chart_title'].format(num_sel))
@@ -1530,20 +2014,14 @@ def main():
         st.markdown('---')
         st.markdown(f"_{text['comparison_desc']}_")
         st.subheader(text['comparison_title'])
-        nums_disponibles = sorted(df['Número'].unique())
-        seleccion = st.multiselect(text['select_numbers'], nums_disponibles, default=[7, 14], max_selections=5)
-        if seleccion:
-            df_filtrado = df[df['Número'].isin(seleccion)]
-            comparativa = df_filtrado['Año'].value_counts().index.sort_values()
-            df_agrupado = df_filtrado.groupby(['Año', 'Número']).size().reset_index(name='Frecuencia')
-            import plotly.express as px
-            fig_int = px.line(df_agrupado, x='Año', y='Frecuencia', color='Número', markers=True,
-                               title=text['interactive_chart_title'])
-            fig_int.update_layout(hovermode='x unified')
-            st.plotly_chart(fig_int, use_container_width=True)
+        # Todas las series van en la figura; la leyenda las muestra u oculta en el navegador
+        st.caption(f"{text['select_numbers']} ↔️ leyenda")
+        st.plotly_chart(figura_comparativa(datos, datos.version, text['interactive_chart_title']), use_container_width=True)
 
     except Exception as e:
         st.error(f"Error en el análisis avanzado: {str(e)}")
+    tramos.marcar('analisis_avanzado')
 
 if __name__ == '__main__':
-    main()
+    with _ejecuciones.cronometro():
+        main()
@@ -0,0 +1,135 @@
+"""Prueba de carga de la API HTTP contra localhost.
+
+Arranca api.py en un subproceso (o usa --url), lanza varios clientes con
+conexiones persistentes que envían una mezcla de peticiones durante unos
+segundos y muestra peticiones/s y latencias p50/p95/p99 por ruta.
+
+    python benchmarks/carga_api.py --segundos 15 --clientes 8 --salida carga.json
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+from comun import RAIZ, entorno, guardar_json, imprimir_tabla, percentiles
+
+# (peso, método, ruta, cuerpo)
+MEZCLA = [
+    (30, 'GET', "/generar?modo=aleatorio", None),
+    (15, 'GET', "/generar?modo=frecuencia", None),
+    (15, 'GET', "/generar?modo=hibrido", None),
+    (5, 'GET', "/generar?modo=aleatorio&n=100", None),
+    (10, 'POST', "/generar/filtrada", {'filtros': {'paridad': "Mezcla equilibrada", 'suma': [100, 150]}}),
+    (10, 'POST', "/analizar", {'combinacion': "3 - 12 - 25 - 38 - 44 ⭐ 2 - 9"}),
+    (10, 'POST', "/premios", {'boletos': ["3 - 12 - 25 - 38 - 44 ⭐ 2 - 9", "1 - 2 - 3 - 4 - 5 ⭐ 1 - 2"]}),
+    (5, 'GET', "/estadisticas?tipo=numeros", None),
+]
+
+
+def _nombre(metodo, ruta):
+    return f"{metodo} {ruta}"
+
+
+def _cliente(host, puerto, fin, mezcla, semilla, latencias, errores):
+    aleatorio = random.Random(semilla)
+    pesos = [m[0] for m in mezcla]
+    cuerpos = {i: json.dumps(m[3]).encode('utf-8') if m[3] is not None else None for i, m in enumerate(mezcla)}
+    conexion = http.client.HTTPConnection(host, puerto, timeout=30)
+    while time.perf_counter() < fin:
+        i = aleatorio.choices(range(len(mezcla)), pesos)[0]
+        _, metodo, ruta, _ = mezcla[i]
+        cabeceras = {'Content-Type': "application/json"} if cuerpos[i] is not None else {}
+        inicio = time.perf_counter()
+        try:
+            conexion.request(metodo, ruta, body=cuerpos[i], headers=cabeceras)
+            respuesta = conexion.getresponse()
+            respuesta.read()
+            if respuesta.status != 200:
+                errores[_nombre(metodo, ruta)] += 1
+                continue
+        except (OSError, http.client.HTTPException):
+            errores[_nombre(metodo, ruta)] += 1
+            conexion.close()
+            conexion = http.client.HTTPConnection(host, puerto, timeout=30)
+            continue
+        latencias[_nombre(metodo, ruta)].append(time.perf_counter() - inicio)
+    conexion.close()
+
+
+def _esperar_api(host, puerto, segundos=60):
+    limite = time.monotonic() + segundos
+    while time.monotonic() < limite:
+        try:
+            conexion = http.client.HTTPConnection(host, puerto, timeout=2)
+            conexion.request('GET', "/salud")
+            if conexion.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"La API no responde en {host}:{puerto}")
+
+
+def resumen(latencias, errores, segundos):
+    """Peticiones/s y percentiles (ms) por ruta y en total"""
+    filas = {nombre: percentiles(latencias.get(nombre, []), errores.get(nombre, 0), segundos)
+             for nombre in sorted(set(latencias) | set(errores))}
+    filas['TOTAL'] = percentiles([v for valores in latencias.values() for v in valores], sum(errores.values()), segundos)
+    return filas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="API ya arrancada (por defecto se lanza una en localhost)")
+    parser.add_argument("--puerto", type=int, default=8599, help="puerto de la API lanzada por el script")
+    parser.add_argument("--segundos", type=float, default=10.0)
+    parser.add_argument("--clientes", type=int, default=8, help="conexiones persistentes concurrentes")
+    parser.add_argument("--calentamiento", type=float, default=1.0)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", help="guarda el resultado en JSON")
+    argumentos = parser.parse_args()
+
+    proceso = None
+    if argumentos.url:
+        url = urlsplit(argumentos.url)
+        host, puerto = url.hostname, url.port or 80
+    else:
+        host, puerto = "127.0.0.1", argumentos.puerto
+        proceso = subprocess.Popen([sys.executable, os.path.join(RAIZ, "api.py"), "--host", host, "--puerto", str(puerto)],
+                                   cwd=RAIZ, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _esperar_api(host, puerto)
+        for fase, segundos in (("calentamiento", argumentos.calentamiento), ("medida", argumentos.segundos)):
+            latencias, errores = defaultdict(list), defaultdict(int)
+            fin = time.perf_counter() + segundos
+            hilos = [threading.Thread(target=_cliente, args=(host, puerto, fin, MEZCLA, argumentos.semilla + i,
+                                                             latencias, errores))
+                     for i in range(argumentos.clientes)]
+            inicio = time.perf_counter()
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+            duracion = time.perf_counter() - inicio
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait(timeout=10)
+
+    resultado = {
+        **entorno(),
+        'parametros': {'clientes': argumentos.clientes, 'segundos': argumentos.segundos, 'url': argumentos.url},
+        'rutas': resumen(latencias, errores, duracion),
+    }
+    imprimir_tabla(resultado['rutas'], ['peticiones', 'errores', 'rps', 'p50_ms', 'p95_ms', 'p99_ms'])
+    if argumentos.salida:
+        guardar_json(resultado, argumentos.salida)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""Prueba de carga de la app Streamlit con sesiones concurrentes simuladas.
+
+Cada sesión es un AppTest de Streamlit ejecutado en su propio hilo dentro de
+este proceso, así que todas comparten cachés, histórico y pool de tareas como
+las sesiones reales de un `streamlit run app.py`. Cada usuario virtual repite
+guiones (entrar, cambiar de modo, generar, aplicar filtros, abrir análisis,
+mover sliders) con pausas entre interacciones. Se mide la latencia de cada
+interacción (una ejecución completa del script) y se muestrean CPU y memoria
+residente del proceso; con varios niveles (--sesiones 1,2,4) se ve dónde se
+dispara la latencia.
+
+    python benchmarks/carga_sesiones.py --sesiones 1,2,4 --segundos 60 --salida sesiones.json
+    python benchmarks/carga_sesiones.py --comparar antes.json despues.json
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from comun import RAIZ, cargar_json, entorno, guardar_json, imprimir_tabla, percentiles
+
+sys.path.insert(0, RAIZ)
+from memoria import megas, memoria_proceso  # noqa: E402
+
+APP = os.path.join(RAIZ, "app.py")
+
+
+# ============================================
+# 🎭 Guiones de usuario
+# ============================================
+# Un guion es una lista de (interacción, acción); la acción prepara los widgets
+# del AppTest y el arnés mide la ejecución que sigue. La acción None abre una
+# sesión nueva (entrada en la app).
+
+def _buscar(widgets, condicion, descripcion):
+    for widget in widgets:
+        if condicion(widget):
+            return widget
+    raise LookupError(f"No se encuentra el widget: {descripcion}")
+
+
+def boton(clave):
+    return lambda at: at.button(key=clave).click()
+
+
+def por_clave(tipo, clave, valor):
+    return lambda at: getattr(at, tipo)(key=clave).set_value(valor)
+
+
+def por_etiqueta(tipo, etiqueta, valor):
+    return lambda at: _buscar(getattr(at, tipo), lambda w: w.label.startswith(etiqueta), etiqueta).set_value(valor)
+
+
+def slider_numero(valor):
+    """Slider de evolución de un número (1-50); su etiqueta depende del idioma"""
+    return lambda at: _buscar(at.slider, lambda w: (w.min, w.max) == (1, 50), "slider 1-50").set_value(valor)
+
+
+GUIONES = {
+    'generar': [
+        ('entrada', None),
+        ('modo_frecuencia', boton('btn_frecuencia')),
+        ('generar', boton('btn_generar_unico_123')),
+        ('modo_hibrido', boton('btn_hibrido')),
+        ('generar', boton('btn_generar_unico_123')),
+        ('modo_aleatorio', boton('btn_aleatorio')),
+    ],
+    'filtros': [
+        ('entrada', None),
+        ('filtro_paridad', por_etiqueta('radio', "🧮 Tipo de Números", "Mezcla equilibrada")),
+        ('filtro_suma', por_etiqueta('number_input', "➗ Suma mínima", 100)),
+        ('filtro_decena', por_etiqueta('slider', "🔟 Máximo de números", 2)),
+        ('generar_filtrada', boton('btn_generar_filtrada')),
+        ('ver_selectividad', por_clave('checkbox', 'ver_selectividad', True)),
+    ],
+    'analisis': [
+        ('entrada', None),
+        ('slider_numero', slider_numero(23)),
+        ('slider_numero', slider_numero(41)),
+        ('pares_estrellas', por_clave('slider', 'k_pares_estrellas', 3)),
+        ('itemsets_estrellas', por_clave('checkbox', 'itemsets_con_estrellas', True)),
+        ('restriccion_historica', por_clave('slider', 'max_coincidencias', 4)),
+        ('generar', boton('btn_generar_unico_123')),
+    ],
+}
+PESOS = {'generar': 3, 'filtros': 2, 'analisis': 2}
+
+
+# ============================================
+# 👥 Usuarios virtuales y muestreo
+# ============================================
+
+class Medidas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias = defaultdict(list)
+        self.errores = defaultdict(int)
+        self.mensajes = defaultdict(set)
+        self.abiertas = 0
+
+    def anotar(self, interaccion, segundos, error):
+        with self._lock:
+            if error:
+                self.errores[interaccion] += 1
+                self.mensajes[interaccion].add(error[:300])
+            else:
+                self.latencias[interaccion].append(segundos)
+
+    def contar(self):
+        with self._lock:
+            return sum(len(v) for v in self.latencias.values())
+
+
+def preparar_apptest():
+    """Adapta AppTest para varias sesiones a la vez en un proceso, como en `streamlit run`.
+
+    AppTest instala un Runtime simulado al empezar cada ejecución y lo borra al
+    acabar, así que una sesión que termina deja sin Runtime a las que siguen
+    ejecutándose; aquí el primero que se crea se queda para todas. Además crea
+    una caché de bytecode por ejecución y recompila app.py cada vez; desde
+    varios hilos compile() de CPython 3.11 falla a veces ("AST constructor
+    recursion depth mismatch"). Se comparte una sola caché.
+    """
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    class _Persistente(type(Runtime)):
+        def __setattr__(cls, nombre, valor):
+            if nombre != '_instance':
+                super().__setattr__(nombre, valor)
+            elif valor is not None and Runtime._instance is None:
+                Runtime._instance = valor
+
+    app_test.Runtime = _Persistente('Runtime', (Runtime,), {})
+    cache = ScriptCache()
+    for modulo in (app_test, local_script_runner):
+        if hasattr(modulo, 'ScriptCache'):
+            modulo.ScriptCache = lambda: cache
+
+
+def usuario_virtual(fin, medidas, semilla, pausa, tiempo_maximo):
+    aleatorio = random.Random(semilla)
+    from streamlit.testing.v1 import AppTest
+    nombres = list(GUIONES)
+    at = None
+    while time.monotonic() < fin:
+        guion = GUIONES[aleatorio.choices(nombres, [PESOS[n] for n in nombres])[0]]
+        for interaccion, accion in guion:
+            if time.monotonic() >= fin:
+                break
+            inicio = time.perf_counter()
+            error = None
+            try:
+                if accion is None or at is None:
+                    at = AppTest.from_file(APP, default_timeout=tiempo_maximo)
+                    interaccion = 'entrada'
+                    with medidas._lock:
+                        medidas.abiertas += 1
+                else:
+                    accion(at)
+                at.run()
+                if len(at.exception):
+                    error = at.exception[0].message
+            except Exception as e:  # widget ausente, tiempo agotado…: la sesión se da por rota
+                error, at = f"{type(e).__name__}: {e}", None
+            medidas.anotar(interaccion, time.perf_counter() - inicio, error)
+            time.sleep(aleatorio.expovariate(1 / pausa) if pausa > 0 else 0)
+
+
+def _descendientes(pid):
+    try:
+        tareas = os.listdir(f"/proc/{pid}/task")
+    except OSError:
+        return []
+    hijos = []
+    for tarea in tareas:
+        try:
+            with open(f"/proc/{pid}/task/{tarea}/children") as f:
+                hijos.extend(int(h) for h in f.read().split())
+        except OSError:
+            pass
+    return hijos + [nieto for hijo in hijos for nieto in _descendientes(hijo)]
+
+
+def cpu_hijos():
+    """Segundos de CPU (usuario + sistema) de los procesos hijos vivos, como el pool de tareas (solo Linux)"""
+    total = 0
+    for pid in _descendientes(os.getpid()):
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                campos = f.read().rsplit(')', 1)[1].split()
+            total += int(campos[11]) + int(campos[12])
+        except (OSError, IndexError, ValueError):
+            pass
+    return total / os.sysconf("SC_CLK_TCK") if total else 0.0
+
+
+def muestrear(medidas, parar, intervalo, muestras):
+    """CPU (% de un núcleo, del proceso y de sus hijos) y memoria residente cada `intervalo` segundos"""
+    inicio = anterior_t = time.monotonic()
+    anterior_cpu, anterior_hijos = time.process_time(), cpu_hijos()
+    while not parar.wait(intervalo):
+        ahora, cpu, hijos = time.monotonic(), time.process_time(), cpu_hijos()
+        transcurrido = max(ahora - anterior_t, 1e-9)
+        residente, pico = memoria_proceso()
+        muestras.append({
+            't': round(ahora - inicio, 2),
+            'cpu_pct': round(100 * (cpu - anterior_cpu) / transcurrido, 1),
+            'cpu_hijos_pct': round(100 * max(hijos - anterior_hijos, 0) / transcurrido, 1),
+            'rss_mb': megas(residente),
+            'pico_mb': megas(pico),
+            'sesiones_abiertas': medidas.abiertas,
+            'interacciones': medidas.contar(),
+        })
+        anterior_t, anterior_cpu, anterior_hijos = ahora, cpu, hijos
+
+
+def nivel(sesiones, segundos, rampa, pausa, intervalo, semilla, tiempo_maximo):
+    """Ejecuta `sesiones` usuarios virtuales durante `segundos` y resume latencias, CPU y memoria"""
+    medidas, muestras, parar = Medidas(), [], threading.Event()
+    muestreo = threading.Thread(target=muestrear, args=(medidas, parar, intervalo, muestras), daemon=True)
+    muestreo.start()
+    inicio = time.monotonic()
+    fin = inicio + rampa + segundos
+    hilos = []
+    for i in range(sesiones):
+        hilo = threading.Thread(target=usuario_virtual, args=(fin, medidas, semilla + i, pausa, tiempo_maximo),
+                                name=f"sesion-{i}", daemon=True)
+        hilo.start()
+        hilos.append(hilo)
+        if sesiones > 1:
+            time.sleep(rampa / (sesiones - 1))
+    for hilo in hilos:
+        hilo.join()
+    duracion = time.monotonic() - inicio
+    parar.set()
+    muestreo.join()
+
+    interacciones = {nombre: percentiles(medidas.latencias.get(nombre, []), medidas.errores.get(nombre, 0), duracion)
+                     for nombre in sorted(set(medidas.latencias) | set(medidas.errores))}
+    todas = [v for valores in medidas.latencias.values() for v in valores]
+    interacciones['TOTAL'] = percentiles(todas, sum(medidas.errores.values()), duracion)
+    cpu = [m['cpu_pct'] for m in muestras]
+    cpu_pool = [m['cpu_hijos_pct'] for m in muestras]
+    return {
+        'sesiones': sesiones,
+        'duracion_s': round(duracion, 1),
+        'sesiones_abiertas': medidas.abiertas,
+        'errores': {nombre: sorted(mensajes) for nombre, mensajes in medidas.mensajes.items()},
+        'interacciones': interacciones,
+        'cpu_media_pct': round(sum(cpu) / len(cpu), 1) if cpu else None,
+        'cpu_hijos_media_pct': round(sum(cpu_pool) / len(cpu_pool), 1) if cpu_pool else None,
+        'rss_max_mb': max((m['rss_mb'] for m in muestras), default=None),
+        'muestras': muestras,
+    }
+
+
+# ============================================
+# 📊 Informe y comparación
+# ============================================
+
+def imprimir(resultado):
+    for datos_nivel in resultado['niveles']:
+        print(f"\n== {datos_nivel['sesiones']} sesiones · {datos_nivel['duracion_s']} s · "
+              f"CPU media {datos_nivel['cpu_media_pct']}% (+{datos_nivel['cpu_hijos_media_pct']}% pool) · RSS máx {datos_nivel['rss_max_mb']} MB")
+        imprimir_tabla(datos_nivel['interacciones'], ['peticiones', 'errores', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'])
+
+
+def comparar(ruta_base, ruta_nueva):
+    """p50/p95 por nivel e interacción de dos resultados (p. ej. dos commits)"""
+    base, nueva = cargar_json(ruta_base), cargar_json(ruta_nueva)
+    print(f"base: {base.get('commit')} ({base.get('fecha')})  ·  nueva: {nueva.get('commit')} ({nueva.get('fecha')})")
+    niveles_base = {n['sesiones']: n for n in base['niveles']}
+    for datos_nivel in nueva['niveles']:
+        anterior = niveles_base.get(datos_nivel['sesiones'])
+        if anterior is None:
+            continue
+        filas = {}
+        for nombre, fila in datos_nivel['interacciones'].items():
+            previa = anterior['interacciones'].get(nombre, {})
+            filas[nombre] = {}
+            for clave in ('p50_ms', 'p95_ms'):
+                if clave in fila and previa.get(clave):
+                    filas[nombre][clave] = f"{previa[clave]}→{fila[clave]}"
+                    filas[nombre][clave[:3] + '_%'] = f"{100 * (fila[clave] / previa[clave] - 1):+.0f}%"
+        print(f"\n== {datos_nivel['sesiones']} sesiones · CPU {anterior['cpu_media_pct']}→{datos_nivel['cpu_media_pct']}% · "
+              f"RSS {anterior['rss_max_mb']}→{datos_nivel['rss_max_mb']} MB")
+        imprimir_tabla(filas, ['p50_ms', 'p50_%', 'p95_ms', 'p95_%'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sesiones", default="1,2,4", help="sesiones concurrentes por nivel, separadas por comas")
+    parser.add_argument("--segundos", type=float, default=60.0, help="duración de cada nivel tras la rampa")
+    parser.add_argument("--rampa", type=float, default=5.0, help="segundos para ir abriendo las sesiones")
+    parser.add_argument("--pausa", type=float, default=1.0, help="pausa media entre interacciones (s)")
+    parser.add_argument("--intervalo", type=float, default=1.0, help="periodo de muestreo de CPU y memoria (s)")
+    parser.add_argument("--tiempo-maximo", type=float, default=180.0, help="límite de una ejecución del script (s)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", help="guarda el resultado en JSON")
+    parser.add_argument("--comparar", nargs=2, metavar=("BASE", "NUEVA"), help="compara dos resultados JSON")
+    argumentos = parser.parse_args()
+
+    if argumentos.comparar:
+        comparar(*argumentos.comparar)
+        return
+
+    # La app lee el histórico del directorio actual; los boletos van a una base de datos temporal
+    os.chdir(RAIZ)
+    os.environ.setdefault('ELOTTOIA_BD', os.path.join(tempfile.mkdtemp(prefix="elottoia-carga-"), "carga.db"))
+    logging.basicConfig(level=logging.WARNING)
+    from streamlit import logger as registro_streamlit
+    registro_streamlit.set_log_level("error")  # sin los avisos de "bare mode" de cada sesión simulada
+    preparar_apptest()
+    niveles = [int(n) for n in argumentos.sesiones.split(',') if n.strip()]
+    resultado = {
+        **entorno(),
+        'parametros': {k: v for k, v in vars(argumentos).items() if k not in ('salida', 'comparar')},
+        'niveles': [],
+    }
+    for sesiones in niveles:
+        print(f"Nivel de {sesiones} sesiones…", flush=True)
+        resultado['niveles'].append(nivel(sesiones, argumentos.segundos, argumentos.rampa, argumentos.pausa,
+                                          argumentos.intervalo, argumentos.semilla, argumentos.tiempo_maximo))
+    imprimir(resultado)
+    if argumentos.salida:
+        guardar_json(resultado, argumentos.salida)
+
+
+if __name__ == "__main__":
+    main()
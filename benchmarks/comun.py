@@ -0,0 +1,65 @@
+"""Utilidades compartidas por los scripts de benchmarks/: percentiles, entorno y JSON."""
+import json
+import os
+import platform
+import subprocess
+import time
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentiles(valores, errores=0, segundos=None):
+    """Resumen de latencias en segundos: número, errores, ritmo (si hay duración) y p50/p95/p99/max en ms"""
+    valores = np.asarray(valores, dtype=float)
+    fila = {'peticiones': int(len(valores)), 'errores': int(errores)}
+    if segundos:
+        fila['rps'] = round(len(valores) / segundos, 2)
+    if len(valores):
+        p50, p95, p99 = np.percentile(valores, [50, 95, 99]) * 1000
+        fila.update({
+            'p50_ms': round(float(p50), 2),
+            'p95_ms': round(float(p95), 2),
+            'p99_ms': round(float(p99), 2),
+            'max_ms': round(float(valores.max()) * 1000, 2),
+        })
+    return fila
+
+
+def commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def entorno():
+    """Datos de la máquina y del código medido, para comparar resultados entre commits"""
+    return {
+        'fecha': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'commit': commit_actual(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'cpus': os.cpu_count(),
+        'sistema': platform.platform(),
+    }
+
+
+def guardar_json(resultado, ruta):
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+
+
+def cargar_json(ruta):
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def imprimir_tabla(filas, columnas):
+    """Tabla de texto: filas {nombre: {columna: valor}}"""
+    ancho = max([len(n) for n in filas] + [4])
+    anchos = [max([len(c)] + [len(str(f.get(c, '-'))) for f in filas.values()]) for c in columnas]
+    print(f"{'':<{ancho}}  " + "  ".join(f"{c:>{a}}" for c, a in zip(columnas, anchos)))
+    for nombre, fila in filas.items():
+        print(f"{nombre:<{ancho}}  " + "  ".join(f"{str(fila.get(c, '-')):>{a}}" for c, a in zip(columnas, anchos)))
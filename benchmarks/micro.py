@@ -0,0 +1,479 @@
+"""Micro-benchmarks de los caminos calientes: generación, filtros, análisis predictivo, tablas y lectura.
+
+Cada caso se mide repitiendo la llamada hasta cubrir un tiempo mínimo, con
+semillas fijas por caso (el resultado no depende de qué casos se elijan), y
+se informa de mediana, p95 y operaciones por segundo. El resultado se guarda
+en JSON y se puede comparar con uno anterior marcando las regresiones que
+superen un umbral (el código de salida es 1 si hay alguna).
+
+    python benchmarks/micro.py --salida base.json
+    python benchmarks/micro.py --casos generar --comparar base.json --umbral 0.15
+    python benchmarks/micro.py --comparar base.json nueva.json
+    python benchmarks/micro.py --escala 10000,100000,1000000 --tiempo 0.2 --salida escala.json
+
+Con --escala se generan históricos sintéticos (sintetico.py) de cada tamaño y
+se miden los casos que dependen del histórico, con el exponente de su curva.
+"""
+import argparse
+import io
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+from comun import RAIZ, cargar_json, entorno, guardar_json, imprimir_tabla
+
+sys.path.insert(0, RAIZ)
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+from estrategias import ESTRATEGIAS, obtener_estrategia  # noqa: E402
+
+CASOS = {}
+
+
+def caso(nombre, grupo, repeticiones_min=5, escala=False):
+    """Registra un caso: la función recibe el Contexto y devuelve la llamada a medir
+    (o (llamada, extras) si además informa de métricas propias). Los casos con
+    escala=True dependen del tamaño del histórico y entran en el modo --escala"""
+    def registrar(preparar):
+        CASOS[nombre] = {'grupo': grupo, 'preparar': preparar, 'repeticiones_min': repeticiones_min, 'escala': escala}
+        return preparar
+    return registrar
+
+
+class Contexto:
+    """Datos compartidos por los casos, cargados una vez y solo si algún caso los usa"""
+
+    def __init__(self, directorio, semilla):
+        self.directorio = directorio
+        self.semilla = semilla
+        self._datos = None
+        self._app = None
+
+    def rng(self, nombre):
+        return np.random.default_rng([self.semilla, zlib.crc32(nombre.encode('utf-8'))])
+
+    @property
+    def datos(self):
+        if self._datos is None:
+            from vigilante import EstadoDatos
+            self._datos = EstadoDatos(self.directorio)
+        return self._datos
+
+    @property
+    def app(self):
+        """El módulo app.py importado en modo bare (sin servidor; main() no se ejecuta)"""
+        if self._app is None:
+            from streamlit import logger as registro_streamlit
+            registro_streamlit.set_log_level("error")
+            directorio = os.getcwd()
+            os.chdir(RAIZ)  # app.py carga imágenes con rutas relativas al importarse
+            try:
+                import app
+            finally:
+                os.chdir(directorio)
+            self._app = app
+        return self._app
+
+    def ruta(self, archivo):
+        return os.path.join(self.directorio, archivo)
+
+
+# ============================================
+# 🎰 Generación
+# ============================================
+
+@caso('generar_candidata', 'generacion')
+def _generar_candidata(ctx):
+    rng = ctx.rng('generar_candidata')
+    return lambda: ctx.app.generar_candidata(rng)
+
+
+for _modo in ESTRATEGIAS:
+    def _generar_combinacion(ctx, modo=_modo):
+        rng, datos = ctx.rng(f'generar_combinacion[{modo}]'), ctx.datos
+        return lambda: ctx.app.generar_combinacion(modo, rng, datos)
+
+    def _generar_lote(ctx, modo=_modo):
+        rng, datos, estrategia = ctx.rng(f'generar_lote[{modo}]'), ctx.datos, obtener_estrategia(modo)
+        return lambda: estrategia.generar_lote(10_000, datos, rng), {'elementos': 10_000}
+
+    caso(f'generar_combinacion[{_modo}]', 'generacion', escala=True)(_generar_combinacion)
+    caso(f'generar_lote[{_modo}]', 'generacion')(_generar_lote)
+
+
+@caso('evaluar_estrategia', 'generacion', escala=True)
+def _evaluar_estrategia(ctx):
+    rng, datos, estrategia = ctx.rng('evaluar_estrategia'), ctx.datos, obtener_estrategia("Híbrido")
+    return lambda: estrategia.evaluar(100, datos, rng), {'elementos': 100 * len(datos.mascaras)}
+
+
+# Rejilla de filtros del formulario: (tipo, consecutivos, suma mínima, suma máxima, mínimo entre 1-25)
+REJILLA_FILTROS = [
+    (tipo, consecutivos, suma_min, suma_max, rango)
+    for tipo in ("Mezcla equilibrada", "Pares")
+    for consecutivos in ("Permitir consecutivos", "Evitar consecutivos")
+    for suma_min, suma_max in ((0, 500), (100, 150), (140, 145))
+    for rango in (0, 4)
+]
+
+for _tipo, _consecutivos, _suma_min, _suma_max, _rango in REJILLA_FILTROS:
+    def _generar_filtrada(ctx, tipo=_tipo, consecutivos=_consecutivos, suma_min=_suma_min, suma_max=_suma_max,
+                          rango=_rango):
+        from filtros import TOTAL_ESTRELLAS, TOTAL_NUMEROS, especificacion_formulario
+        from generador import filtro_ordenado
+        nombre = f'generar_filtrada[{tipo}|{consecutivos.split()[0]}|{suma_min}-{suma_max}|1-25>={rango}]'
+        rng = ctx.rng(nombre)
+        especificacion = especificacion_formulario(tipo, consecutivos, suma_min, suma_max, [], rango, 0)
+        factibles = filtro_ordenado(especificacion).contar_factibles()['total']
+        resultados = {'llamadas': 0, 'exitos': 0}
+
+        def llamada():
+            nums = ctx.app.generar_filtrada(tipo, consecutivos, suma_min, suma_max, [], rango, 0, rng=rng)[0]
+            resultados['llamadas'] += 1
+            resultados['exitos'] += nums is not None
+
+        return llamada, lambda: {
+            'aceptacion_%': round(100 * factibles / (TOTAL_NUMEROS * TOTAL_ESTRELLAS), 4),
+            'exito_%': round(100 * resultados['exitos'] / max(resultados['llamadas'], 1), 2),
+        }
+
+    caso(f'generar_filtrada[{_tipo}|{_consecutivos.split()[0]}|{_suma_min}-{_suma_max}|1-25>={_rango}]',
+         'filtros')(_generar_filtrada)
+
+
+# ============================================
+# 🔮 Análisis predictivo
+# ============================================
+
+def _combinaciones(rng, n):
+    nums = np.sort(np.argsort(rng.random((n, 50)), axis=1)[:, :5] + 1, axis=1)
+    estrellas = np.sort(np.argsort(rng.random((n, 12)), axis=1)[:, :2] + 1, axis=1)
+    return nums, estrellas
+
+
+@caso('predictor_construccion', 'prediccion', repeticiones_min=3, escala=True)
+def _predictor_construccion(ctx):
+    from simulador_predictivo import PredictorCombinaciones
+    datos = ctx.datos
+    return lambda: PredictorCombinaciones.desde_sorteos(datos.numeros, datos.estrellas)
+
+
+@caso('predictor_desde_texto', 'prediccion', repeticiones_min=3, escala=True)
+def _predictor_desde_texto(ctx):
+    from historico import ARCHIVO_MENSUAL
+    from simulador_predictivo import PredictorCombinaciones
+    with open(ctx.ruta(ARCHIVO_MENSUAL), encoding="utf-8") as f:
+        lineas = f.readlines()
+    return lambda: PredictorCombinaciones(lineas)
+
+
+@caso('predictor_tablas_lote', 'prediccion', escala=True)
+def _predictor_tablas(ctx):
+    predictor = ctx.datos.predictor
+
+    def llamada():
+        predictor.__dict__.pop('_tablas', None)
+        predictor._tablas_lote()
+    return llamada
+
+
+@caso('analizar_combinacion', 'prediccion', escala=True)
+def _analizar_combinacion(ctx):
+    from boletos import formatear_combinacion
+    predictor = ctx.datos.predictor
+    predictor._tablas_lote()
+    textos = [formatear_combinacion(n, e) for n, e in zip(*(m.tolist() for m in _combinaciones(ctx.rng('analizar'), 256)))]
+    indice = iter(range(10 ** 12))
+    return lambda: predictor.analizar_combinacion(textos[next(indice) % len(textos)])
+
+
+@caso('analizar_lote', 'prediccion', escala=True)
+def _analizar_lote(ctx):
+    predictor = ctx.datos.predictor
+    nums, estrellas = _combinaciones(ctx.rng('analizar_lote'), 10_000)
+    return lambda: predictor.analizar_lote(nums, estrellas), {'elementos': 10_000}
+
+
+# ============================================
+# 🗺️ Tablas cruzadas y mapa de calor
+# ============================================
+
+@caso('estadisticas_construccion', 'tablas', escala=True)
+def _estadisticas(ctx):
+    from estadisticas import EstadisticasIncrementales
+    datos = ctx.datos
+    return lambda: EstadisticasIncrementales(datos.fechas, datos.numeros, datos.estrellas)
+
+
+@caso('tabla_anual', 'tablas', escala=True)
+def _tabla_anual(ctx):
+    estadisticas = ctx.datos.estadisticas
+    return lambda: (estadisticas.tabla_anual('numeros'), estadisticas.tabla_anual('estrellas'))
+
+
+@caso('crosstab_pandas', 'tablas', escala=True)
+def _crosstab(ctx):
+    """Referencia: la misma tabla número × año con pd.crosstab sobre el formato largo"""
+    datos = ctx.datos
+    anios = np.repeat(pd.DatetimeIndex(datos.fechas).year.to_numpy(), 5)
+    numeros = np.asarray(datos.numeros).ravel()
+    return lambda: pd.crosstab(numeros, anios)
+
+
+@caso('mapa_calor_png', 'tablas', repeticiones_min=2, escala=True)
+def _mapa_calor(ctx):
+    from tareas import mapa_calor_png
+    tabla = ctx.datos.estadisticas.tabla_anual('numeros')
+    mapa_calor_png(tabla, "calentamiento")  # importa matplotlib/seaborn fuera de la medida
+    return lambda: mapa_calor_png(tabla, "Mapa de calor")
+
+
+# ============================================
+# 📄 Lectura de CSV/TXT
+# ============================================
+
+@caso('leer_historico_csv', 'lectura', escala=True)
+def _leer_historico(ctx):
+    from historico import ARCHIVO_CSV, cargar_sorteos
+    return lambda: cargar_sorteos(ctx.ruta(ARCHIVO_CSV))
+
+
+for _formato in ('csv', 'convertido', 'mensual'):
+    def _leer_texto(ctx, formato=_formato):
+        from registro_sorteos import ARCHIVOS_TEXTO, LECTORES
+        ruta = ctx.ruta(ARCHIVOS_TEXTO[formato])
+        return lambda: sum(1 for _ in LECTORES[formato](ruta))
+
+    caso(f'leer_registro[{_formato}]', 'lectura', escala=True)(_leer_texto)
+
+
+@caso('cargar_registro_bin', 'lectura', escala=True)
+def _cargar_registro(ctx):
+    from historico import ARCHIVO_BINARIO
+    from registro_sorteos import cargar_registro
+    return lambda: cargar_registro(ctx.ruta(ARCHIVO_BINARIO), verificar=True)
+
+
+def _texto_boletos(rng, n, formato):
+    nums, estrellas = _combinaciones(rng, n)
+    salida = io.StringIO()
+    if formato == 'csv':
+        salida.write("FECHA,N1,N2,N3,N4,N5,E1,E2\n")
+        for fila_n, fila_e in zip(nums.tolist(), estrellas.tolist()):
+            salida.write(f"01/01/2024,{','.join(map(str, fila_n))},{','.join(map(str, fila_e))}\n")
+    else:
+        for fila_n, fila_e in zip(nums.tolist(), estrellas.tolist()):
+            salida.write(f"{' - '.join(map(str, fila_n))} ⭐ {' - '.join(map(str, fila_e))}\n")
+    return salida.getvalue().encode('utf-8')
+
+
+for _formato in ('txt', 'csv'):
+    def _leer_boletos(ctx, formato=_formato):
+        from analisis_lote import leer_boletos
+        contenido = _texto_boletos(ctx.rng(f'leer_boletos[{formato}]'), 100_000, formato)
+        return lambda: leer_boletos(contenido), {'elementos': 100_000, 'bytes': len(contenido)}
+
+    caso(f'leer_boletos[{_formato}]', 'lectura')(_leer_boletos)
+
+
+@caso('importar_codigos', 'lectura')
+def _importar_codigos(ctx):
+    from boletos import exportar_codigos, importar_codigos
+    texto = exportar_codigos(ctx.rng('importar_codigos').integers(0, 139_838_160, 100_000))
+    return lambda: importar_codigos(texto), {'elementos': 100_000}
+
+
+# ============================================
+# ⏱️ Medida
+# ============================================
+
+def medir(llamada, tiempo_minimo, repeticiones_min, repeticiones_max=1_000_000, maximo=None):
+    """Tiempos (s) de llamadas sucesivas hasta cubrir tiempo_minimo y repeticiones_min, tras una de calentamiento.
+
+    Si la llamada de calentamiento ya tarda más de maximo segundos, se usa como única medida.
+    """
+    reloj = time.perf_counter
+    inicio = reloj()
+    llamada()
+    calentamiento = reloj() - inicio
+    if maximo is not None and calentamiento > maximo:
+        return np.array([calentamiento])
+    tiempos = []
+    limite = reloj() + tiempo_minimo
+    while len(tiempos) < repeticiones_max and (len(tiempos) < repeticiones_min or reloj() < limite):
+        inicio = reloj()
+        llamada()
+        tiempos.append(reloj() - inicio)
+    return np.array(tiempos)
+
+
+def resumir(tiempos, extras):
+    mediana = float(np.median(tiempos))
+    fila = {
+        'repeticiones': int(len(tiempos)),
+        'mediana_us': round(mediana * 1e6, 2),
+        'p95_us': round(float(np.percentile(tiempos, 95)) * 1e6, 2),
+        'min_us': round(float(tiempos.min()) * 1e6, 2),
+        'ops_s': round(1 / mediana, 1) if mediana else None,
+    }
+    if 'elementos' in extras:
+        fila['elementos_s'] = round(extras['elementos'] / mediana) if mediana else None
+    fila.update(extras)
+    return fila
+
+
+def seleccionar(patron, solo_escala=False):
+    return [nombre for nombre, definicion in CASOS.items()
+            if (not solo_escala or definicion['escala'])
+            and (not patron or re.search(patron, nombre) or re.search(patron, definicion['grupo']))]
+
+
+def ejecutar(nombres, directorio, semilla, tiempo_minimo, maximo=None, repeticiones_min=None):
+    ctx = Contexto(directorio, semilla)
+    resultados = {}
+    for nombre in nombres:
+        definicion = CASOS[nombre]
+        preparado = definicion['preparar'](ctx)
+        llamada, extras = preparado if isinstance(preparado, tuple) else (preparado, {})
+        tiempos = medir(llamada, tiempo_minimo, repeticiones_min or definicion['repeticiones_min'], maximo=maximo)
+        resultados[nombre] = {'grupo': definicion['grupo'], **resumir(tiempos, extras() if callable(extras) else extras)}
+        fila = resultados[nombre]
+        print(f"{nombre:<60} {fila['mediana_us']:>12} µs  (p95 {fila['p95_us']} µs, {fila['repeticiones']} rep.)",
+              flush=True)
+    return resultados
+
+
+# ============================================
+# 📈 Modo escala: curvas de complejidad con históricos sintéticos
+# ============================================
+
+def exponente(tamanos, tiempos):
+    """Pendiente log-log (t ∝ n^k) por mínimos cuadrados; None con menos de dos puntos"""
+    if len(tamanos) < 2:
+        return None
+    return round(float(np.polyfit(np.log(tamanos), np.log(tiempos), 1)[0]), 2)
+
+
+def escala(tamanos, patron, semilla, tiempo_minimo, maximo):
+    """Mide los casos que dependen del histórico con históricos sintéticos de cada tamaño.
+
+    Un caso que pasa de maximo segundos por llamada no se mide en los tamaños
+    siguientes: es el que primero se rompe al crecer los datos.
+    """
+    from sintetico import escribir_historico, generar_sorteos
+    activos = seleccionar(patron, solo_escala=True)
+    medidas = {nombre: {} for nombre in activos}
+    with tempfile.TemporaryDirectory(prefix="elottoia_escala_") as temporal:
+        for tam in tamanos:
+            if not activos:
+                break
+            directorio = os.path.join(temporal, str(tam))
+            inicio = time.perf_counter()
+            escribir_historico(generar_sorteos(tam, semilla), directorio)
+            print(f"\n— {tam} sorteos (histórico sintético escrito en {time.perf_counter() - inicio:.1f} s)", flush=True)
+            # Con históricos grandes basta una repetición tras el calentamiento si no hay tiempo para más
+            filas = ejecutar(activos, directorio, semilla, tiempo_minimo, maximo, repeticiones_min=1)
+            for nombre, fila in filas.items():
+                medidas[nombre][tam] = fila
+            activos = [nombre for nombre in activos if medidas[nombre][tam]['mediana_us'] <= maximo * 1e6]
+            shutil.rmtree(directorio)
+
+    curvas = {}
+    for nombre, por_tamano in medidas.items():
+        medidos = sorted(por_tamano)
+        curvas[nombre] = {
+            'grupo': CASOS[nombre]['grupo'],
+            'mediana_ms': {str(tam): round(por_tamano[tam]['mediana_us'] / 1000, 3) for tam in medidos},
+            'exponente': exponente(medidos, [por_tamano[tam]['mediana_us'] for tam in medidos]),
+            'detalle': {str(tam): por_tamano[tam] for tam in medidos},
+        }
+    filas = {nombre: {**curva['mediana_ms'], 'exponente': curva['exponente']} for nombre, curva in curvas.items()}
+    print("\nMediana (ms) por número de sorteos y exponente k de t ∝ n^k:")
+    imprimir_tabla(filas, [str(tam) for tam in tamanos] + ['exponente'])
+    return curvas
+
+
+# ============================================
+# 📊 Comparación
+# ============================================
+
+def comparar(base, nueva, umbral):
+    """Tabla de medianas base → nueva; devuelve los casos cuya mediana empeora más que el umbral"""
+    filas, regresiones = {}, []
+    for nombre, fila in nueva['casos'].items():
+        previa = base['casos'].get(nombre)
+        if previa is None:
+            continue
+        cambio = fila['mediana_us'] / previa['mediana_us'] - 1 if previa['mediana_us'] else 0.0
+        estado = "REGRESIÓN" if cambio > umbral else "mejora" if cambio < -umbral else "="
+        if estado == "REGRESIÓN":
+            regresiones.append(nombre)
+        filas[nombre] = {
+            'base_us': previa['mediana_us'],
+            'nueva_us': fila['mediana_us'],
+            'cambio': f"{100 * cambio:+.1f}%",
+            'estado': estado,
+        }
+    print(f"\nbase: {base.get('commit')} ({base.get('fecha')})  ·  nueva: {nueva.get('commit')} ({nueva.get('fecha')})"
+          f"  ·  umbral {100 * umbral:.0f}%")
+    imprimir_tabla(filas, ['base_us', 'nueva_us', 'cambio', 'estado'])
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--casos", help="expresión regular sobre el nombre o el grupo de los casos")
+    parser.add_argument("--listar", action="store_true", help="muestra los casos disponibles")
+    parser.add_argument("--directorio", default=RAIZ, help="directorio con los archivos de histórico")
+    parser.add_argument("--semilla", type=int, default=12345)
+    parser.add_argument("--tiempo", type=float, default=0.5, help="segundos mínimos de medida por caso")
+    parser.add_argument("--salida", help="guarda el resultado en JSON")
+    parser.add_argument("--comparar", nargs='+', metavar="JSON",
+                        help="BASE [NUEVA]: compara con BASE el resultado NUEVA o, si no se da, una medida nueva")
+    parser.add_argument("--umbral", type=float, default=0.10, help="empeoramiento relativo que cuenta como regresión")
+    parser.add_argument("--escala", help="tamaños de histórico sintético separados por comas, p. ej. 10000,100000,1000000")
+    parser.add_argument("--maximo", type=float, default=60.0,
+                        help="en --escala, segundos por llamada a partir de los que un caso deja de medirse")
+    argumentos = parser.parse_args()
+
+    if argumentos.listar:
+        for nombre, definicion in CASOS.items():
+            print(f"{definicion['grupo']:<12} {nombre}{'  (escala)' if definicion['escala'] else ''}")
+        return 0
+
+    if argumentos.escala:
+        tamanos = sorted(int(t) for t in argumentos.escala.split(',') if t.strip())
+        resultado = {
+            **entorno(),
+            'parametros': {'semilla': argumentos.semilla, 'tiempo': argumentos.tiempo, 'casos': argumentos.casos,
+                           'tamanos': tamanos, 'maximo': argumentos.maximo},
+            'escala': escala(tamanos, argumentos.casos, argumentos.semilla, argumentos.tiempo, argumentos.maximo),
+        }
+        if argumentos.salida:
+            guardar_json(resultado, argumentos.salida)
+        return 0
+
+    if argumentos.comparar and len(argumentos.comparar) > 1:
+        nueva = cargar_json(argumentos.comparar[1])
+    else:
+        nueva = {
+            **entorno(),
+            'parametros': {'semilla': argumentos.semilla, 'tiempo': argumentos.tiempo, 'casos': argumentos.casos,
+                           'directorio': os.path.abspath(argumentos.directorio)},
+            'casos': ejecutar(seleccionar(argumentos.casos), argumentos.directorio, argumentos.semilla, argumentos.tiempo),
+        }
+        if argumentos.salida:
+            guardar_json(nueva, argumentos.salida)
+    if argumentos.comparar:
+        regresiones = comparar(cargar_json(argumentos.comparar[0]), nueva, argumentos.umbral)
+        if regresiones:
+            print(f"\n{len(regresiones)} regresiones por encima del {100 * argumentos.umbral:.0f}%: {', '.join(regresiones)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
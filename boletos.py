@@ -0,0 +1,116 @@
+import base64
+import numpy as np
+from math import comb
+
+# Tabla de bits activos para cualquier valor de 16 bits (popcount por consulta)
+_BITS_16 = np.array([bin(i).count("1") for i in range(1 << 16)], dtype=np.uint8)
+
+
+def contar_bits(mascaras):
+    """Cuenta los bits activos de un array de máscaras enteras (hasta 64 bits)"""
+    mascaras = np.asarray(mascaras)
+    mascaras = mascaras.astype(np.uint32 if mascaras.dtype.itemsize <= 4 else np.uint64, copy=False)
+    if hasattr(np, 'bitwise_count'):  # numpy >= 2.0
+        return np.bitwise_count(mascaras)
+    trozos = _BITS_16[np.ascontiguousarray(mascaras).view(np.uint16)]
+    trozos = trozos.reshape(mascaras.shape + (mascaras.dtype.itemsize // 2,))
+    total = trozos[..., 0].copy()
+    for i in range(1, trozos.shape[-1]):
+        total += trozos[..., i]
+    return total
+
+
+def formatear_combinacion(nums, estrellas):
+    """Devuelve la combinación con el formato de la app: '1 - 2 - 3 - 4 - 5 ⭐ 1 - 2'"""
+    return f"{' - '.join(map(str, nums))} ⭐ {' - '.join(map(str, estrellas))}"
+
+
+def parsear_combinacion(combinacion):
+    """Inverso de formatear_combinacion: devuelve (números, estrellas) ordenados"""
+    partes = combinacion.split('⭐')
+    nums = sorted(int(x) for x in partes[0].split('-') if x.strip())
+    estrellas = sorted(int(x) for x in partes[1].split('-') if x.strip())
+    return nums, estrellas
+
+
+# Máscaras de 64 bits: bits 0-49 para los números, bits 50-61 para las estrellas
+MASCARA_NUMEROS = np.uint64((1 << 50) - 1)
+
+
+def mascaras_boletos(nums, estrellas=None):
+    """Codifica boletos (filas de números y estrellas) como máscaras uint64"""
+    nums = np.atleast_2d(np.asarray(nums, dtype=np.uint64))
+    mascaras = np.bitwise_or.reduce(np.left_shift(np.uint64(1), nums - np.uint64(1)), axis=1)
+    if estrellas is not None:
+        estrellas = np.atleast_2d(np.asarray(estrellas, dtype=np.uint64))
+        mascaras |= np.bitwise_or.reduce(np.left_shift(np.uint64(1), estrellas + np.uint64(49)), axis=1)
+    return mascaras
+
+
+def todas_las_combinaciones(n=50, k=5):
+    """Matriz (C(n, k), k) con todas las combinaciones en orden lexicográfico"""
+    combos = np.arange(1, n + 1, dtype=np.int8)[:, None]
+    for _ in range(k - 1):
+        ultimo = combos[:, -1].astype(np.int64)
+        cuantos = n - ultimo
+        desplazamiento = np.arange(cuantos.sum()) - np.repeat(np.cumsum(cuantos) - cuantos, cuantos)
+        siguiente = np.repeat(ultimo, cuantos) + 1 + desplazamiento
+        combos = np.column_stack([np.repeat(combos, cuantos, axis=0), siguiente.astype(np.int8)])
+    return combos
+
+
+# ============================================
+# 🔢 Codificación compacta de boletos
+# ============================================
+# Cada boleto es un entero en [0, 2.118.760 * 66): rango combinatorio (colex)
+# de los números * 66 + rango de las estrellas. Cabe en un int32.
+
+_COMB = np.array([[comb(v, k) for k in range(6)] for v in range(51)], dtype=np.int64)
+TOTAL_CODIGOS = comb(50, 5) * comb(12, 2)
+
+
+def codificar(nums, estrellas):
+    """Codifica boletos (filas de números y estrellas) como enteros únicos"""
+    nums = np.sort(np.atleast_2d(np.asarray(nums, dtype=np.int64)), axis=1) - 1
+    estrellas = np.sort(np.atleast_2d(np.asarray(estrellas, dtype=np.int64)), axis=1) - 1
+    rango_nums = sum(_COMB[nums[:, i], i + 1] for i in range(5))
+    rango_estrellas = _COMB[estrellas[:, 0], 1] + _COMB[estrellas[:, 1], 2]
+    return rango_nums * 66 + rango_estrellas
+
+
+def _decodificar_rango(rangos, k):
+    salida = np.empty((len(rangos), k), dtype=np.int8)
+    rangos = rangos.copy()
+    for i in range(k, 0, -1):
+        columna = _COMB[:, i]
+        v = np.searchsorted(columna, rangos, side='right') - 1
+        salida[:, i - 1] = v + 1
+        rangos -= columna[v]
+    return salida
+
+
+def decodificar(codigos):
+    """Inverso de codificar: devuelve (números, estrellas) como matrices ordenadas"""
+    codigos = np.atleast_1d(np.asarray(codigos, dtype=np.int64))
+    rango_nums, rango_estrellas = np.divmod(codigos, 66)
+    return _decodificar_rango(rango_nums, 5), _decodificar_rango(rango_estrellas, 2)
+
+
+def texto_a_codigo(combinacion):
+    return int(codificar(*parsear_combinacion(combinacion))[0])
+
+
+def codigo_a_texto(codigo):
+    nums, estrellas = decodificar(codigo)
+    return formatear_combinacion(nums[0].tolist(), estrellas[0].tolist())
+
+
+def exportar_codigos(codigos):
+    """Serializa una lista de boletos como texto base64 (4 bytes por boleto)"""
+    return base64.urlsafe_b64encode(np.asarray(codigos, dtype='<i4').tobytes()).decode('ascii')
+
+
+def importar_codigos(texto):
+    """Inverso de exportar_codigos; ignora códigos fuera de rango"""
+    codigos = np.frombuffer(base64.urlsafe_b64decode(texto.strip().encode('ascii')), dtype='<i4')
+    return [int(c) for c in codigos if 0 <= c < TOTAL_CODIGOS]
@@ -0,0 +1,235 @@
+import math
+import numpy as np
+import pandas as pd
+from significancia import estrellas_en_juego
+
+MAX_RETARDO = 10
+
+
+# ============================================
+# 📐 Distribuciones (sin scipy)
+# ============================================
+
+def _gamma_inferior_serie(a, x):
+    termino = suma = 1.0 / a
+    n = a
+    for _ in range(10000):
+        n += 1
+        termino *= x / n
+        suma += termino
+        if abs(termino) < abs(suma) * 1e-15:
+            break
+    return suma * math.exp(-x + a * math.log(x) - math.lgamma(a))
+
+
+def _gamma_superior_fraccion(a, x):
+    # Fracción continua de Lentz para Q(a, x)
+    pequeno = 1e-300
+    b = x + 1 - a
+    c = 1 / pequeno
+    d = 1 / b
+    h = d
+    for i in range(1, 10000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = pequeno if abs(d) < pequeno else d
+        c = b + an / c
+        c = pequeno if abs(c) < pequeno else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+    return math.exp(-x + a * math.log(x) - math.lgamma(a)) * h
+
+
+def chi2_sf(x, df):
+    """P(X >= x) para X ~ chi-cuadrado con df grados de libertad"""
+    if x <= 0:
+        return 1.0
+    a, x = df / 2, x / 2
+    if x < a + 1:
+        return max(0.0, 1 - _gamma_inferior_serie(a, x))
+    return _gamma_superior_fraccion(a, x)
+
+
+_ERFC = np.frompyfunc(math.erfc, 1, 1)
+
+
+def normal_dos_colas(z):
+    """p-valor bilateral de una o varias puntuaciones z"""
+    return _ERFC(np.abs(np.asarray(z, dtype=float)) / math.sqrt(2)).astype(float)
+
+
+# ============================================
+# 🔬 Contrastes
+# ============================================
+
+def _incidencia(nums, total=50):
+    nums = np.asarray(nums, dtype=np.int64)
+    incidencia = np.zeros((len(nums), total), dtype=np.float32)
+    incidencia[np.arange(len(nums))[:, None], nums - 1] = 1
+    return incidencia
+
+
+def _factor_sin_reemplazo(total, extraidos):
+    """Corrige el chi-cuadrado de categorías extraídas sin reemplazo (m de N por sorteo)"""
+    return (total - 1) / (total - extraidos)
+
+
+def bondad_ajuste(conteos, sorteos, total, extraidos):
+    """Chi-cuadrado de uniformidad de los conteos de N elementos con m extraídos por sorteo"""
+    esperado = sorteos * extraidos / total
+    residuos = (conteos - esperado) / math.sqrt(esperado) if esperado > 0 else np.zeros(len(conteos))
+    chi2 = float((residuos ** 2).sum()) * _factor_sin_reemplazo(total, extraidos)
+    return chi2, total - 1, residuos
+
+
+def ajuste_numeros(nums):
+    """Bondad de ajuste de los 50 números: estadístico global y residuo de cada número"""
+    conteos = _incidencia(nums).sum(axis=0)
+    chi2, gl, residuos = bondad_ajuste(conteos, len(nums), 50, 5)
+    tabla = pd.DataFrame({
+        'Número': np.arange(1, 51),
+        'Observado': conteos.astype(np.int64),
+        'Esperado': round(len(nums) * 5 / 50, 2),
+        'Residuo': np.round(residuos, 2),
+    })
+    return {'chi2': chi2, 'gl': gl, 'p': chi2_sf(chi2, gl)}, tabla
+
+
+def ajuste_estrellas(estrellas, fechas):
+    """Bondad de ajuste de las estrellas, por separado en cada etapa (9, 11 y 12 estrellas en juego)"""
+    estrellas = np.asarray(estrellas, dtype=np.int64)
+    en_juego = estrellas_en_juego(fechas)
+    filas = []
+    for total in np.unique(en_juego):
+        sel = en_juego == total
+        conteos = np.bincount(estrellas[sel].ravel() - 1, minlength=total)[:total]
+        chi2, gl, _ = bondad_ajuste(conteos, int(sel.sum()), int(total), 2)
+        filas.append({'Estrellas en juego': int(total), 'Sorteos': int(sel.sum()),
+                      'Chi²': round(chi2, 2), 'gl': gl, 'p': chi2_sf(chi2, gl)})
+    tabla = pd.DataFrame(filas)
+    chi2, gl = float(tabla['Chi²'].sum()) if len(tabla) else 0.0, int(tabla['gl'].sum()) if len(tabla) else 0
+    return {'chi2': chi2, 'gl': gl, 'p': chi2_sf(chi2, gl) if gl else 1.0}, tabla
+
+
+def ajuste_por_anio(nums, fechas):
+    """Chi-cuadrado de uniformidad de los números en cada año y de homogeneidad entre años"""
+    anios = np.asarray(fechas, dtype='datetime64[Y]').astype(np.int64) + 1970
+    lista, idx = np.unique(anios, return_inverse=True)
+    incidencia = _incidencia(nums)
+    conteos = np.zeros((len(lista), 50))
+    np.add.at(conteos, idx.ravel(), incidencia)
+    sorteos = np.bincount(idx.ravel(), minlength=len(lista))
+
+    esperado = sorteos[:, None] * 5 / 50
+    chi2_anual = ((conteos - esperado) ** 2 / esperado).sum(axis=1) * _factor_sin_reemplazo(50, 5)
+    tabla = pd.DataFrame({
+        'Año': lista, 'Sorteos': sorteos, 'Chi²': np.round(chi2_anual, 2), 'gl': 49,
+        'p': [chi2_sf(c, 49) for c in chi2_anual],
+    })
+
+    # Homogeneidad: ¿la distribución de números cambia de un año a otro?
+    esperado_h = sorteos[:, None] * conteos.sum(axis=0)[None, :] / max(sorteos.sum(), 1)
+    chi2_h = float(((conteos - esperado_h) ** 2 / np.where(esperado_h > 0, esperado_h, 1)).sum()) * _factor_sin_reemplazo(50, 5)
+    gl_h = 49 * (len(lista) - 1)
+    return {'chi2': chi2_h, 'gl': gl_h, 'p': chi2_sf(chi2_h, gl_h) if gl_h else 1.0}, tabla
+
+
+def rachas(secuencias):
+    """Prueba de rachas de Wald-Wolfowitz sobre columnas binarias (sorteos, series)"""
+    secuencias = np.asarray(secuencias, dtype=bool)
+    n = len(secuencias)
+    n1 = secuencias.sum(axis=0).astype(float)
+    n2 = n - n1
+    r = 1 + (secuencias[1:] != secuencias[:-1]).sum(axis=0)
+    media = 2 * n1 * n2 / np.maximum(n, 1) + 1
+    varianza = 2 * n1 * n2 * (2 * n1 * n2 - n) / np.maximum(n ** 2 * (n - 1), 1)
+    z = np.divide(r - media, np.sqrt(varianza), out=np.zeros(len(n1)), where=varianza > 0)
+    return r, media, z, normal_dos_colas(z)
+
+
+def rachas_numeros(nums):
+    """Rachas de presencia/ausencia de cada número a lo largo de los sorteos"""
+    r, media, z, p = rachas(_incidencia(nums) > 0)
+    return pd.DataFrame({
+        'Número': np.arange(1, 51), 'Rachas': r, 'Esperadas': np.round(media, 1),
+        'z': np.round(z, 2), 'p': np.round(p, 4),
+    })
+
+
+def rachas_suma(nums):
+    """Rachas de la suma de cada sorteo por encima/por debajo de la mediana"""
+    sumas = np.asarray(nums, dtype=np.int64).sum(axis=1)
+    sobre = sumas[sumas != np.median(sumas)] > np.median(sumas)
+    r, media, z, p = rachas(sobre[:, None])
+    return {'rachas': int(r[0]), 'esperadas': float(media[0]), 'z': float(z[0]), 'p': float(p[0])}
+
+
+def solapamiento_retardado(nums, max_retardo=MAX_RETARDO):
+    """Números compartidos entre el sorteo t y el t+k; bajo independencia la media es 0,5"""
+    incidencia = _incidencia(nums)
+    media_nula = 5 * 5 / 50
+    varianza_nula = 5 * (5 / 50) * (45 / 50) * (45 / 49)  # hipergeométrica
+    filas = []
+    for k in range(1, min(max_retardo, len(incidencia) - 1) + 1):
+        comunes = (incidencia[:-k] * incidencia[k:]).sum(axis=1)
+        z = (comunes.mean() - media_nula) / math.sqrt(varianza_nula / len(comunes))
+        filas.append({'Retardo': k, 'Pares de sorteos': len(comunes), 'Media en común': round(float(comunes.mean()), 4),
+                      'Esperada': media_nula, 'z': round(float(z), 2)})
+    tabla = pd.DataFrame(filas)
+    if len(tabla):
+        tabla['p'] = np.round(normal_dos_colas(tabla['z']), 4)
+    return tabla
+
+
+def matriz_transicion(nums):
+    """Veces que el número b sale en el sorteo siguiente a uno con el número a, y contraste de independencia"""
+    incidencia = _incidencia(nums)
+    observada = incidencia[:-1].T @ incidencia[1:]
+    pasos = max(len(incidencia) - 1, 1)
+    esperada = incidencia[:-1].sum(axis=0)[:, None] * incidencia[1:].sum(axis=0)[None, :] / pasos
+    chi2 = float(((observada - esperada) ** 2 / np.where(esperada > 0, esperada, 1)).sum()) * _factor_sin_reemplazo(50, 5) ** 2
+    gl = 49 * 49
+    transicion = pd.DataFrame(observada.astype(np.int64), index=range(1, 51), columns=range(1, 51))
+    residuos = pd.DataFrame(np.round((observada - esperada) / np.sqrt(np.where(esperada > 0, esperada, 1)), 2),
+                            index=range(1, 51), columns=range(1, 51))
+    return {'chi2': chi2, 'gl': gl, 'p': chi2_sf(chi2, gl)}, transicion, residuos
+
+
+def diagnosticar(nums, estrellas, fechas):
+    """Todos los contrastes de aleatoriedad del histórico (sorteos en orden cronológico)"""
+    resumen_numeros, tabla_numeros = ajuste_numeros(nums)
+    resumen_estrellas, tabla_estrellas = ajuste_estrellas(estrellas, fechas)
+    resumen_anios, tabla_anios = ajuste_por_anio(nums, fechas)
+    resumen_transicion, transicion, residuos = matriz_transicion(nums)
+    tabla_rachas = rachas_numeros(nums)
+    suma = rachas_suma(nums)
+    retardos = solapamiento_retardado(nums)
+    resumen = pd.DataFrame([
+        {'Contraste': "Uniformidad de los números (χ²)", 'Estadístico': resumen_numeros['chi2'],
+         'gl': resumen_numeros['gl'], 'p': resumen_numeros['p']},
+        {'Contraste': "Uniformidad de las estrellas por etapa (χ²)", 'Estadístico': resumen_estrellas['chi2'],
+         'gl': resumen_estrellas['gl'], 'p': resumen_estrellas['p']},
+        {'Contraste': "Homogeneidad de los números entre años (χ²)", 'Estadístico': resumen_anios['chi2'],
+         'gl': resumen_anios['gl'], 'p': resumen_anios['p']},
+        {'Contraste': "Independencia entre sorteos consecutivos (χ² de transiciones)", 'Estadístico': resumen_transicion['chi2'],
+         'gl': resumen_transicion['gl'], 'p': resumen_transicion['p']},
+        {'Contraste': "Rachas de la suma sobre/bajo la mediana (z)", 'Estadístico': suma['z'], 'gl': None, 'p': suma['p']},
+        {'Contraste': "Números con rachas anómalas (p < 0,05)", 'Estadístico': int((tabla_rachas['p'] < 0.05).sum()),
+         'gl': None, 'p': None},
+    ])
+    resumen['Estadístico'] = resumen['Estadístico'].astype(float).round(2)
+    resumen['p'] = resumen['p'].astype(float).round(4)
+    return {
+        'resumen': resumen,
+        'numeros': tabla_numeros,
+        'estrellas': tabla_estrellas,
+        'anios': tabla_anios,
+        'rachas': tabla_rachas,
+        'retardos': retardos,
+        'transicion': transicion,
+        'residuos_transicion': residuos,
+    }
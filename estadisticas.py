@@ -0,0 +1,148 @@
+import threading
+import numpy as np
+import pandas as pd
+
+# Elementos de un sorteo: índices 0-49 para los números 1-50, 50-61 para las estrellas 1-12
+ELEMENTOS = 62
+DESPLAZAMIENTO_ESTRELLAS = 50
+
+
+def indices_sorteo(nums, estrellas):
+    """Índices de elemento (0-61) de uno o varios sorteos"""
+    nums = np.atleast_2d(np.asarray(nums, dtype=np.int64))
+    estrellas = np.atleast_2d(np.asarray(estrellas, dtype=np.int64))
+    return np.hstack([nums - 1, estrellas - 1 + DESPLAZAMIENTO_ESTRELLAS])
+
+
+class FilasCrecientes:
+    """Array que crece por filas con capacidad de reserva: anexar cuesta O(1) amortizado.
+
+    Cada instantánea guarda una vista de las primeras filas. Solo se escribe
+    más allá de las filas ya entregadas, así que las vistas anteriores no
+    cambian; anexar desde una vista que no es la última copia el array.
+    """
+
+    def __init__(self, datos):
+        self._datos = datos
+        self._usadas = len(datos)
+        self._lock = threading.Lock()
+
+    def anexar(self, n, filas):
+        """(búfer, vista de las n primeras filas seguidas de filas)"""
+        filas = np.asarray(filas, dtype=self._datos.dtype)
+        total = n + len(filas)
+        with self._lock:
+            if n == self._usadas and total <= len(self._datos):
+                self._datos[n:total] = filas
+                self._usadas = total
+                return self, self._datos[:total]
+        datos = np.empty((max(2 * total, 16),) + self._datos.shape[1:], dtype=self._datos.dtype)
+        datos[:n] = self._datos[:n]
+        datos[n:total] = filas
+        nuevo = FilasCrecientes(datos)
+        nuevo._usadas = total
+        return nuevo, datos[:total]
+
+
+class EstadisticasIncrementales:
+    """Estadísticas del histórico que se actualizan sorteo a sorteo sin recalcular.
+
+    - frecuencia: apariciones de cada elemento
+    - coapariciones: matriz (62, 62) de sorteos en los que coinciden dos elementos
+    - anios: {año: matriz (12, 62)} de apariciones por mes (el cubo año/mes)
+    - ultima_aparicion: índice del último sorteo en que salió cada elemento (-1 si nunca)
+    """
+
+    def __init__(self, fechas=None, nums=None, estrellas=None):
+        self.sorteos = 0
+        self.frecuencia = np.zeros(ELEMENTOS, dtype=np.int64)
+        self.coapariciones = np.zeros((ELEMENTOS, ELEMENTOS), dtype=np.int32)
+        self.anios = {}
+        self.ultima_aparicion = np.full(ELEMENTOS, -1, dtype=np.int64)
+        if fechas is not None and len(fechas):
+            self._construir(np.asarray(fechas, dtype='datetime64[D]'), indices_sorteo(nums, estrellas))
+
+    def _construir(self, fechas, indices):
+        n = len(indices)
+        incidencia = np.zeros((n, ELEMENTOS), dtype=np.int32)
+        incidencia[np.arange(n)[:, None], indices] = 1
+        self.sorteos = n
+        self.frecuencia = incidencia.sum(axis=0, dtype=np.int64)
+        self.coapariciones = incidencia.T @ incidencia
+
+        anios = fechas.astype('datetime64[Y]').astype(np.int64) + 1970
+        meses = fechas.astype('datetime64[M]').astype(np.int64) % 12
+        for anio in np.unique(anios):
+            sel = anios == anio
+            cubo = np.zeros((12, ELEMENTOS), dtype=np.int32)
+            np.add.at(cubo, (np.repeat(meses[sel], indices.shape[1]), indices[sel].ravel()), 1)
+            self.anios[int(anio)] = cubo
+
+        salio = incidencia[::-1].astype(bool)
+        self.ultima_aparicion = np.where(salio.any(axis=0), n - 1 - salio.argmax(axis=0), -1)
+
+    def agregar(self, fecha, nums, estrellas):
+        """Suma un sorteo (posterior a los ya contados) a todas las estadísticas"""
+        fecha = np.datetime64(fecha, 'D')
+        indices = indices_sorteo(nums, estrellas)[0]
+        self.frecuencia[indices] += 1
+        self.coapariciones[np.ix_(indices, indices)] += 1
+        anio = int(fecha.astype('datetime64[Y]').astype(np.int64)) + 1970
+        mes = int(fecha.astype('datetime64[M]').astype(np.int64)) % 12
+        # Los cubos se comparten con las copias: se sustituye el del año en lugar de modificarlo
+        cubo = self.anios[anio].copy() if anio in self.anios else np.zeros((12, ELEMENTOS), dtype=np.int32)
+        cubo[mes, indices] += 1
+        self.anios[anio] = cubo
+        self.ultima_aparicion[indices] = self.sorteos
+        self.sorteos += 1
+
+    def copia(self):
+        nueva = EstadisticasIncrementales()
+        nueva.sorteos = self.sorteos
+        nueva.frecuencia = self.frecuencia.copy()
+        nueva.coapariciones = self.coapariciones.copy()
+        nueva.anios = dict(self.anios)
+        nueva.ultima_aparicion = self.ultima_aparicion.copy()
+        return nueva
+
+    @staticmethod
+    def _rango(tipo):
+        return slice(0, 50) if tipo == "numeros" else slice(DESPLAZAMIENTO_ESTRELLAS, ELEMENTOS)
+
+    @staticmethod
+    def _etiquetas(tipo):
+        return range(1, 51) if tipo == "numeros" else range(1, 13)
+
+    def frecuencias(self, tipo="numeros"):
+        """Serie de apariciones indexada por número (o estrella)"""
+        return pd.Series(self.frecuencia[self._rango(tipo)], index=self._etiquetas(tipo))
+
+    def ranking(self, tipo="numeros"):
+        """Apariciones de más a menos frecuente; a igual frecuencia, el número (o estrella) menor primero"""
+        conteo = self.frecuencia[self._rango(tipo)]
+        orden = np.argsort(-conteo, kind='stable')
+        return pd.Series(conteo[orden], index=np.asarray(self._etiquetas(tipo))[orden])
+
+    def huecos(self, tipo="numeros"):
+        """Sorteos transcurridos desde la última aparición de cada número (o estrella)"""
+        huecos = self.sorteos - 1 - self.ultima_aparicion[self._rango(tipo)]
+        return pd.Series(huecos, index=self._etiquetas(tipo))
+
+    def matriz_pares(self, tipo="numeros"):
+        """Coapariciones entre números (o entre estrellas) como DataFrame simétrico"""
+        rango = self._rango(tipo)
+        etiquetas = self._etiquetas(tipo)
+        return pd.DataFrame(self.coapariciones[rango, rango], index=etiquetas, columns=etiquetas)
+
+    def tabla_anual(self, tipo="numeros"):
+        """Apariciones por año (filas: número o estrella, columnas: año)"""
+        anios = sorted(self.anios)
+        if not anios:
+            return pd.DataFrame(index=self._etiquetas(tipo))
+        tabla = np.stack([self.anios[a].sum(axis=0) for a in anios], axis=1)[self._rango(tipo)]
+        return pd.DataFrame(tabla, index=self._etiquetas(tipo), columns=anios)
+
+    def tabla_mensual(self, anio, tipo="numeros"):
+        """Apariciones por mes de un año (filas: número o estrella, columnas: mes 1-12)"""
+        cubo = self.anios.get(anio, np.zeros((12, ELEMENTOS), dtype=np.int32))
+        return pd.DataFrame(cubo.T[self._rango(tipo)], index=self._etiquetas(tipo), columns=range(1, 13))
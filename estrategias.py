@@ -0,0 +1,237 @@
+import threading
+import weakref
+from abc import ABC, abstractmethod
+from collections import namedtuple
+import numpy as np
+from metricas import obtener_metricas
+from premios import CATEGORIAS, premios_historicos
+
+NUMEROS = np.arange(1, 51)
+ESTRELLAS = np.arange(1, 13)
+
+# ============================================
+# 🧭 Estrategias de generación
+# ============================================
+# Cada estrategia declara sus parámetros y precalcula sus tablas de muestreo
+# (frecuentes, pesos...) una sola vez por instantánea del histórico; generar un
+# boleto o un lote solo muestrea sobre esas tablas.
+
+Parametro = namedtuple('Parametro', 'nombre defecto minimo maximo descripcion')
+
+ESTRATEGIAS = {}  # nombre -> clase, en el orden en que se muestran en la barra lateral
+_alias = {}
+_por_defecto = {}  # nombre -> instancia con los parámetros por defecto
+_tablas = weakref.WeakKeyDictionary()  # EstadoDatos -> {(estrategia, valores): tablas}
+_lock_tablas = threading.Lock()
+
+
+def _muestra(pool, k, n, rng):
+    """n muestras de k elementos sin reemplazo del pool (una por fila)"""
+    claves = rng.random((n, len(pool)))
+    return pool[np.argpartition(claves, k - 1, axis=1)[:, :k]]
+
+
+def _completar(base, universo, k, rng):
+    """Añade a cada fila k elementos del universo que no estén ya en la fila"""
+    n = len(base)
+    claves = rng.random((n, len(universo)))
+    claves[np.arange(n)[:, None], base - universo[0]] = 2.0  # nunca elegidos
+    extra = universo[np.argpartition(claves, k - 1, axis=1)[:, :k]]
+    return np.concatenate([base, extra], axis=1)
+
+
+def _muestra_ponderada(log_pesos, k, n, rng):
+    """n muestras de k valores 1..len(log_pesos) sin reemplazo con probabilidad según los pesos (Gumbel top-k)"""
+    claves = log_pesos - np.log(-np.log(rng.random((n, len(log_pesos)))))
+    return np.argpartition(-claves, k - 1, axis=1)[:, :k] + 1
+
+
+def registrar(clase):
+    """Decorador: añade la estrategia al registro (por nombre y por su clave sin acentos)"""
+    por_defecto = clase()  # antes de tocar el registro: si la clase es abstracta, no queda a medias
+    ESTRATEGIAS[clase.nombre] = clase
+    _alias[clase.clave] = _alias[clase.nombre.lower()] = clase.nombre
+    _por_defecto[clase.nombre] = por_defecto
+    return clase
+
+
+def buscar_estrategia(texto):
+    """Nombre registrado para 'Híbrido', 'hibrido', 'híbrido'...; None si no existe"""
+    return _alias.get(str(texto).strip().lower())
+
+
+def obtener_estrategia(nombre, **valores):
+    """Instancia de la estrategia con los parámetros dados (el resto, por defecto)"""
+    nombre = buscar_estrategia(nombre)
+    if nombre is None:
+        raise ValueError(f"Estrategia desconocida (disponibles: {', '.join(ESTRATEGIAS)})")
+    return ESTRATEGIAS[nombre](**valores) if valores else _por_defecto[nombre]
+
+
+class Estrategia(ABC):
+    """Base de las estrategias: subclases definen muestrear() y, si usan el histórico, preparar().
+
+    registrar() crea la instancia por defecto, así que una estrategia sin
+    muestrear() falla al importarse y no en el primer clic.
+    """
+
+    nombre = None
+    clave = None  # identificador ASCII: API, claves de botones
+    descripcion = ""
+    texto_barra = None  # clave de traducción de la descripción en la barra lateral
+    imagen = None
+    fondo = "fondo_aleatorio.jpg"
+    parametros = ()
+    usa_historico = False  # si preparar() lee el histórico (y sus tablas se guardan por instantánea)
+
+    def __init__(self, **valores):
+        declarados = {p.nombre: p for p in self.parametros}
+        desconocidos = set(valores) - set(declarados)
+        if desconocidos:
+            raise ValueError(f"Parámetros desconocidos para {self.nombre}: {', '.join(sorted(desconocidos))}")
+        self.valores = {}
+        for p in self.parametros:
+            valor = valores.get(p.nombre)
+            if valor is None:
+                valor = p.defecto
+            try:
+                valor = type(p.defecto)(valor)
+            except (TypeError, ValueError):
+                raise ValueError(f"'{p.nombre}' debe ser de tipo {type(p.defecto).__name__}")
+            if not p.minimo <= valor <= p.maximo:
+                raise ValueError(f"'{p.nombre}' debe estar entre {p.minimo} y {p.maximo}")
+            self.valores[p.nombre] = valor
+
+    def preparar(self, datos):
+        """Tablas de muestreo derivadas del histórico; se calculan una vez por instantánea"""
+        return None
+
+    @abstractmethod
+    def muestrear(self, tablas, n, rng):
+        """(números (n, 5), estrellas (n, 2)) sin ordenar"""
+
+    def tablas(self, datos):
+        if datos is None or not self.usa_historico:
+            return self.preparar(datos)
+        clave = (self.nombre, tuple(self.valores.items()))
+        with _lock_tablas:
+            por_datos = _tablas.setdefault(datos, {})
+            obtener_metricas().contar_cache('tablas_estrategia', clave in por_datos)
+            if clave not in por_datos:
+                por_datos[clave] = self.preparar(datos)
+            return por_datos[clave]
+
+    def generar_lote(self, n, datos=None, rng=None):
+        """n boletos de golpe: (números, estrellas) ordenados por fila"""
+        rng = rng if rng is not None else np.random.default_rng()
+        nums, estrellas = self.muestrear(self.tablas(datos), n, rng)
+        return np.sort(nums, axis=1), np.sort(estrellas, axis=1)
+
+    def generar(self, datos=None, rng=None):
+        """Un boleto como (lista de números, lista de estrellas)"""
+        rng = rng if rng is not None else np.random.default_rng()
+        nums, estrellas = self.muestrear(self.tablas(datos), 1, rng)
+        return sorted(nums[0].tolist()), sorted(estrellas[0].tolist())
+
+    def evaluar(self, n, datos, rng=None):
+        """Backtesting: premios que habrían obtenido n boletos de la estrategia en todo el histórico"""
+        nums, estrellas = self.generar_lote(n, datos, rng)
+        conteo = premios_historicos(nums, estrellas, datos).sum(axis=0)
+        sorteos = len(datos.mascaras)
+        return {
+            'boletos': n,
+            'sorteos': sorteos,
+            'premios': {c: int(conteo[c]) for c in sorted(CATEGORIAS.values())},
+            'premiados_por_sorteo': float(conteo[1:].sum() / (n * sorteos)) if n and sorteos else 0.0,
+        }
+
+    @classmethod
+    def describir(cls):
+        return {
+            'nombre': cls.nombre,
+            'clave': cls.clave,
+            'descripcion': cls.descripcion,
+            'parametros': [p._asdict() for p in cls.parametros],
+        }
+
+
+@registrar
+class Aleatorio(Estrategia):
+    nombre = "Aleatorio"
+    clave = "aleatorio"
+    descripcion = "Combinación completamente al azar"
+    texto_barra = 'random_mode'
+    imagen = 'aleatoriobarra.png'
+    fondo = "fondo_aleatorio.jpg"
+
+    def muestrear(self, tablas, n, rng):
+        return _muestra(NUMEROS, 5, n, rng), _muestra(ESTRELLAS, 2, n, rng)
+
+
+_TOP = (
+    Parametro('top_numeros', 15, 5, 50, "Números más frecuentes entre los que se elige"),
+    Parametro('top_estrellas', 5, 2, 12, "Estrellas más frecuentes entre las que se elige"),
+)
+
+
+class _DeFrecuentes(Estrategia):
+    parametros = _TOP
+    usa_historico = True
+
+    def preparar(self, datos):
+        return (np.asarray(datos.frecuentes(self.valores['top_numeros'], "numeros"), dtype=np.int64),
+                np.asarray(datos.frecuentes(self.valores['top_estrellas'], "estrellas"), dtype=np.int64))
+
+
+@registrar
+class Frecuencia(_DeFrecuentes):
+    nombre = "Frecuencia"
+    clave = "frecuencia"
+    descripcion = "Basado en los números más comunes históricamente"
+    texto_barra = 'frequency_mode'
+    imagen = 'frecuenciabarra.png'
+    fondo = "fondo_frecuencia.jpg"
+
+    def muestrear(self, tablas, n, rng):
+        frecuentes, frecuentes_estrellas = tablas
+        return _muestra(frecuentes, 5, n, rng), _muestra(frecuentes_estrellas, 2, n, rng)
+
+
+@registrar
+class Hibrido(_DeFrecuentes):
+    nombre = "Híbrido"
+    clave = "hibrido"
+    descripcion = "3 números y 1 estrella frecuentes, el resto al azar"
+    texto_barra = 'hybrid_mode'
+    imagen = 'hibridobarra.png'
+    fondo = "fondo_hibrido.jpg"
+
+    def muestrear(self, tablas, n, rng):
+        frecuentes, frecuentes_estrellas = tablas
+        nums = _completar(_muestra(frecuentes, 3, n, rng), NUMEROS, 2, rng)
+        estrellas = _completar(_muestra(frecuentes_estrellas, 1, n, rng), ESTRELLAS, 1, rng)
+        return nums, estrellas
+
+
+@registrar
+class Ponderado(Estrategia):
+    nombre = "Ponderado"
+    clave = "ponderado"
+    descripcion = "Todos los números posibles, con probabilidad según su frecuencia histórica"
+    texto_barra = 'weighted_mode'
+    usa_historico = True
+    parametros = (
+        Parametro('intensidad', 1.0, 0.0, 5.0, "Exponente de la frecuencia: 0 = uniforme"),
+    )
+
+    def preparar(self, datos):
+        # log((frecuencia + 1) ** intensidad): el +1 deja opción a los que nunca han salido
+        tablas = []
+        for frecuencia, total in ((datos.frecuencia_numeros, 50), (datos.frecuencia_estrellas, 12)):
+            conteo = frecuencia.reindex(range(1, total + 1), fill_value=0).to_numpy(dtype=float)
+            tablas.append(self.valores['intensidad'] * np.log1p(conteo))
+        return tuple(tablas)
+
+    def muestrear(self, tablas, n, rng):
+        log_numeros, log_estrellas = tablas
+        return _muestra_ponderada(log_numeros, 5, n, rng), _muestra_ponderada(log_estrellas, 2, n, rng)
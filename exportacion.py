@@ -0,0 +1,173 @@
+import argparse
+import io
+import numpy as np
+import pandas as pd
+from boletos import decodificar, importar_codigos
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow es opcional: sin él solo se exporta CSV
+    pa = None
+
+EXTENSIONES = {'parquet': '.parquet', 'arrow': '.arrow', 'csv': '.csv'}
+TIPOS_MIME = {
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.file',
+    'csv': 'text/csv'
+}
+
+
+def formatos_disponibles():
+    return list(EXTENSIONES) if pa is not None else ['csv']
+
+
+# ============================================
+# 📋 Tablas columnares (dict columna -> array)
+# ============================================
+
+def tabla_sorteos(datos):
+    """Histórico de sorteos en orden cronológico"""
+    columnas = {'fecha': np.asarray(datos.fechas).astype('datetime64[D]')}
+    for i in range(5):
+        columnas[f'N{i + 1}'] = datos.numeros[:, i]
+    for i in range(2):
+        columnas[f'E{i + 1}'] = datos.estrellas[:, i]
+    return columnas
+
+
+def tabla_frecuencias(datos):
+    """Apariciones y sorteos desde la última aparición de cada número y estrella"""
+    est = datos.estadisticas
+    return {
+        'tipo': np.repeat(['numero', 'estrella'], [50, 12]),
+        'valor': np.concatenate([np.arange(1, 51), np.arange(1, 13)]).astype(np.int8),
+        'frecuencia': np.concatenate([est.frecuencias('numeros').to_numpy(), est.frecuencias('estrellas').to_numpy()]),
+        'hueco': np.concatenate([est.huecos('numeros').to_numpy(), est.huecos('estrellas').to_numpy()]),
+    }
+
+
+def tabla_coapariciones(datos):
+    """Coapariciones de cada par (número-número, estrella-estrella y número-estrella), formato largo"""
+    est = datos.estadisticas
+    a, b = np.triu_indices(len(est.coapariciones), k=1)
+    tipos = np.array(['numero', 'estrella'])
+    return {
+        'tipo_a': tipos[(a >= 50).astype(np.int8)],
+        'valor_a': np.where(a >= 50, a - 49, a + 1).astype(np.int8),
+        'tipo_b': tipos[(b >= 50).astype(np.int8)],
+        'valor_b': np.where(b >= 50, b - 49, b + 1).astype(np.int8),
+        'veces': est.coapariciones[a, b],
+    }
+
+
+def tabla_mensual(datos):
+    """Apariciones por año, mes y elemento (el cubo año/mes en formato largo)"""
+    est = datos.estadisticas
+    anios = sorted(est.anios)
+    if not anios:
+        cubo = np.zeros((0, 12, 62), dtype=np.int32)
+    else:
+        cubo = np.stack([est.anios[a] for a in anios])
+    n_anios = len(anios)
+    elementos = np.arange(62)
+    return {
+        'anio': np.repeat(np.asarray(anios, dtype=np.int16), 12 * 62),
+        'mes': np.tile(np.repeat(np.arange(1, 13, dtype=np.int8), 62), n_anios),
+        'tipo': np.tile(np.where(elementos >= 50, 'estrella', 'numero'), 12 * n_anios),
+        'valor': np.tile(np.where(elementos >= 50, elementos - 49, elementos + 1).astype(np.int8), 12 * n_anios),
+        'apariciones': cubo.ravel(),
+    }
+
+
+def tabla_boletos(codigos):
+    """Boletos guardados (códigos enteros) con sus números y estrellas"""
+    codigos = np.asarray(codigos, dtype=np.int32)
+    nums, estrellas = decodificar(codigos)
+    columnas = {'codigo': codigos}
+    for i in range(5):
+        columnas[f'N{i + 1}'] = nums[:, i]
+    for i in range(2):
+        columnas[f'E{i + 1}'] = estrellas[:, i]
+    return columnas
+
+
+TABLAS_HISTORICO = {
+    'sorteos': tabla_sorteos,
+    'frecuencias': tabla_frecuencias,
+    'pares': tabla_coapariciones,
+    'mensual': tabla_mensual,
+}
+
+
+# ============================================
+# 💾 Serialización
+# ============================================
+
+def _tabla_arrow(columnas):
+    if isinstance(columnas, pd.DataFrame):
+        return pa.Table.from_pandas(columnas, preserve_index=False)
+    return pa.table(columnas)
+
+
+def _escribir(columnas, formato, destino):
+    if formato not in EXTENSIONES:
+        raise ValueError(f"Formato desconocido: {formato}")
+    if pa is None:
+        if formato != 'csv':
+            raise ValueError("Exportar a Parquet/Arrow requiere pyarrow")
+        pd.DataFrame(columnas).to_csv(destino, index=False)
+        return
+    tabla = _tabla_arrow(columnas)
+    if formato == 'parquet':
+        pq.write_table(tabla, destino, compression='zstd')
+    elif formato == 'arrow':
+        opciones = pa.ipc.IpcWriteOptions(compression='zstd')
+        with pa.ipc.new_file(destino, tabla.schema, options=opciones) as escritor:
+            escritor.write_table(tabla)
+    else:
+        pa_csv.write_csv(tabla, destino)
+
+
+def exportar(columnas, formato):
+    """Serializa una tabla (dict de arrays o DataFrame) y devuelve los bytes"""
+    if pa is None:
+        salida = io.StringIO()
+        _escribir(columnas, formato, salida)
+        return salida.getvalue().encode('utf-8')
+    salida = pa.BufferOutputStream()
+    _escribir(columnas, formato, salida)
+    return salida.getvalue().to_pybytes()
+
+
+def guardar(columnas, formato, ruta):
+    """Escribe la tabla directamente en disco"""
+    _escribir(columnas, formato, ruta)
+    return ruta
+
+
+def main(argumentos=None):
+    from vigilante import EstadoDatos
+
+    parser = argparse.ArgumentParser(description="Exporta el histórico y sus estadísticas para análisis")
+    parser.add_argument('tabla', choices=sorted(TABLAS_HISTORICO) + ['boletos'])
+    parser.add_argument('--formato', choices=formatos_disponibles(), default=formatos_disponibles()[0])
+    parser.add_argument('--salida', help="Ruta de destino (por defecto <tabla>.<formato>)")
+    parser.add_argument('--directorio', default=".", help="Carpeta con los archivos de histórico")
+    parser.add_argument('--codigos', help="Historial compartible de la app (solo para la tabla boletos)")
+    args = parser.parse_args(argumentos)
+
+    if args.tabla == 'boletos':
+        if not args.codigos:
+            parser.error("La tabla boletos necesita --codigos")
+        columnas = tabla_boletos(importar_codigos(args.codigos))
+    else:
+        columnas = TABLAS_HISTORICO[args.tabla](EstadoDatos(args.directorio))
+    ruta = guardar(columnas, args.formato, args.salida or args.tabla + EXTENSIONES[args.formato])
+    print(f"Exportado {ruta}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
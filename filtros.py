@@ -0,0 +1,330 @@
+import time
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+from math import comb
+from boletos import todas_las_combinaciones
+
+# ============================================
+# 🧩 Registro de filtros vectorizados
+# ============================================
+# Cada filtro recibe la matriz ordenada de números (n, 5) o de estrellas (n, 2)
+# y el valor de la especificación, y devuelve una máscara booleana de tamaño n.
+
+FILTROS = {}
+
+
+def filtro(nombre, sobre="numeros", mensaje=None):
+    """Registra un filtro en FILTROS"""
+    def registrar(funcion):
+        FILTROS[nombre] = {
+            'funcion': funcion,
+            'sobre': sobre,
+            'mensaje': mensaje or f"- No cumple el filtro '{nombre}'"
+        }
+        return funcion
+    return registrar
+
+
+@filtro('paridad', mensaje="- No tiene la paridad pedida")
+def _paridad(nums, tipo):
+    pares = (nums % 2 == 0).sum(axis=1)
+    if tipo == "Pares":
+        return pares >= 3
+    if tipo == "Impares":
+        return pares <= 2
+    if tipo == "Mezcla equilibrada":
+        return (pares == 2) | (pares == 3)
+    return np.ones(len(nums), dtype=bool)
+
+
+@filtro('consecutivos', mensaje="- No cumple la condición de consecutivos")
+def _consecutivos(nums, modo):
+    hay = (np.diff(nums, axis=1) == 1).any(axis=1)
+    if modo == "Evitar consecutivos":
+        return ~hay
+    if modo == "Permitir consecutivos":
+        return hay
+    return np.ones(len(nums), dtype=bool)
+
+
+@filtro('suma', mensaje="- Suma total fuera del rango")
+def _suma(nums, rango):
+    suma = nums.sum(axis=1)
+    return (suma >= rango[0]) & (suma <= rango[1])
+
+
+@filtro('terminaciones', mensaje="- No tiene ninguna de las terminaciones requeridas")
+def _terminaciones(nums, terminaciones):
+    return np.isin(nums % 10, list(terminaciones)).any(axis=1)
+
+
+@filtro('rango_1_25', mensaje="- Pocos números entre 1 y 25")
+def _rango_1_25(nums, minimo):
+    return (nums <= 25).sum(axis=1) >= minimo
+
+
+@filtro('rango_26_50', mensaje="- Pocos números entre 26 y 50")
+def _rango_26_50(nums, minimo):
+    return (nums >= 26).sum(axis=1) >= minimo
+
+
+@filtro('max_por_decena', mensaje="- Demasiados números en la misma decena")
+def _max_por_decena(nums, maximo):
+    decenas = np.minimum(nums // 10, 4)  # 1-9, 10-19, 20-29, 30-39, 40-50
+    cumple = np.ones(len(nums), dtype=bool)
+    for decena in range(5):
+        cumple &= (decenas == decena).sum(axis=1) <= maximo
+    return cumple
+
+
+@filtro('amplitud', mensaje="- Amplitud (máx − mín) fuera del rango")
+def _amplitud(nums, rango):
+    amplitud = nums[:, -1] - nums[:, 0]
+    return (amplitud >= rango[0]) & (amplitud <= rango[1])
+
+
+@filtro('max_salto', mensaje="- Hay un salto demasiado grande entre números")
+def _max_salto(nums, maximo):
+    return np.diff(nums, axis=1).max(axis=1) <= maximo
+
+
+@filtro('fijos', mensaje="- Falta algún número fijo")
+def _fijos(nums, fijos):
+    return np.isin(nums, list(fijos)).sum(axis=1) == len(set(fijos))
+
+
+@filtro('prohibidos', mensaje="- Contiene un número prohibido")
+def _prohibidos(nums, prohibidos):
+    return ~np.isin(nums, list(prohibidos)).any(axis=1)
+
+
+@filtro('paridad_estrellas', sobre="estrellas", mensaje="- Las estrellas no tienen la paridad pedida")
+def _paridad_estrellas(estrellas, tipo):
+    pares = (estrellas % 2 == 0).sum(axis=1)
+    if tipo == "Pares":
+        return pares == 2
+    if tipo == "Impares":
+        return pares == 0
+    if tipo == "Mixta":
+        return pares == 1
+    return np.ones(len(estrellas), dtype=bool)
+
+
+@filtro('suma_estrellas', sobre="estrellas", mensaje="- Suma de estrellas fuera del rango")
+def _suma_estrellas(estrellas, rango):
+    suma = estrellas.sum(axis=1)
+    return (suma >= rango[0]) & (suma <= rango[1])
+
+
+# ============================================
+# 📐 Selectividad exacta sobre el espacio completo
+# ============================================
+
+TOTAL_NUMEROS = comb(50, 5)   # 2.118.760 combinaciones de números
+TOTAL_ESTRELLAS = comb(12, 2)  # 66 pares de estrellas
+
+
+def _hashable(valor):
+    """Convierte listas/sets de la especificación en tuplas (para las cachés)"""
+    if isinstance(valor, (list, tuple, set)):
+        return tuple(_hashable(v) for v in valor)
+    return valor
+
+
+@lru_cache(maxsize=2)
+def _espacio(sobre):
+    """Todas las combinaciones de números o de estrellas, ordenadas"""
+    if sobre == "numeros":
+        return todas_las_combinaciones(50, 5).astype(np.int16)
+    return todas_las_combinaciones(12, 2).astype(np.int16)
+
+
+@lru_cache(maxsize=128)
+def _mascara_exacta(nombre, valor):
+    """Máscara empaquetada de un filtro sobre todo su espacio, cuántas pasan y coste por fila"""
+    info = FILTROS[nombre]
+    espacio = _espacio(info['sobre'])
+    inicio = time.perf_counter()
+    mascara = info['funcion'](espacio, valor)
+    coste = (time.perf_counter() - inicio) / len(espacio)
+    return np.packbits(mascara), int(mascara.sum()), coste
+
+
+# ============================================
+# ⚙️ Compilación de especificaciones
+# ============================================
+
+class FiltroCompilado:
+    """Especificación de filtros lista para evaluarse sobre matrices de boletos.
+
+    La especificación es un dict {nombre_filtro: valor}; los valores None se
+    ignoran. El mismo objeto sirve para generar, comprobar en bloque y contar
+    cuántas combinaciones existen que lo cumplen.
+    """
+
+    def __init__(self, especificacion):
+        desconocidos = set(especificacion) - set(FILTROS)
+        if desconocidos:
+            raise ValueError(f"Filtros desconocidos: {', '.join(sorted(desconocidos))}")
+        self.especificacion = {k: _hashable(v) for k, v in especificacion.items() if v is not None}
+        self.predicados = [
+            (nombre, FILTROS[nombre]['funcion'], FILTROS[nombre]['sobre'], valor)
+            for nombre, valor in self.especificacion.items()
+        ]
+
+    def _entrada(self, sobre, nums, estrellas):
+        return nums if sobre == "numeros" else estrellas
+
+    def detalle(self, nums, estrellas=None):
+        """DataFrame con una columna booleana por filtro y la columna 'cumple'"""
+        nums = np.sort(np.asarray(nums, dtype=np.int16), axis=1)
+        if estrellas is not None:
+            estrellas = np.sort(np.asarray(estrellas, dtype=np.int16), axis=1)
+        columnas = {
+            nombre: funcion(self._entrada(sobre, nums, estrellas), valor)
+            for nombre, funcion, sobre, valor in self.predicados
+            if sobre == "numeros" or estrellas is not None
+        }
+        resultado = pd.DataFrame(columnas, index=pd.RangeIndex(len(nums)))
+        resultado['cumple'] = resultado.all(axis=1)
+        return resultado
+
+    def __call__(self, nums, estrellas=None):
+        """Máscara booleana de los boletos que cumplen todos los filtros.
+
+        Los filtros se aplican en el orden de self.predicados y cada uno solo
+        se evalúa sobre los boletos que han superado los anteriores.
+        """
+        nums = np.sort(np.asarray(nums, dtype=np.int16), axis=1)
+        if estrellas is not None:
+            estrellas = np.sort(np.asarray(estrellas, dtype=np.int16), axis=1)
+        vivos = np.arange(len(nums))
+        for _, funcion, sobre, valor in self.predicados:
+            if sobre == "estrellas" and estrellas is None:
+                continue
+            if not len(vivos):
+                break
+            entrada = self._entrada(sobre, nums, estrellas)
+            vivos = vivos[funcion(entrada[vivos], valor)]
+        mascara = np.zeros(len(nums), dtype=bool)
+        mascara[vivos] = True
+        return mascara
+
+    def razones(self, nums, estrellas=None):
+        """Mensajes de los filtros que no cumple un único boleto"""
+        detalle = self.detalle([nums], None if estrellas is None else [estrellas]).iloc[0]
+        return [FILTROS[nombre]['mensaje'] for nombre, _, _, _ in self.predicados
+                if nombre in detalle and not detalle[nombre]]
+
+    def _mascara_conjunta(self, sobre):
+        """Máscara exacta (desempaquetada) de todos los filtros de un espacio"""
+        total = TOTAL_NUMEROS if sobre == "numeros" else TOTAL_ESTRELLAS
+        conjunta = np.full((total + 7) // 8, 0xFF, dtype=np.uint8)
+        for nombre, _, sobre_filtro, valor in self.predicados:
+            if sobre_filtro == sobre:
+                conjunta &= _mascara_exacta(nombre, valor)[0]
+        return np.unpackbits(conjunta, count=total).astype(bool)
+
+    def contar_factibles(self):
+        """Número exacto de combinaciones (números, estrellas y total) que cumplen los filtros"""
+        numeros = int(self._mascara_conjunta("numeros").sum())
+        estrellas = int(self._mascara_conjunta("estrellas").sum())
+        return {'numeros': numeros, 'estrellas': estrellas, 'total': numeros * estrellas}
+
+    def selectividad(self, muestra=None, rng=None):
+        """Tasa de paso de cada filtro por separado y acumulada en el orden actual.
+
+        Por defecto es exacta sobre las 2.118.760 combinaciones (y los 66 pares
+        de estrellas); con `muestra` se estima sobre ese número de boletos
+        aleatorios.
+        """
+        filas = []
+        acumulado = {}
+        if muestra:
+            rng = rng if rng is not None else np.random.default_rng()
+            espacios = {
+                'numeros': np.sort(rng.random((muestra, 50)).argsort(axis=1)[:, :5] + 1, axis=1).astype(np.int16),
+                'estrellas': np.sort(rng.random((muestra, 12)).argsort(axis=1)[:, :2] + 1, axis=1).astype(np.int16),
+            }
+        for nombre, funcion, sobre, valor in self.predicados:
+            if muestra:
+                inicio = time.perf_counter()
+                mascara = funcion(espacios[sobre], valor)
+                coste = (time.perf_counter() - inicio) / muestra
+                total = muestra
+            else:
+                empaquetada, _, coste = _mascara_exacta(nombre, valor)
+                total = TOTAL_NUMEROS if sobre == "numeros" else TOTAL_ESTRELLAS
+                mascara = np.unpackbits(empaquetada, count=total).astype(bool)
+            acumulado[sobre] = acumulado[sobre] & mascara if sobre in acumulado else mascara
+            filas.append({
+                'filtro': nombre,
+                'sobre': sobre,
+                'pasan_solo': int(mascara.sum()),
+                'pasa_solo_%': round(100 * mascara.mean(), 3),
+                'pasan_acumulado': int(acumulado[sobre].sum()),
+                'pasa_acumulado_%': round(100 * acumulado[sobre].mean(), 3),
+                'coste_ns': round(coste * 1e9, 2),
+            })
+        return pd.DataFrame(filas, columns=['filtro', 'sobre', 'pasan_solo', 'pasa_solo_%',
+                                            'pasan_acumulado', 'pasa_acumulado_%', 'coste_ns'])
+
+    def ordenar_por_selectividad(self, muestra=None):
+        """Reordena los filtros para aplicar primero los más selectivos y baratos.
+
+        Se usa el criterio clásico de ordenación de predicados: mayor
+        (1 - tasa de paso) / coste primero.
+        """
+        tabla = self.selectividad(muestra).set_index('filtro')
+        rechazo = 1 - tabla['pasa_solo_%'] / 100
+        prioridad = rechazo / tabla['coste_ns'].clip(lower=1e-3)
+        self.predicados.sort(key=lambda p: -prioridad[p[0]])
+        return self
+
+    def muestrear(self, n, rng=None):
+        """n boletos uniformes dentro del conjunto exacto que cumple los filtros"""
+        rng = rng if rng is not None else np.random.default_rng()
+        validos_nums = np.flatnonzero(self._mascara_conjunta("numeros"))
+        validos_est = np.flatnonzero(self._mascara_conjunta("estrellas"))
+        if not len(validos_nums) or not len(validos_est):
+            return np.empty((0, 5), np.int16), np.empty((0, 2), np.int16)
+        nums = _espacio("numeros")[rng.choice(validos_nums, size=n)]
+        estrellas = _espacio("estrellas")[rng.choice(validos_est, size=n)]
+        return nums, estrellas
+
+
+def compilar_filtros(especificacion):
+    return FiltroCompilado(especificacion)
+
+
+def especificacion_formulario(tipo_numeros, consecutivos, suma_min, suma_max, termina_en, rango_1_25, rango_26_50):
+    """Traduce los valores del formulario de filtros personalizados a una especificación"""
+    terminaciones = [int(t) for t in (termina_en or []) if len(str(t).strip()) == 1]
+    return {
+        'paridad': tipo_numeros,
+        'consecutivos': consecutivos,
+        'suma': (suma_min if suma_min > 0 else 0, suma_max if suma_max < 500 else 500),
+        'terminaciones': terminaciones if termina_en else None,
+        'rango_1_25': rango_1_25 or None,
+        'rango_26_50': rango_26_50 or None,
+    }
+
+
+def evaluar_filtros_lote(nums, tipo_numeros, consecutivos, suma_min, suma_max, termina_en, rango_1_25, rango_26_50,
+                         estrellas=None, extra=None):
+    """Evalúa los filtros personalizados sobre una matriz (n, 5) de números.
+
+    Devuelve un DataFrame con una columna booleana por filtro, la columna
+    'cumple' y los valores auxiliares (suma, pares, impares).
+    """
+    especificacion = especificacion_formulario(
+        tipo_numeros, consecutivos, suma_min, suma_max, termina_en, rango_1_25, rango_26_50
+    )
+    especificacion.update(extra or {})
+    resultado = compilar_filtros(especificacion).detalle(nums, estrellas)
+    nums = np.asarray(nums, dtype=np.int16)
+    resultado['suma_total'] = nums.sum(axis=1)
+    resultado['pares'] = (nums % 2 == 0).sum(axis=1)
+    resultado['impares'] = 5 - resultado['pares']
+    return resultado
@@ -0,0 +1,138 @@
+import threading
+import time
+import numpy as np
+from functools import lru_cache
+from boletos import mascaras_boletos
+from estrategias import obtener_estrategia
+from filtros import TOTAL_ESTRELLAS, TOTAL_NUMEROS, _hashable, compilar_filtros
+from metricas import obtener_metricas
+
+_metricas = obtener_metricas()
+_candidatos = _metricas.contador(
+    'elottoia_candidatos_total', "Boletos candidatos evaluados al generar con filtros o restricciones", ('metodo',))
+_aceptados = _metricas.contador(
+    'elottoia_candidatos_aceptados_total', "Candidatos que cumplieron filtros y restricciones", ('metodo',))
+_incompletas = _metricas.contador(
+    'elottoia_generacion_filtrada_incompleta_total', "Generaciones filtradas que devolvieron menos boletos de los pedidos")
+_duracion_filtrada = _metricas.histograma(
+    'elottoia_generacion_filtrada_segundos', "Duración de generar_filtrados", ('metodo',))
+
+
+def generar_lote_restringido(modo, n, restricciones=None, datos=None, rng=None, max_lotes=50, filtro=None,
+                             tam_lote=1024):
+    """Genera hasta n boletos distintos de la estrategia `modo` que cumplan las restricciones y el filtro"""
+    rng = rng if rng is not None else np.random.default_rng()
+    estrategia = obtener_estrategia(modo)
+    aceptados_nums, aceptados_est, vistos = [], [], np.empty(0, np.uint64)
+    total = generados = 0
+    for _ in range(max_lotes):
+        nums, estrellas = estrategia.generar_lote(max(2 * (n - total), tam_lote), datos, rng)
+        generados += len(nums)
+        if filtro is not None:
+            cumple = filtro(nums, estrellas)
+            nums, estrellas = nums[cumple], estrellas[cumple]
+        mascaras = mascaras_boletos(nums, estrellas)
+        mascaras, primeras = np.unique(mascaras, return_index=True)
+        validas = ~np.isin(mascaras, vistos)
+        if restricciones is not None:
+            validas &= restricciones.filtrar(mascaras)
+        sel = np.sort(primeras[validas])[:n - total]  # conserva el orden aleatorio
+        aceptados_nums.append(nums[sel])
+        aceptados_est.append(estrellas[sel])
+        vistos = np.concatenate([vistos, mascaras[validas]])
+        total += len(sel)
+        if total >= n:
+            break
+    _candidatos.inc('rechazo', cantidad=generados)
+    _aceptados.inc('rechazo', cantidad=total)
+    return np.concatenate(aceptados_nums), np.concatenate(aceptados_est)
+
+
+def _clave(especificacion):
+    return tuple(sorted((k, _hashable(v)) for k, v in especificacion.items() if v is not None))
+
+
+@_metricas.cache_contada('filtro_ordenado', lru_cache(maxsize=256))
+def _filtro_ordenado(clave):
+    return compilar_filtros(dict(clave)).ordenar_por_selectividad()
+
+
+@_metricas.cache_contada('aceptacion_filtro', lru_cache(maxsize=256))
+def _aceptacion(clave):
+    """Fracción exacta de combinaciones que cumplen la especificación"""
+    return _filtro_ordenado(clave).contar_factibles()['total'] / (TOTAL_NUMEROS * TOTAL_ESTRELLAS)
+
+
+def filtro_ordenado(especificacion):
+    """Filtro compilado y ordenado por selectividad; se reutiliza para la misma especificación"""
+    return _filtro_ordenado(_clave(especificacion))
+
+
+def _resultado_filtrado(nums, estrellas, n, metodo, inicio):
+    _duracion_filtrada.observar(time.perf_counter() - inicio, metodo)
+    if len(nums) < n:
+        _incompletas.inc()
+    return nums, estrellas
+
+
+def generar_filtrados(especificacion, n=1, restricciones=None, max_intentos=20000, rng=None):
+    """Hasta n boletos distintos que cumplen la especificación de filtros (y las restricciones)"""
+    inicio = time.perf_counter()
+    rng = rng if rng is not None else np.random.default_rng()
+    clave = _clave(especificacion)
+    filtro, aceptacion = _filtro_ordenado(clave), _aceptacion(clave)
+    if aceptacion * max_intentos < 4 * n:
+        # Filtros tan selectivos que el rechazo no llegaría a n boletos: se muestrea el conjunto exacto
+        nums, estrellas = filtro.muestrear(max(256, 2 * n), rng)
+        _candidatos.inc('exacto', cantidad=len(nums))
+        if len(nums):
+            mascaras = mascaras_boletos(nums, estrellas)
+            _, primeras = np.unique(mascaras, return_index=True)
+            validas = np.zeros(len(nums), dtype=bool)
+            validas[primeras] = True
+            if restricciones is not None:
+                validas &= restricciones.filtrar(mascaras)
+            nums, estrellas = nums[validas][:n], estrellas[validas][:n]
+        _aceptados.inc('exacto', cantidad=len(nums))
+        return _resultado_filtrado(nums, estrellas, n, 'exacto', inicio)
+    # Lotes del tamaño que, según la tasa de aceptación exacta, dan ~4n candidatos válidos
+    tam_lote = int(min(max(4 * n / aceptacion, 64), 8192))
+    nums, estrellas = generar_lote_restringido(
+        "Aleatorio", n, restricciones, filtro=filtro, max_lotes=max(1, max_intentos // tam_lote),
+        tam_lote=tam_lote, rng=rng
+    )
+    return _resultado_filtrado(nums, estrellas, n, 'rechazo', inicio)
+
+
+# Versión de la conversión Generator -> boleto. Un par (semilla, índice) solo reproduce el mismo
+# boleto con la misma versión (1: rng.choice por modo; 2: tablas de muestreo de estrategias.py;
+# 3: los empates de frecuencia se ordenan por número, no por orden de aparición)
+VERSION_MUESTREO = 3
+
+
+class FlujoSesion:
+    """Flujo de números aleatorios propio de una sesión.
+
+    Cada boleto se genera con un Generator independiente derivado de
+    (semilla, índice), así que cualquier boleto de la sesión se puede
+    reproducir conociendo solo esos dos enteros, y las sesiones concurrentes
+    no comparten estado (a diferencia del módulo global `random`).
+    """
+
+    def __init__(self, semilla=None):
+        if semilla is None:
+            semilla = int(np.random.SeedSequence().entropy % (1 << 63))
+        self.semilla = int(semilla)
+        self.contador = 0
+        self._lock = threading.Lock()
+
+    def rng(self, indice):
+        """Generator determinista para el boleto número `indice`"""
+        return np.random.default_rng([self.semilla, int(indice)])
+
+    def siguiente(self):
+        """Reserva el siguiente índice del flujo y devuelve (índice, generator)"""
+        with self._lock:
+            indice = self.contador
+            self.contador += 1
+        return indice, self.rng(indice)
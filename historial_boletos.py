@@ -0,0 +1,149 @@
+import re
+import numpy as np
+import pandas as pd
+from boletos import codigo_a_texto, decodificar, mascaras_boletos
+
+CAPACIDAD_INICIAL = 64
+FILAS_POR_BLOQUE = 50_000
+
+
+class HistorialBoletos:
+    """Boletos guardados de una sesión como array int32 de códigos (boletos.codificar).
+
+    Junto a cada código se guarda su máscara uint64 para buscar sin decodificar
+    y el id de su fila en el almacén (-1 sin almacén), para borrar exactamente
+    esa aparición aunque el boleto esté repetido.
+    Los arrays crecen duplicando su capacidad, así que añadir un boleto es O(1)
+    amortizado; `version` cambia con cada modificación y sirve de clave de caché.
+    Con un almacén (almacen.AlmacenBoletos) cada cambio se replica en él para
+    el usuario indicado; los códigos iniciales se suponen ya guardados.
+    """
+
+    def __init__(self, codigos=(), almacen=None, usuario=None, ids=None):
+        self._codigos = np.empty(CAPACIDAD_INICIAL, dtype=np.int32)
+        self._mascaras = np.empty(CAPACIDAD_INICIAL, dtype=np.uint64)
+        self._ids = np.empty(CAPACIDAD_INICIAL, dtype=np.int64)
+        self._n = 0
+        self.version = 0
+        self.almacen = almacen
+        self.usuario = usuario
+        self._anexar(codigos, ids)
+
+    @classmethod
+    def desde_almacen(cls, almacen, usuario, limite=None):
+        """Historial con los últimos boletos guardados del usuario"""
+        ids, codigos = almacen.cargar_boletos(usuario) if limite is None else almacen.cargar_boletos(usuario, limite)
+        return cls(codigos, almacen, usuario, ids)
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def codigos(self):
+        """Vista de solo lectura de los códigos, en orden de guardado"""
+        vista = self._codigos[:self._n]
+        vista.flags.writeable = False
+        return vista
+
+    def _reservar(self, extra):
+        necesaria = self._n + extra
+        if necesaria <= len(self._codigos):
+            return
+        capacidad = max(necesaria, 2 * len(self._codigos))
+        for nombre in ('_codigos', '_mascaras', '_ids'):
+            actual = getattr(self, nombre)
+            nuevo = np.empty(capacidad, dtype=actual.dtype)
+            nuevo[:self._n] = actual[:self._n]
+            setattr(self, nombre, nuevo)
+
+    def _anexar(self, codigos, ids=None):
+        codigos = np.asarray(codigos, dtype=np.int32).ravel()
+        if not len(codigos):
+            return
+        self._reservar(len(codigos))
+        self._codigos[self._n:self._n + len(codigos)] = codigos
+        self._mascaras[self._n:self._n + len(codigos)] = mascaras_boletos(*decodificar(codigos))
+        self._ids[self._n:self._n + len(codigos)] = -1 if ids is None else ids
+        self._n += len(codigos)
+        self.version += 1
+
+    def agregar(self, codigo, **generacion):
+        self.extender([codigo], **generacion)
+
+    def extender(self, codigos, **generacion):
+        """Añade boletos; `generacion` (modo, filtros, semilla, indice, muestreo) se guarda con ellos en el almacén"""
+        ids = None
+        if self.almacen is not None:
+            ids = self.almacen.agregar_boletos(self.usuario, codigos, **generacion)
+        self._anexar(codigos, ids)
+
+    def _conservar(self, mantener):
+        quedan = int(mantener.sum())
+        self._codigos[:quedan] = self._codigos[:self._n][mantener]
+        self._mascaras[:quedan] = self._mascaras[:self._n][mantener]
+        self._ids[:quedan] = self._ids[:self._n][mantener]
+        borrados = self._n - quedan
+        self._n = quedan
+        self.version += 1
+        return borrados
+
+    def borrar(self, posiciones):
+        """Elimina los boletos de las posiciones dadas; devuelve cuántos se borraron"""
+        posiciones = np.asarray(posiciones, dtype=np.int64).ravel()
+        posiciones = posiciones[(posiciones >= 0) & (posiciones < self._n)]
+        if not len(posiciones):
+            return 0
+        mantener = np.ones(self._n, dtype=bool)
+        mantener[posiciones] = False
+        if self.almacen is not None:
+            self.almacen.borrar_boletos(self.usuario, self._ids[:self._n][~mantener])
+        return self._conservar(mantener)
+
+    def deduplicar(self):
+        """Deja solo la primera aparición de cada boleto del historial cargado; devuelve cuántos se quitaron"""
+        _, primeras = np.unique(self.codigos, return_index=True)
+        if len(primeras) == self._n:
+            return 0
+        mantener = np.zeros(self._n, dtype=bool)
+        mantener[primeras] = True
+        if self.almacen is not None:
+            self.almacen.borrar_boletos(self.usuario, self._ids[:self._n][~mantener])
+        return self._conservar(mantener)
+
+    def vaciar(self):
+        if self.almacen is not None:
+            self.almacen.vaciar_boletos(self.usuario)
+        self._n = 0
+        self.version += 1
+
+    def buscar(self, texto=""):
+        """Posiciones de los boletos que contienen todos los números (y estrellas, tras ⭐) del texto"""
+        partes = texto.split('⭐', 1)
+        nums = [int(x) for x in re.findall(r'\d+', partes[0]) if 1 <= int(x) <= 50]
+        estrellas = [int(x) for x in re.findall(r'\d+', partes[1]) if 1 <= int(x) <= 12] if len(partes) > 1 else []
+        if not nums and not estrellas:
+            return np.arange(self._n)
+        buscada = np.uint64(0)
+        for n in nums:
+            buscada |= np.uint64(1) << np.uint64(n - 1)
+        for e in estrellas:
+            buscada |= np.uint64(1) << np.uint64(e + 49)
+        return np.flatnonzero((self._mascaras[:self._n] & buscada) == buscada)
+
+    def pagina(self, posiciones, numero, tamano):
+        """Tabla de una página (numerada desde 1) de las posiciones dadas; solo se formatean sus filas"""
+        inicio = (max(int(numero), 1) - 1) * tamano
+        seleccion = np.asarray(posiciones)[inicio:inicio + tamano]
+        return pd.DataFrame({
+            'Nº': seleccion + 1,
+            'Combinación': [codigo_a_texto(c) for c in self._codigos[seleccion]],
+        }), seleccion
+
+    def csv_por_bloques(self, filas_por_bloque=FILAS_POR_BLOQUE):
+        """Genera el CSV del historial por bloques de bytes (codigo, N1..N5, E1, E2)"""
+        yield b"codigo,N1,N2,N3,N4,N5,E1,E2\n"
+        for inicio in range(0, self._n, filas_por_bloque):
+            codigos = self._codigos[inicio:min(inicio + filas_por_bloque, self._n)]
+            nums, estrellas = decodificar(codigos)
+            bloque = pd.DataFrame(np.column_stack([codigos, nums, estrellas]))
+            yield bloque.to_csv(header=False, index=False, lineterminator="\n").encode('ascii')
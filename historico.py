@@ -0,0 +1,158 @@
+import os
+import tempfile
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+
+COLUMNAS_NUMEROS = ['N1', 'N2', 'N3', 'N4', 'N5']
+COLUMNAS_ESTRELLAS = ['E1', 'E2']
+
+ARCHIVO_CSV = "Histórico.csv"
+ARCHIVO_CONVERTIDO = "euromillones_convertido.txt"
+ARCHIVO_MENSUAL = "todos los años de euromillones desglosados por mes.txt"
+ARCHIVO_BINARIO = "sorteos.bin"
+ARCHIVOS_HISTORICO = (ARCHIVO_BINARIO, ARCHIVO_CSV, ARCHIVO_CONVERTIDO, ARCHIVO_MENSUAL)
+
+MESES = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio', 'Julio',
+         'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
+MESES_ABREVIADOS = ['ene', 'feb', 'mar', 'abr', 'may', 'jun', 'jul', 'ago', 'sep', 'oct', 'nov', 'dic']
+
+
+def cargar_sorteos(csv_path="Histórico.csv"):
+    """Lee el histórico y devuelve (fechas, números, estrellas) en orden cronológico"""
+    df = pd.read_csv(csv_path)
+    df['FECHA'] = pd.to_datetime(df['FECHA'], format='%d/%m/%Y')
+    df = df.sort_values('FECHA', kind='stable').reset_index(drop=True)
+    nums = np.sort(df[COLUMNAS_NUMEROS].to_numpy(dtype=np.int8), axis=1)
+    estrellas = np.sort(df[COLUMNAS_ESTRELLAS].to_numpy(dtype=np.int8), axis=1)
+    return df['FECHA'].to_numpy(), nums, estrellas
+
+
+# ============================================
+# ➕ Alta de un sorteo nuevo
+# ============================================
+
+def validar_sorteo(fecha, nums, estrellas):
+    """Normaliza un sorteo a (date, números, estrellas) ordenados; lanza ValueError si no es válido"""
+    if isinstance(fecha, str):
+        try:
+            fecha = datetime.strptime(fecha.strip(), '%d/%m/%Y').date()
+        except ValueError:
+            raise ValueError("La fecha debe tener el formato dd/mm/aaaa")
+    elif isinstance(fecha, datetime):
+        fecha = fecha.date()
+    elif not isinstance(fecha, date):
+        fecha = pd.Timestamp(fecha).date()
+    if fecha.weekday() not in (1, 4):
+        raise ValueError("Los sorteos de Euromillones se celebran en martes o viernes")
+    if fecha > date.today():
+        raise ValueError("La fecha del sorteo no puede ser futura")
+
+    nums = sorted(int(n) for n in nums)
+    estrellas = sorted(int(e) for e in estrellas)
+    if len(set(nums)) != 5 or nums[0] < 1 or nums[-1] > 50:
+        raise ValueError("Se necesitan 5 números distintos entre 1 y 50")
+    if len(set(estrellas)) != 2 or estrellas[0] < 1 or estrellas[-1] > 12:
+        raise ValueError("Se necesitan 2 estrellas distintas entre 1 y 12")
+    return fecha, nums, estrellas
+
+
+def linea_csv(fecha, nums, estrellas):
+    return f"{fecha:%d/%m/%Y},{','.join(map(str, nums))},,{','.join(map(str, estrellas))}"
+
+
+def linea_convertido(fecha, nums, estrellas):
+    return f"{fecha.year};{','.join(map(str, nums))};{','.join(map(str, estrellas))}"
+
+
+def linea_mensual(fecha, nums, estrellas):
+    return f"{fecha.day:02d}-{MESES_ABREVIADOS[fecha.month - 1]}: {', '.join(map(str, nums))} - Estrellas: {', '.join(map(str, estrellas))}"
+
+
+def _salto_de_linea(contenido):
+    return "\r\n" if "\r\n" in contenido[:4096] else "\n"
+
+
+def _escribir_atomico(ruta, contenido):
+    """Escribe en un temporal y lo renombra: los lectores ven el archivo viejo o el nuevo, nunca uno a medias"""
+    carpeta = os.path.dirname(os.path.abspath(ruta))
+    fd, temporal = tempfile.mkstemp(dir=carpeta, prefix=".tmp_historico_")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(contenido)
+        if os.path.exists(ruta):
+            os.chmod(temporal, os.stat(ruta).st_mode)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def _leer(ruta):
+    if not os.path.exists(ruta):
+        return ""
+    with open(ruta, "r", encoding="utf-8", newline="") as f:
+        return f.read()
+
+
+def _anexar(ruta, contenido, lineas):
+    """Añade líneas al final del contenido actual respetando su salto de línea"""
+    salto = _salto_de_linea(contenido)
+    if contenido and not contenido.endswith(("\n", "\r")):
+        contenido += salto
+    _escribir_atomico(ruta, contenido + "".join(linea + salto for linea in lineas))
+
+
+def _cabeceras_mensual(contenido, fecha):
+    """Líneas de año/mes que hacen falta antes del sorteo en el archivo mensual"""
+    anio = mes = None
+    for linea in reversed(contenido.splitlines()):
+        texto = linea.strip()
+        if mes is None and texto in MESES:
+            mes = MESES.index(texto) + 1
+        elif texto.isdigit() and len(texto) == 4:
+            anio = int(texto)
+            break
+    if anio != fecha.year:
+        return [f"{fecha.year} ", MESES[fecha.month - 1]]
+    if mes != fecha.month:
+        return [MESES[fecha.month - 1]]
+    return []
+
+
+def agregar_sorteo(fecha, nums, estrellas, directorio="."):
+    """Valida un sorteo y lo escribe en todos los formatos del histórico.
+
+    El registro binario (almacén canónico, si existe) y los dos .txt, que son
+    cronológicos, lo reciben al final; el CSV, del más reciente al más
+    antiguo, tras la cabecera. Solo se admiten sorteos posteriores al último
+    registrado, lo que también descarta duplicados. Devuelve el sorteo
+    normalizado (fecha, números, estrellas).
+    """
+    fecha, nums, estrellas = validar_sorteo(fecha, nums, estrellas)
+
+    ruta_csv = os.path.join(directorio, ARCHIVO_CSV)
+    contenido = _leer(ruta_csv)
+    salto = _salto_de_linea(contenido)
+    cabecera, _, filas = contenido.partition(salto)
+    if f"{fecha:%d/%m/%Y}," in filas:
+        raise ValueError(f"El sorteo del {fecha:%d/%m/%Y} ya está registrado")
+    primera = filas.split(salto, 1)[0]
+    if primera:
+        ultima_fecha = datetime.strptime(primera.split(',', 1)[0], '%d/%m/%Y').date()
+        if fecha <= ultima_fecha:
+            raise ValueError(f"Solo se pueden añadir sorteos posteriores al último registrado ({ultima_fecha:%d/%m/%Y})")
+    ruta_binario = os.path.join(directorio, ARCHIVO_BINARIO)
+    if os.path.exists(ruta_binario):
+        from registro_sorteos import anexar_registro
+        anexar_registro(fecha, nums, estrellas, ruta_binario)
+    _escribir_atomico(ruta_csv, cabecera + salto + linea_csv(fecha, nums, estrellas) + salto + filas)
+
+    ruta_convertido = os.path.join(directorio, ARCHIVO_CONVERTIDO)
+    _anexar(ruta_convertido, _leer(ruta_convertido), [linea_convertido(fecha, nums, estrellas)])
+
+    ruta_mensual = os.path.join(directorio, ARCHIVO_MENSUAL)
+    mensual = _leer(ruta_mensual)
+    _anexar(ruta_mensual, mensual, _cabeceras_mensual(mensual, fecha) + [linea_mensual(fecha, nums, estrellas)])
+    return fecha, nums, estrellas
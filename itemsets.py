@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+from math import comb
+from boletos import contar_bits
+from estadisticas import DESPLAZAMIENTO_ESTRELLAS, ELEMENTOS, indices_sorteo
+
+MAX_TAMANO = 4
+
+
+def bitsets_elementos(nums, estrellas):
+    """Bitset por elemento (50 números + 12 estrellas) de los sorteos en que aparece: (62, palabras) uint64"""
+    indices = indices_sorteo(nums, estrellas) if len(nums) else np.empty((0, 7), dtype=np.int64)
+    n = len(indices)
+    incidencia = np.zeros((ELEMENTOS, -(-max(n, 1) // 64) * 64), dtype=bool)
+    incidencia[indices.T, np.arange(n)] = True
+    return np.packbits(incidencia, axis=1, bitorder='little').view('<u8')
+
+
+def _etiqueta(items):
+    return " - ".join(str(i + 1) if i < DESPLAZAMIENTO_ESTRELLAS else f"⭐{i - DESPLAZAMIENTO_ESTRELLAS + 1}"
+                      for i in items)
+
+
+def soporte_esperado(n_sorteos, n_numeros, n_estrellas):
+    """Sorteos esperados con todos los elementos del conjunto si el sorteo fuese uniforme"""
+    if n_numeros > 5 or n_estrellas > 2:
+        return 0.0
+    prob = comb(50 - n_numeros, 5 - n_numeros) / comb(50, 5) * comb(12 - n_estrellas, 2 - n_estrellas) / comb(12, 2)
+    return n_sorteos * prob
+
+
+def minar_itemsets(nums, estrellas, min_soporte, tamanos=(3, 4), con_estrellas=False):
+    """Conjuntos frecuentes de números (y estrellas) al estilo Eclat.
+
+    Cada conjunto lleva el bitset de los sorteos que lo contienen; al ampliarlo
+    con los elementos posteriores se hace un AND de ese bitset con todos sus
+    bitsets a la vez y se cuentan los bits. Los conjuntos por debajo de
+    min_soporte no se amplían (ningún superconjunto puede superarlo).
+    """
+    tamanos = sorted(set(int(t) for t in tamanos))
+    if not tamanos or tamanos[0] < 1 or tamanos[-1] > MAX_TAMANO:
+        raise ValueError(f"Los tamaños deben estar entre 1 y {MAX_TAMANO}")
+    min_soporte = max(int(min_soporte), 1)
+    n_sorteos = len(nums)
+    bitsets = bitsets_elementos(nums, estrellas)
+    if not con_estrellas:
+        bitsets = bitsets[:DESPLAZAMIENTO_ESTRELLAS]
+    m = len(bitsets)
+
+    soporte = contar_bits(bitsets).sum(axis=1, dtype=np.int64)
+    nivel = [((i,), bitsets[i]) for i in np.flatnonzero(soporte >= min_soporte)]
+    encontrados = []
+    if 1 in tamanos:
+        encontrados += [(items, int(soporte[items[0]])) for items, _ in nivel]
+    for tamano in range(2, tamanos[-1] + 1):
+        siguiente = []
+        for items, bits in nivel:
+            inicio = items[-1] + 1
+            if inicio >= m:
+                continue
+            candidatos = bitsets[inicio:] & bits
+            soportes = contar_bits(candidatos).sum(axis=1, dtype=np.int64)
+            for j in np.flatnonzero(soportes >= min_soporte):
+                siguiente.append((items + (inicio + int(j),), candidatos[j], int(soportes[j])))
+        if tamano in tamanos:
+            encontrados += [(items, sop) for items, _, sop in siguiente]
+        nivel = [(items, bits) for items, bits, _ in siguiente]
+        if not nivel:
+            break
+
+    filas = []
+    for items, sop in encontrados:
+        n_est = sum(i >= DESPLAZAMIENTO_ESTRELLAS for i in items)
+        esperado = soporte_esperado(n_sorteos, len(items) - n_est, n_est)
+        filas.append((_etiqueta(items), len(items), len(items) - n_est, n_est, sop, esperado))
+    df = pd.DataFrame(filas, columns=['Combinación', 'Tamaño', 'Números', 'Estrellas', 'Soporte', 'Soporte esperado'])
+    df['Soporte esperado'] = df['Soporte esperado'].astype(float)
+    df['Lift'] = np.divide(df['Soporte'], df['Soporte esperado'],
+                           out=np.zeros(len(df)), where=df['Soporte esperado'].to_numpy() > 0).round(2)
+    df['Soporte esperado'] = df['Soporte esperado'].round(2)
+    return df.sort_values(['Soporte', 'Lift'], ascending=False, kind='stable').reset_index(drop=True)
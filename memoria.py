@@ -0,0 +1,235 @@
+import os
+import sys
+import threading
+import time
+import weakref
+import numpy as np
+import pandas as pd
+
+PRESUPUESTO_SESIONES = int(os.environ.get('ELOTTOIA_MEMORIA_SESIONES_MB', "512")) * 1024 ** 2
+INACTIVIDAD = float(os.environ.get('ELOTTOIA_INACTIVIDAD_S', "900"))
+
+
+# ============================================
+# 📏 Medición
+# ============================================
+
+def tamano(objeto, _vistos=None):
+    """Bytes aproximados de un objeto y todo lo que referencia (arrays, DataFrames, contenedores)"""
+    vistos = set() if _vistos is None else _vistos
+    if id(objeto) in vistos:
+        return 0
+    vistos.add(id(objeto))
+    if isinstance(objeto, np.ndarray):
+        return objeto.nbytes if objeto.base is None else sys.getsizeof(objeto) + tamano(objeto.base, vistos)
+    if isinstance(objeto, (pd.DataFrame, pd.Series, pd.Index)):
+        uso = objeto.memory_usage(deep=True)
+        return int(uso.sum() if isinstance(uso, pd.Series) else uso)
+    if isinstance(objeto, (str, bytes, bytearray, int, float, bool, type(None))):
+        return sys.getsizeof(objeto)
+    total = sys.getsizeof(objeto)
+    if isinstance(objeto, dict):
+        return total + sum(tamano(k, vistos) + tamano(v, vistos) for k, v in objeto.items())
+    if isinstance(objeto, (list, tuple, set, frozenset)):
+        return total + sum(tamano(x, vistos) for x in objeto)
+    if hasattr(objeto, '__dict__') and not isinstance(objeto, type):
+        total += tamano(vars(objeto), vistos)
+    return total
+
+
+def memoria_proceso():
+    """(memoria residente actual, pico) del proceso en bytes"""
+    pico = 0
+    try:
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            residente = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        residente = pico
+    return residente, max(pico, residente)
+
+
+def megas(n):
+    return round(n / 1024 ** 2, 2)
+
+
+# ============================================
+# 🧳 Objetos pesados por sesión (desalojo LRU)
+# ============================================
+
+class ObjetosPesados:
+    """Resultados grandes de una sesión (análisis en bloque, exportaciones) que se pueden descartar.
+
+    Vive en st.session_state; el registro del proceso lo referencia débilmente
+    y, si la memoria de las sesiones supera el presupuesto, vacía primero las
+    de uso más antiguo. Quien lo lea debe tolerar que una clave haya desaparecido.
+    Cada objeto se mide una sola vez, al guardarlo.
+    """
+
+    def __init__(self, registro, nombre):
+        self._registro = registro
+        self.nombre = nombre
+        self._objetos = {}
+        self._tamanos = {}  # clave -> bytes medidos al guardarla
+        self._bytes = [0]  # total de la sesión (en una lista para que el registro lo descuente si se destruye)
+        self._lock = threading.Lock()
+        self.ultimo_uso = time.monotonic()
+        self.desalojos = 0
+
+    def tocar(self):
+        self.ultimo_uso = time.monotonic()
+
+    def get(self, clave, defecto=None):
+        return self._objetos.get(clave, defecto)
+
+    def __contains__(self, clave):
+        return clave in self._objetos
+
+    def __setitem__(self, clave, valor):
+        medido = tamano(valor)
+        with self._lock:
+            self._objetos[clave] = valor
+            diferencia = medido - self._tamanos.get(clave, 0)
+            self._tamanos[clave] = medido
+            self._bytes[0] += diferencia
+        self.tocar()
+        if self._registro.anotar(diferencia):
+            self._registro.desalojar(proteger=self)
+
+    def pop(self, clave, defecto=None):
+        with self._lock:
+            valor = self._objetos.pop(clave, defecto)
+            liberado = self._tamanos.pop(clave, 0)
+            self._bytes[0] -= liberado
+        self._registro.anotar(-liberado)
+        return valor
+
+    def vaciar(self):
+        with self._lock:
+            if not self._objetos:
+                return
+            liberado = self._bytes[0]
+            self._objetos, self._tamanos, self._bytes[0] = {}, {}, 0
+            self.desalojos += 1
+        self._registro.anotar(-liberado)
+
+    def tamano(self):
+        return self._bytes[0]
+
+
+class RegistroSesiones:
+    """Registro por proceso de las ObjetosPesados de todas las sesiones.
+
+    Lleva el total de bytes de todas ellas al día con cada escritura, así que
+    solo recorre las sesiones cuando hay que desalojar.
+    """
+
+    def __init__(self, presupuesto=PRESUPUESTO_SESIONES, inactividad=INACTIVIDAD):
+        self.presupuesto = presupuesto
+        self.inactividad = inactividad
+        self._sesiones = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._contador = 0
+        self.total = 0
+
+    def nueva(self):
+        """Espacio para una sesión nueva; de paso vacía las sesiones inactivas"""
+        with self._lock:
+            self._contador += 1
+            espacio = ObjetosPesados(self, f"sesión {self._contador}")
+            self._sesiones.add(espacio)
+        weakref.finalize(espacio, self._olvidar, espacio._bytes)
+        self.desalojar_inactivas(proteger=espacio)
+        return espacio
+
+    def _olvidar(self, cuenta):
+        self.anotar(-cuenta[0])
+
+    def anotar(self, diferencia):
+        """Suma bytes al total de las sesiones; True si supera el presupuesto"""
+        with self._lock:
+            self.total += diferencia
+            return self.total > self.presupuesto
+
+    def sesiones(self):
+        with self._lock:
+            return list(self._sesiones)
+
+    def _por_antiguedad(self, proteger):
+        return sorted((s for s in self.sesiones() if s is not proteger), key=lambda s: s.ultimo_uso)
+
+    def desalojar_inactivas(self, proteger=None):
+        ahora = time.monotonic()
+        for sesion in self._por_antiguedad(proteger):
+            if ahora - sesion.ultimo_uso > self.inactividad:
+                sesion.vaciar()
+
+    def desalojar(self, proteger=None):
+        """Vacía las sesiones inactivas y, por orden de último uso, las necesarias para cumplir el presupuesto"""
+        self.desalojar_inactivas(proteger)
+        for sesion in self._por_antiguedad(proteger):
+            if self.total <= self.presupuesto:
+                break
+            sesion.vaciar()
+
+    def informe(self):
+        """Una fila por sesión viva: inactividad, objetos pesados, tamaño y desalojos sufridos"""
+        ahora = time.monotonic()
+        filas = [{
+            'Sesión': s.nombre,
+            'Inactiva (s)': round(ahora - s.ultimo_uso, 1),
+            'Objetos': len(s._objetos),
+            'MB': megas(s.tamano()),
+            'Desalojos': s.desalojos,
+        } for s in sorted(self.sesiones(), key=lambda s: s.ultimo_uso, reverse=True)]
+        return pd.DataFrame(filas, columns=['Sesión', 'Inactiva (s)', 'Objetos', 'MB', 'Desalojos'])
+
+
+def informe_memoria(compartido, estado_sesion, registro):
+    """Resumen para dimensionar el dyno: memoria del proceso, parte compartida y coste por sesión.
+
+    compartido: {nombre: objeto} con lo que se guarda una vez por proceso.
+    estado_sesion: el session_state de la sesión actual.
+    """
+    residente, pico = memoria_proceso()
+    vistos = set()
+    tamanos_compartidos = {nombre: tamano(objeto, vistos) for nombre, objeto in compartido.items()}
+    sesion = {clave: tamano(valor) for clave, valor in estado_sesion.items()}
+    sesiones = registro.sesiones()
+    por_sesion = sum(sesion.values())
+    pesados = registro.total
+    return {
+        'proceso_mb': megas(residente),
+        'pico_mb': megas(pico),
+        'compartido_mb': megas(sum(tamanos_compartidos.values())),
+        'compartido': {k: megas(v) for k, v in tamanos_compartidos.items()},
+        'sesion_mb': megas(por_sesion),
+        'sesion': {k: megas(v) for k, v in sorted(sesion.items(), key=lambda kv: -kv[1])},
+        'sesiones': len(sesiones),
+        'pesados_mb': megas(pesados),
+        'presupuesto_mb': megas(registro.presupuesto),
+    }
+
+
+def usuarios_soportados(informe, memoria_dyno_mb, mb_por_sesion=None):
+    """Sesiones concurrentes que caben en un dyno: (memoria - proceso sin sesiones) / coste por sesión"""
+    base = informe['proceso_mb'] - informe['pesados_mb']
+    coste = mb_por_sesion or max(informe['sesion_mb'], 0.1)
+    return max(int((memoria_dyno_mb - base) // coste), 0)
+
+
+_registro = None
+_lock_registro = threading.Lock()
+
+
+def obtener_registro():
+    """Registro de sesiones único por proceso"""
+    global _registro
+    with _lock_registro:
+        if _registro is None:
+            _registro = RegistroSesiones()
+        return _registro
@@ -0,0 +1,343 @@
+import argparse
+import atexit
+import bisect
+import functools
+import logging
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# 📟 Métricas operativas (formato de texto de Prometheus)
+# ============================================
+# Contadores e histogramas en memoria del proceso: registrar un evento es una
+# suma bajo un lock sin contención, así que pueden estar siempre activos. Se
+# exponen en http://HOST:PUERTO/metrics si ELOTTOIA_METRICAS_PUERTO está
+# definido, y se vuelcan periódicamente a ELOTTOIA_METRICAS_ARCHIVO si lo está.
+
+HOST = os.environ.get('ELOTTOIA_METRICAS_HOST', "127.0.0.1")
+PUERTO = int(os.environ.get('ELOTTOIA_METRICAS_PUERTO', "0")) or 9464
+ARCHIVO = os.environ.get('ELOTTOIA_METRICAS_ARCHIVO')
+INTERVALO_VOLCADO = float(os.environ.get('ELOTTOIA_METRICAS_INTERVALO_S', "60"))
+LATENCIAS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _etiquetas(nombres, valores, extra=()):
+    pares = [*zip(nombres, valores), *extra]
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{n}="{_escapar(v)}"' for n, v in pares) + "}"
+
+
+def _numero(valor):
+    if valor == float('inf'):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) and not valor.is_integer() else str(int(valor))
+
+
+class Contador:
+    """Contador monótono, opcionalmente con etiquetas (valores posicionales en inc)"""
+    tipo = "counter"
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre, self.ayuda, self.etiquetas = nombre, ayuda, tuple(etiquetas)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *etiquetas, cantidad=1):
+        with self._lock:
+            if etiquetas not in self._valores:
+                if len(etiquetas) != len(self.etiquetas):
+                    raise ValueError(f"{self.nombre} espera las etiquetas {self.etiquetas}")
+                self._valores[etiquetas] = 0
+            self._valores[etiquetas] += cantidad
+
+    def valor(self, *etiquetas):
+        return self._valores.get(etiquetas, 0)
+
+    def lineas(self):
+        with self._lock:
+            valores = sorted(self._valores.items())
+        return [f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {_numero(v)}" for clave, v in valores]
+
+
+class Histograma:
+    """Histograma de cubetas fijas (en segundos por defecto) con suma y recuento"""
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, etiquetas=(), limites=LATENCIAS):
+        self.nombre, self.ayuda, self.etiquetas = nombre, ayuda, tuple(etiquetas)
+        self.limites = tuple(sorted(limites))
+        self._series = {}  # etiquetas -> [cubetas..., suma]
+        self._lock = threading.Lock()
+
+    def observar(self, valor, *etiquetas):
+        cubeta = bisect.bisect_left(self.limites, valor)
+        with self._lock:
+            serie = self._series.get(etiquetas)
+            if serie is None:
+                if len(etiquetas) != len(self.etiquetas):
+                    raise ValueError(f"{self.nombre} espera las etiquetas {self.etiquetas}")
+                serie = self._series[etiquetas] = [0] * (len(self.limites) + 2)
+            serie[cubeta] += 1
+            serie[-1] += valor
+
+    def cronometro(self, *etiquetas):
+        return _Cronometro(self, etiquetas)
+
+    def lineas(self):
+        with self._lock:
+            series = sorted((clave, list(serie)) for clave, serie in self._series.items())
+        lineas = []
+        for clave, serie in series:
+            acumulado = 0
+            for limite, veces in zip((*self.limites, float('inf')), serie[:-1]):
+                acumulado += veces
+                le = _etiquetas(self.etiquetas, clave, [('le', _numero(limite))])
+                lineas.append(f"{self.nombre}_bucket{le} {acumulado}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {_numero(serie[-1])}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {acumulado}")
+        return lineas
+
+
+class _Cronometro:
+    """Context manager que observa la duración del bloque (también si sale con una excepción)"""
+    __slots__ = ('histograma', 'etiquetas', 'inicio')
+
+    def __init__(self, histograma, etiquetas):
+        self.histograma, self.etiquetas = histograma, etiquetas
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excepcion):
+        self.histograma.observar(time.perf_counter() - self.inicio, *self.etiquetas)
+
+
+class Tramos:
+    """Cronometra secciones consecutivas de un script con una marca al final de cada una.
+
+    marcar('nombre') observa el tiempo desde la marca anterior (o la creación)
+    con la etiqueta 'nombre'; si la ejecución se corta, los tramos pendientes
+    simplemente no se observan.
+    """
+
+    def __init__(self, histograma):
+        self.histograma = histograma
+        self._anterior = time.perf_counter()
+
+    def marcar(self, seccion):
+        ahora = time.perf_counter()
+        self.histograma.observar(ahora - self._anterior, seccion)
+        self._anterior = ahora
+
+
+class RegistroMetricas:
+    """Métricas del proceso por nombre; pedir dos veces la misma devuelve la misma instancia"""
+
+    def __init__(self):
+        self._metricas = {}
+        self._colectores = {}
+        self._lock = threading.Lock()
+        self._cache_local = threading.local()
+
+    def _obtener(self, clase, nombre, ayuda, etiquetas, **opciones):
+        with self._lock:
+            metrica = self._metricas.get(nombre)
+            if metrica is None:
+                metrica = self._metricas[nombre] = clase(nombre, ayuda, etiquetas, **opciones)
+            elif not isinstance(metrica, clase) or metrica.etiquetas != tuple(etiquetas):
+                raise ValueError(f"La métrica {nombre} ya existe con otro tipo o etiquetas")
+            return metrica
+
+    def contador(self, nombre, ayuda, etiquetas=()):
+        return self._obtener(Contador, nombre, ayuda, etiquetas)
+
+    def histograma(self, nombre, ayuda, etiquetas=(), limites=LATENCIAS):
+        return self._obtener(Histograma, nombre, ayuda, etiquetas, limites=limites)
+
+    def colector(self, nombre, funcion):
+        """Registra funcion() -> [(nombre, tipo, ayuda, [(etiquetas dict, valor)])], evaluada al exponer"""
+        with self._lock:
+            self._colectores[nombre] = funcion
+
+    # ---------- cachés ----------
+
+    def contar_cache(self, cache, acierto):
+        nombre = 'elottoia_cache_aciertos_total' if acierto else 'elottoia_cache_fallos_total'
+        ayuda = "Consultas a caché resueltas sin calcular" if acierto else "Consultas a caché que tuvieron que calcular"
+        self.contador(nombre, ayuda, ('cache',)).inc(cache)
+
+    def cache_contada(self, cache, decorador):
+        """Aplica un decorador de caché (lru_cache, st.cache_resource...) contando aciertos y fallos.
+
+        El fallo se detecta porque la caché llama a la función original; la
+        marca es por hilo y se restaura, así que admite cachés anidadas.
+        """
+        local = self._cache_local
+        aciertos = self.contador('elottoia_cache_aciertos_total', "Consultas a caché resueltas sin calcular", ('cache',))
+        fallos = self.contador('elottoia_cache_fallos_total', "Consultas a caché que tuvieron que calcular", ('cache',))
+
+        def decorar(funcion):
+            @functools.wraps(funcion)
+            def calcular(*args, **kwargs):
+                local.fallo = True
+                return funcion(*args, **kwargs)
+
+            cacheada = decorador(calcular)
+
+            @functools.wraps(funcion)
+            def consultar(*args, **kwargs):
+                previo = getattr(local, 'fallo', False)
+                local.fallo = False
+                try:
+                    return cacheada(*args, **kwargs)
+                finally:
+                    (fallos if local.fallo else aciertos).inc(cache)
+                    local.fallo = previo
+
+            for atributo in ('clear', 'cache_clear', 'cache_info'):
+                if hasattr(cacheada, atributo):
+                    setattr(consultar, atributo, getattr(cacheada, atributo))
+            return consultar
+        return decorar
+
+    # ---------- exposición ----------
+
+    def exponer(self):
+        """Texto en el formato de exposición de Prometheus (0.0.4)"""
+        with self._lock:
+            metricas = sorted(self._metricas.items())
+            colectores = list(self._colectores.values())
+        bloques = []
+        for nombre, metrica in metricas:
+            lineas = metrica.lineas()
+            if lineas:
+                bloques.append([f"# HELP {nombre} {metrica.ayuda}", f"# TYPE {nombre} {metrica.tipo}", *lineas])
+        for colector in colectores:
+            try:
+                familias = colector()
+            except Exception:
+                logger.exception("Colector de métricas fallido")
+                continue
+            for nombre, tipo, ayuda, muestras in familias:
+                bloques.append([f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} {tipo}"] + [
+                    f"{nombre}{_etiquetas(list(etiquetas), list(etiquetas.values()))} {_numero(valor)}"
+                    for etiquetas, valor in muestras
+                ])
+        return "".join(linea + "\n" for bloque in bloques for linea in bloque)
+
+    def volcar(self, ruta):
+        """Escribe la exposición en un temporal y lo renombra (los lectores nunca ven un volcado a medias)"""
+        carpeta = os.path.dirname(os.path.abspath(ruta))
+        fd, temporal = tempfile.mkstemp(dir=carpeta, prefix=".tmp_metricas_")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.exponer())
+            os.replace(temporal, ruta)
+        except BaseException:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+        return ruta
+
+
+_metricas = None
+_lock_metricas = threading.Lock()
+
+
+def obtener_metricas():
+    """Registro de métricas único por proceso"""
+    global _metricas
+    with _lock_metricas:
+        if _metricas is None:
+            _metricas = RegistroMetricas()
+        return _metricas
+
+
+# ============================================
+# 🌐 Exportación: endpoint HTTP y volcado a archivo
+# ============================================
+
+class ManejadorMetricas(BaseHTTPRequestHandler):
+    server_version = "ElottoIA-Metricas"
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0].rstrip('/') not in ("/metrics", ""):
+            self.send_error(404)
+            return
+        contenido = obtener_metricas().exponer().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', TIPO_CONTENIDO)
+        self.send_header('Content-Length', str(len(contenido)))
+        self.end_headers()
+        self.wfile.write(contenido)
+
+    def log_message(self, formato, *args):
+        logger.debug("%s - %s", self.address_string(), formato % args)
+
+
+class ServidorMetricas(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+_servidor = None
+_volcado = None
+_lock_exportacion = threading.Lock()
+
+
+def _volcar_periodicamente(ruta, intervalo, parar):
+    while not parar.wait(intervalo):
+        try:
+            obtener_metricas().volcar(ruta)
+        except OSError as e:
+            logger.warning("No se pudo volcar las métricas en %s: %s", ruta, e)
+
+
+def activar_exportacion(host=HOST, puerto=None, archivo=None, intervalo=INTERVALO_VOLCADO):
+    """Arranca (una vez por proceso) el endpoint /metrics y el volcado periódico.
+
+    Sin argumentos usa ELOTTOIA_METRICAS_PUERTO y ELOTTOIA_METRICAS_ARCHIVO;
+    si no están definidas no arranca nada.
+    """
+    global _servidor, _volcado
+    if puerto is None and os.environ.get('ELOTTOIA_METRICAS_PUERTO'):
+        puerto = PUERTO
+    archivo = archivo or ARCHIVO
+    with _lock_exportacion:
+        if puerto and _servidor is None:
+            _servidor = ServidorMetricas((host, puerto), ManejadorMetricas)
+            threading.Thread(target=_servidor.serve_forever, name="metricas-http", daemon=True).start()
+            logger.info("Métricas en http://%s:%s/metrics", *_servidor.server_address[:2])
+        if archivo and _volcado is None:
+            parar = threading.Event()
+            _volcado = threading.Thread(target=_volcar_periodicamente, args=(archivo, intervalo, parar),
+                                        name="metricas-volcado", daemon=True)
+            _volcado.start()
+            atexit.register(lambda: (parar.set(), obtener_metricas().volcar(archivo)))
+    return _servidor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Consulta el endpoint de métricas de un proceso de ElottoIA")
+    parser.add_argument("--url", default=f"http://{HOST}:{PUERTO}/metrics")
+    parser.add_argument("--salida", help="guarda la exposición en un archivo en lugar de mostrarla")
+    argumentos = parser.parse_args()
+    from urllib.request import urlopen
+    with urlopen(argumentos.url, timeout=10) as respuesta:
+        texto = respuesta.read().decode('utf-8')
+    if argumentos.salida:
+        with open(argumentos.salida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    else:
+        print(texto, end="")
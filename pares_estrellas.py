@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+from itertools import combinations
+
+# Los 66 pares de estrellas en orden numérico: (1, 2), (1, 3), ..., (11, 12)
+PARES_ESTRELLAS = list(combinations(range(1, 13), 2))
+TOTAL_PARES = len(PARES_ESTRELLAS)
+
+_INDICE_PAR = np.full((13, 13), -1, dtype=np.int8)
+for _i, (_a, _b) in enumerate(PARES_ESTRELLAS):
+    _INDICE_PAR[_a, _b] = _INDICE_PAR[_b, _a] = _i
+
+
+def indices_pares(estrellas):
+    """Índice (0-65) del par de estrellas de cada sorteo"""
+    estrellas = np.atleast_2d(np.asarray(estrellas, dtype=np.int64))
+    return _INDICE_PAR[estrellas[:, 0], estrellas[:, 1]].astype(np.int64)
+
+
+def etiqueta_par(indice):
+    a, b = PARES_ESTRELLAS[indice]
+    return f"{a} y {b}"
+
+
+class MotorParesEstrellas:
+    """Consultas sobre pares de estrellas con bincount sobre el índice de par de cada sorteo.
+
+    Cada sorteo tiene exactamente un par, así que la matriz sorteos×66 es
+    one-hot y basta con guardar su índice de columna.
+    """
+
+    def __init__(self, fechas, nums, estrellas):
+        fechas = np.asarray(fechas, dtype='datetime64[D]')
+        self.pares = indices_pares(estrellas) if len(fechas) else np.empty(0, dtype=np.int64)
+        self.nums = np.asarray(nums, dtype=np.int64).reshape(-1, 5)
+        self.anios_sorteo = fechas.astype('datetime64[Y]').astype(np.int64) + 1970
+        self.meses_sorteo = fechas.astype('datetime64[M]').astype(np.int64) % 12 + 1
+        self.anios, self._anio_idx = np.unique(self.anios_sorteo, return_inverse=True)
+        self._anio_idx = self._anio_idx.ravel()
+
+    def conteo(self, anio=None, mes=None):
+        """Veces que salió cada uno de los 66 pares (opcionalmente en un año y/o mes)"""
+        sel = np.ones(len(self.pares), dtype=bool)
+        if anio is not None:
+            sel &= self.anios_sorteo == anio
+        if mes is not None:
+            sel &= self.meses_sorteo == mes
+        return np.bincount(self.pares[sel], minlength=TOTAL_PARES)
+
+    def _tabla(self, veces, k=None):
+        orden = np.argsort(-veces, kind='stable')[:k]
+        total = max(int(veces.sum()), 1)
+        return pd.DataFrame({
+            'Puesto': np.arange(1, len(orden) + 1),
+            'Par': [etiqueta_par(i) for i in orden],
+            'Estrella 1': [PARES_ESTRELLAS[i][0] for i in orden],
+            'Estrella 2': [PARES_ESTRELLAS[i][1] for i in orden],
+            'Veces': veces[orden],
+            'Porcentaje (%)': np.round(veces[orden] / total * 100, 2),
+        })
+
+    def ranking(self, anio=None, mes=None, k=None):
+        """Ranking completo (o top-k) de pares; los empates quedan en orden numérico"""
+        return self._tabla(self.conteo(anio, mes), k)
+
+    def matriz_anual(self):
+        """Veces de cada par por año: matriz (años, 66)"""
+        planos = np.bincount(self._anio_idx * TOTAL_PARES + self.pares, minlength=len(self.anios) * TOTAL_PARES)
+        return planos.reshape(len(self.anios), TOTAL_PARES)
+
+    def matriz_mensual(self):
+        """Veces de cada par por mes del año (todos los años juntos): matriz (12, 66)"""
+        planos = np.bincount((self.meses_sorteo - 1) * TOTAL_PARES + self.pares, minlength=12 * TOTAL_PARES)
+        return planos.reshape(12, TOTAL_PARES)
+
+    @staticmethod
+    def _top_por_grupo(matriz, grupos, nombre, k):
+        orden = np.argsort(-matriz, axis=1, kind='stable')[:, :k]
+        veces = np.take_along_axis(matriz, orden, axis=1)
+        return pd.DataFrame({
+            nombre: np.repeat(grupos, orden.shape[1]),
+            'Puesto': np.tile(np.arange(1, orden.shape[1] + 1), len(grupos)),
+            'Par': [etiqueta_par(i) for i in orden.ravel()],
+            'Veces': veces.ravel(),
+        })
+
+    def top_por_anio(self, k=3):
+        return self._top_por_grupo(self.matriz_anual(), self.anios, 'Año', k)
+
+    def top_por_mes(self, k=3):
+        return self._top_por_grupo(self.matriz_mensual(), np.arange(1, 13), 'Mes', k)
+
+    def tendencias(self):
+        """Pendiente de la cuota anual de cada par (puntos porcentuales por año), ajuste lineal"""
+        matriz = self.matriz_anual()
+        if len(self.anios) < 2:
+            return pd.Series(np.zeros(TOTAL_PARES), index=[etiqueta_par(i) for i in range(TOTAL_PARES)])
+        cuota = matriz / np.maximum(matriz.sum(axis=1, keepdims=True), 1) * 100
+        pendiente = np.polyfit(self.anios.astype(float), cuota, 1)[0]
+        return pd.Series(np.round(pendiente, 3), index=[etiqueta_par(i) for i in range(TOTAL_PARES)])
+
+    def afinidad_numeros(self):
+        """Afinidad número-par de estrellas: (veces juntos, lift) como matrices (50, 66).
+
+        El lift compara las veces observadas con las esperadas si número y par
+        fuesen independientes; > 1 indica que aparecen juntos más de lo esperado.
+        """
+        n = len(self.pares)
+        planos = np.bincount(((self.nums - 1) * TOTAL_PARES + self.pares[:, None]).ravel(),
+                             minlength=50 * TOTAL_PARES)
+        juntos = planos.reshape(50, TOTAL_PARES)
+        esperado = juntos.sum(axis=1, keepdims=True) * np.bincount(self.pares, minlength=TOTAL_PARES) / max(n, 1)
+        lift = np.divide(juntos, esperado, out=np.zeros(juntos.shape), where=esperado > 0)
+        return juntos, lift
+
+    def top_afinidades(self, k=10, minimo=5):
+        """Parejas número-par con mayor lift entre las que aparecen al menos `minimo` veces juntas"""
+        juntos, lift = self.afinidad_numeros()
+        candidatas = np.flatnonzero(juntos.ravel() >= minimo)
+        orden = candidatas[np.argsort(-lift.ravel()[candidatas], kind='stable')[:k]]
+        numero, par = np.divmod(orden, TOTAL_PARES)
+        return pd.DataFrame({
+            'Número': numero + 1,
+            'Par de estrellas': [etiqueta_par(i) for i in par],
+            'Veces juntos': juntos.ravel()[orden],
+            'Lift': np.round(lift.ravel()[orden], 2),
+        })
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+from boletos import MASCARA_NUMEROS, contar_bits, mascaras_boletos
+
+# Categorías de premio de Euromillones: (aciertos de números, aciertos de estrellas) -> categoría
+CATEGORIAS = {
+    (5, 2): 1, (5, 1): 2, (5, 0): 3, (4, 2): 4, (4, 1): 5, (3, 2): 6, (4, 0): 7,
+    (2, 2): 8, (3, 1): 9, (3, 0): 10, (1, 2): 11, (2, 1): 12, (2, 0): 13,
+}
+TOTAL_CATEGORIAS = len(CATEGORIAS)
+
+_TABLA_CATEGORIAS = np.zeros((6, 3), dtype=np.int8)  # 0 = sin premio
+for (_n, _e), _c in CATEGORIAS.items():
+    _TABLA_CATEGORIAS[_n, _e] = _c
+
+
+def aciertos(mascaras, mascara_sorteo):
+    """(aciertos de números, aciertos de estrellas) de cada boleto frente a un sorteo, como máscaras uint64"""
+    comunes = np.asarray(mascaras, dtype=np.uint64) & np.uint64(mascara_sorteo)
+    numeros = contar_bits(comunes & MASCARA_NUMEROS).astype(np.int8)
+    estrellas = contar_bits(comunes & ~MASCARA_NUMEROS).astype(np.int8)
+    return numeros, estrellas
+
+
+def categoria(aciertos_numeros, aciertos_estrellas):
+    """Categoría de premio (1-13, 0 sin premio) para arrays de aciertos"""
+    return _TABLA_CATEGORIAS[aciertos_numeros, aciertos_estrellas]
+
+
+def indice_sorteo(datos, fecha=None):
+    """Posición del sorteo de esa fecha en el histórico (el último si no se indica)"""
+    if not len(datos.fechas):
+        raise ValueError("No hay sorteos en el histórico")
+    if fecha is None:
+        return len(datos.fechas) - 1
+    dias = np.asarray(datos.fechas, dtype='datetime64[D]')
+    posicion = np.flatnonzero(dias == np.datetime64(fecha, 'D'))
+    if not len(posicion):
+        raise ValueError(f"No hay sorteo el {fecha}")
+    return int(posicion[-1])
+
+
+def fecha_sorteo(datos, indice):
+    return str(np.datetime64(datos.fechas[indice], 'D'))
+
+
+def comprobar_boletos(nums, estrellas, datos, fecha=None):
+    """Aciertos y categoría de cada boleto en el sorteo de `fecha` (o el último)"""
+    indice = indice_sorteo(datos, fecha)
+    n, e = aciertos(mascaras_boletos(nums, estrellas), datos.mascaras[indice])
+    return pd.DataFrame({
+        'aciertos_numeros': n,
+        'aciertos_estrellas': e,
+        'categoria': categoria(n, e),
+    }), fecha_sorteo(datos, indice)
+
+
+def premios_historicos(nums, estrellas, datos, bloque=4096):
+    """Veces que cada boleto habría obtenido cada categoría en todo el histórico: matriz (boletos, 14)"""
+    mascaras = mascaras_boletos(nums, estrellas)
+    sorteos = np.asarray(datos.mascaras, dtype=np.uint64)
+    conteo = np.zeros((len(mascaras), TOTAL_CATEGORIAS + 1), dtype=np.int64)
+    for ini in range(0, len(mascaras), bloque):
+        comunes = mascaras[ini:ini + bloque, None] & sorteos[None, :]
+        cats = categoria(contar_bits(comunes & MASCARA_NUMEROS), contar_bits(comunes & ~MASCARA_NUMEROS))
+        filas = np.arange(len(cats))[:, None]
+        np.add.at(conteo[ini:ini + bloque], (np.broadcast_to(filas, cats.shape), cats), 1)
+    return conteo
@@ -0,0 +1,334 @@
+import argparse
+import os
+import re
+import struct
+import zlib
+from datetime import date, datetime
+import numpy as np
+from historico import (
+    ARCHIVO_BINARIO, ARCHIVO_CONVERTIDO, ARCHIVO_CSV, ARCHIVO_MENSUAL, MESES, MESES_ABREVIADOS,
+    linea_convertido, linea_csv, linea_mensual
+)
+
+# ============================================
+# 🗄️ Registro binario canónico del histórico
+# ============================================
+# Formato (little endian):
+#   cabecera de 16 bytes: b"ELOT", versión (u2), tamaño de registro (u2),
+#                         número de sorteos (u4), CRC32 de los registros (u4)
+#   registros de 11 bytes en orden cronológico: días desde 1970-01-01 (i4),
+#                         5 números (u1) y 2 estrellas (u1)
+# Cargar el histórico es un único np.memmap: los arrays son vistas del archivo.
+
+MAGICO = b"ELOT"
+VERSION_FORMATO = 1
+CABECERA = struct.Struct("<4sHHII")
+REGISTRO = np.dtype([('dias', '<i4'), ('numeros', 'u1', (5,)), ('estrellas', 'u1', (2,))])
+BLOQUE = 65536  # registros por bloque al convertir
+
+_PATRON_MENSUAL = re.compile(
+    r"^\s*(\d{1,2})-([a-zA-Z]{3})[\w-]*:\s*"
+    r"(\d{1,2})[-,\s]+(\d{1,2})[-,\s]+(\d{1,2})[-,\s]+(\d{1,2})[-,\s]+(\d{1,2})"
+    r"\D*?Estrellas:\s*(\d{1,2})[-,\s]+(\d{1,2})"
+)
+
+
+class RegistroInvalido(ValueError):
+    pass
+
+
+def _cabecera(n, crc):
+    return CABECERA.pack(MAGICO, VERSION_FORMATO, REGISTRO.itemsize, n, crc)
+
+
+def _leer_cabecera(f):
+    datos = f.read(CABECERA.size)
+    if len(datos) < CABECERA.size:
+        raise RegistroInvalido("Registro truncado: falta la cabecera")
+    magico, version, tam, n, crc = CABECERA.unpack(datos)
+    if magico != MAGICO or version != VERSION_FORMATO or tam != REGISTRO.itemsize:
+        raise RegistroInvalido("No es un registro de sorteos compatible")
+    return n, crc
+
+
+def cargar_registro(ruta=ARCHIVO_BINARIO, verificar=False):
+    """Proyecta el registro en memoria y devuelve el array estructurado (solo lectura).
+
+    Con verificar=True se comprueba además el CRC32 de los registros.
+    """
+    with open(ruta, "rb") as f:
+        n, crc = _leer_cabecera(f)
+    if os.path.getsize(ruta) < CABECERA.size + n * REGISTRO.itemsize:
+        raise RegistroInvalido("Registro truncado: faltan sorteos")
+    if n == 0:
+        return np.empty(0, dtype=REGISTRO)
+    registros = np.memmap(ruta, dtype=REGISTRO, mode='r', offset=CABECERA.size, shape=(n,))
+    if verificar and zlib.crc32(registros.tobytes()) != crc:
+        raise RegistroInvalido("El CRC32 del registro no coincide")
+    return registros
+
+
+def sorteos_de_registro(registros):
+    """(fechas datetime64[ns], números int8 ordenados, estrellas int8 ordenadas) como cargar_sorteos"""
+    fechas = registros['dias'].astype('datetime64[D]').astype('datetime64[ns]')
+    nums = np.sort(registros['numeros'].astype(np.int8), axis=1)
+    estrellas = np.sort(registros['estrellas'].astype(np.int8), axis=1)
+    return fechas, nums, estrellas
+
+
+def guardar_registro(registros, ruta=ARCHIVO_BINARIO):
+    """Escribe un registro completo (ordenado por fecha) en un temporal y lo renombra"""
+    registros = np.asarray(registros, dtype=REGISTRO)
+    registros = registros[np.argsort(registros['dias'], kind='stable')]
+    temporal = ruta + ".tmp"
+    with open(temporal, "wb") as f:
+        f.write(_cabecera(len(registros), zlib.crc32(registros.tobytes())))
+        f.write(registros.tobytes())
+    os.replace(temporal, ruta)
+    return len(registros)
+
+
+def anexar_registro(fecha, nums, estrellas, ruta=ARCHIVO_BINARIO):
+    """Añade un sorteo al final del registro en O(1).
+
+    Se escribe primero el registro y después la cabecera, así que un lector
+    concurrente ve siempre el recuento anterior o el nuevo, nunca uno a medias.
+    """
+    registro = np.zeros(1, dtype=REGISTRO)
+    registro['dias'] = (np.datetime64(fecha, 'D') - np.datetime64(0, 'D')).astype(np.int64)
+    registro['numeros'] = nums
+    registro['estrellas'] = estrellas
+    with open(ruta, "r+b") as f:
+        n, crc = _leer_cabecera(f)
+        if n:
+            f.seek(CABECERA.size + (n - 1) * REGISTRO.itemsize)
+            ultimo = np.frombuffer(f.read(REGISTRO.itemsize), dtype=REGISTRO)[0]
+            if registro['dias'][0] <= ultimo['dias']:
+                raise ValueError("Solo se pueden añadir sorteos posteriores al último del registro")
+        datos = registro.tobytes()
+        f.seek(CABECERA.size + n * REGISTRO.itemsize)
+        f.write(datos)
+        f.truncate()
+        f.flush()
+        f.seek(0)
+        f.write(_cabecera(n + 1, zlib.crc32(datos, crc)))
+
+
+# ============================================
+# 🔄 Conversores desde y hacia los formatos de texto
+# ============================================
+
+def _dias(fecha):
+    return (fecha - date(1970, 1, 1)).days
+
+
+def _en_bloques(filas):
+    """Agrupa tuplas (días, n1..n5, e1, e2) en arrays estructurados de BLOQUE registros"""
+    bloque = []
+    for fila in filas:
+        bloque.append((fila[0], fila[1:6], fila[6:8]))
+        if len(bloque) == BLOQUE:
+            yield np.array(bloque, dtype=REGISTRO)
+            bloque = []
+    if bloque:
+        yield np.array(bloque, dtype=REGISTRO)
+
+
+def leer_csv(ruta=ARCHIVO_CSV):
+    """Filas (días, n1..n5, e1, e2) del CSV, línea a línea"""
+    with open(ruta, "r", encoding="utf-8") as f:
+        next(f, None)
+        for linea in f:
+            campos = [c for c in linea.strip().split(',') if c]
+            if len(campos) < 8:
+                continue
+            fecha = datetime.strptime(campos[0], '%d/%m/%Y').date()
+            yield (_dias(fecha), *map(int, campos[1:8]))
+
+
+def leer_convertido(ruta=ARCHIVO_CONVERTIDO):
+    """Filas del formato año;números;estrellas.
+
+    Ese formato solo guarda el año: la fecha se fija al 1 de enero y el
+    comprobador de consistencia solo compara años para este archivo.
+    """
+    with open(ruta, "r", encoding="utf-8") as f:
+        for linea in f:
+            partes = linea.strip().split(';')
+            if len(partes) != 3 or not partes[0].isdigit():
+                continue
+            nums = [int(x) for x in partes[1].split(',') if x.strip()]
+            estrellas = [int(x) for x in partes[2].split(',') if x.strip()]
+            if len(nums) == 5 and len(estrellas) == 2:
+                yield (_dias(date(int(partes[0]), 1, 1)), *nums, *estrellas)
+
+
+def leer_mensual(ruta=ARCHIVO_MENSUAL):
+    """Filas del archivo por meses (años como cabecera, 'dd-mmm: ... Estrellas: ...')"""
+    anio = None
+    with open(ruta, "r", encoding="utf-8") as f:
+        for linea in f:
+            texto = linea.strip()
+            if texto.isdigit() and len(texto) == 4:
+                anio = int(texto)
+                continue
+            coincidencia = _PATRON_MENSUAL.match(linea)
+            if coincidencia is None or anio is None:
+                continue
+            dia, mes, *valores = coincidencia.groups()
+            if mes.lower() not in MESES_ABREVIADOS:
+                continue
+            try:
+                fecha = date(anio, MESES_ABREVIADOS.index(mes.lower()) + 1, int(dia))
+            except ValueError:
+                continue
+            yield (_dias(fecha), *map(int, valores))
+
+
+LECTORES = {'csv': leer_csv, 'convertido': leer_convertido, 'mensual': leer_mensual}
+ARCHIVOS_TEXTO = {'csv': ARCHIVO_CSV, 'convertido': ARCHIVO_CONVERTIDO, 'mensual': ARCHIVO_MENSUAL}
+
+
+def convertir_a_registro(formato, origen=None, destino=ARCHIVO_BINARIO):
+    """Crea el registro binario a partir de uno de los formatos de texto"""
+    origen = origen or ARCHIVOS_TEXTO[formato]
+    bloques = list(_en_bloques(LECTORES[formato](origen)))
+    return guardar_registro(np.concatenate(bloques) if bloques else np.empty(0, dtype=REGISTRO), destino)
+
+
+def _filas_registro(registros):
+    for ini in range(0, len(registros), BLOQUE):
+        bloque = registros[ini:ini + BLOQUE]
+        fechas = bloque['dias'].astype('datetime64[D]').astype(object)
+        for fecha, nums, estrellas in zip(fechas, bloque['numeros'].tolist(), bloque['estrellas'].tolist()):
+            yield fecha, nums, estrellas
+
+
+def exportar_texto(formato, destino=None, registros=None):
+    """Escribe el registro en uno de los formatos de texto (en streaming, por bloques)"""
+    registros = cargar_registro() if registros is None else registros
+    destino = destino or ARCHIVOS_TEXTO[formato]
+    with open(destino, "w", encoding="utf-8", newline="") as f:
+        if formato == 'csv':
+            f.write("FECHA,N1,N2,N3,N4,N5,,E1,E2\r\n")
+            # El CSV va del más reciente al más antiguo
+            for fecha, nums, estrellas in _filas_registro(registros[::-1]):
+                f.write(linea_csv(fecha, nums, estrellas) + "\r\n")
+        elif formato == 'convertido':
+            for fecha, nums, estrellas in _filas_registro(registros):
+                f.write(linea_convertido(fecha, nums, estrellas) + "\n")
+        else:
+            anio = mes = None
+            for fecha, nums, estrellas in _filas_registro(registros):
+                if fecha.year != anio:
+                    f.write(("\r\n" if anio else "") + f"{fecha.year} \r\n")
+                    anio, mes = fecha.year, None
+                if fecha.month != mes:
+                    f.write(MESES[fecha.month - 1] + "\r\n")
+                    mes = fecha.month
+                f.write(linea_mensual(fecha, nums, estrellas) + "\r\n")
+    return destino
+
+
+# ============================================
+# 🔍 Comprobación de consistencia
+# ============================================
+
+def _claves(filas, solo_anio=False):
+    """Multiconjunto de sorteos (fecha o año, números ordenados, estrellas ordenadas)"""
+    claves = {}
+    for fila in filas:
+        dias = int(fila[0])
+        momento = (np.datetime64(dias, 'D').astype(object).year if solo_anio else dias)
+        clave = (momento, tuple(sorted(fila[1:6])), tuple(sorted(fila[6:8])))
+        claves[clave] = claves.get(clave, 0) + 1
+    return claves
+
+
+def _diferencia(a, b):
+    return sorted(clave for clave, veces in a.items() if veces > b.get(clave, 0))
+
+
+def _describir(clave, solo_anio=False):
+    momento, nums, estrellas = clave
+    momento = momento if solo_anio else np.datetime64(momento, 'D').astype(object).strftime('%d/%m/%Y')
+    return f"{momento}: {' - '.join(map(str, nums))} ⭐ {' - '.join(map(str, estrellas))}"
+
+
+def comprobar_consistencia(ruta=ARCHIVO_BINARIO, directorio="."):
+    """Valida el registro (CRC, orden, rangos) y lo compara con los tres formatos de texto.
+
+    Devuelve un dict con los problemas del registro y, por formato, los sorteos
+    que solo aparecen en el registro o solo en el archivo de texto.
+    """
+    informe = {'registro': [], 'formatos': {}}
+    try:
+        registros = cargar_registro(ruta, verificar=True)
+    except (OSError, RegistroInvalido) as e:
+        informe['registro'].append(str(e))
+        return informe
+
+    dias = registros['dias']
+    if len(dias) and (np.diff(dias) <= 0).any():
+        informe['registro'].append("Las fechas no están en orden estrictamente creciente")
+    nums, estrellas = registros['numeros'], registros['estrellas']
+    if ((nums < 1) | (nums > 50)).any() or ((estrellas < 1) | (estrellas > 12)).any():
+        informe['registro'].append("Hay números o estrellas fuera de rango")
+    if (np.diff(np.sort(nums, axis=1), axis=1) == 0).any() or (estrellas[:, 0] == estrellas[:, 1]).any():
+        informe['registro'].append("Hay sorteos con valores repetidos")
+
+    filas_registro = [(int(d), *n, *e) for d, n, e in zip(dias, nums.tolist(), estrellas.tolist())]
+    for formato, archivo in ARCHIVOS_TEXTO.items():
+        ruta_texto = os.path.join(directorio, archivo)
+        if not os.path.exists(ruta_texto):
+            continue
+        solo_anio = formato == 'convertido'
+        en_registro = _claves(filas_registro, solo_anio)
+        en_texto = _claves(LECTORES[formato](ruta_texto), solo_anio)
+        informe['formatos'][formato] = {
+            'sorteos': sum(en_texto.values()),
+            'solo_en_registro': [_describir(c, solo_anio) for c in _diferencia(en_registro, en_texto)],
+            'solo_en_archivo': [_describir(c, solo_anio) for c in _diferencia(en_texto, en_registro)],
+        }
+    return informe
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Registro binario del histórico de Euromillones")
+    sub = parser.add_subparsers(dest='orden', required=True)
+    desde = sub.add_parser('desde', help="Crear el registro a partir de un formato de texto")
+    desde.add_argument('formato', choices=sorted(LECTORES))
+    desde.add_argument('--origen')
+    desde.add_argument('--registro', default=ARCHIVO_BINARIO)
+    hacia = sub.add_parser('hacia', help="Escribir el registro en un formato de texto")
+    hacia.add_argument('formato', choices=sorted(LECTORES))
+    hacia.add_argument('--destino')
+    hacia.add_argument('--registro', default=ARCHIVO_BINARIO)
+    comprobar = sub.add_parser('comprobar', help="Comprobar el registro frente a los archivos de texto")
+    comprobar.add_argument('--registro', default=ARCHIVO_BINARIO)
+    comprobar.add_argument('--directorio', default=".")
+    args = parser.parse_args(argumentos)
+
+    if args.orden == 'desde':
+        n = convertir_a_registro(args.formato, args.origen, args.registro)
+        print(f"{n} sorteos escritos en {args.registro}")
+    elif args.orden == 'hacia':
+        print(f"Escrito {exportar_texto(args.formato, args.destino, cargar_registro(args.registro, verificar=True))}")
+    else:
+        informe = comprobar_consistencia(args.registro, args.directorio)
+        for problema in informe['registro']:
+            print(f"❌ {problema}")
+        for formato, resultado in informe['formatos'].items():
+            print(f"{formato}: {resultado['sorteos']} sorteos, "
+                  f"{len(resultado['solo_en_registro'])} solo en el registro, "
+                  f"{len(resultado['solo_en_archivo'])} solo en el archivo")
+            for linea in resultado['solo_en_registro'][:10]:
+                print(f"   - falta en {formato}: {linea}")
+            for linea in resultado['solo_en_archivo'][:10]:
+                print(f"   + sobra en {formato}: {linea}")
+        return 1 if informe['registro'] else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
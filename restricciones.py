@@ -0,0 +1,42 @@
+import numpy as np
+from boletos import MASCARA_NUMEROS, contar_bits, decodificar, mascaras_boletos
+
+
+class RestriccionesHistoricas:
+    """Restricciones de generación frente al histórico de sorteos y a la sesión.
+
+    Los sorteos se guardan como máscaras uint64 (números + estrellas), así que
+    comprobar un candidato contra todo el histórico es un único AND + popcount
+    vectorizado.
+    """
+
+    def __init__(self, mascaras_sorteos, max_coincidencias=5, excluir_ganadoras=True, excluidas=()):
+        # excluidas: códigos de boleto (boletos.codificar) que no se pueden volver a generar
+        mascaras_sorteos = np.asarray(mascaras_sorteos, dtype=np.uint64)
+        self.sorteos_numeros = mascaras_sorteos & MASCARA_NUMEROS
+        self.max_coincidencias = max_coincidencias
+
+        prohibidas = [mascaras_boletos(*decodificar(list(excluidas)))] if len(excluidas) else []
+        if excluir_ganadoras:
+            prohibidas.append(mascaras_sorteos)
+        self.prohibidas = np.unique(np.concatenate(prohibidas)) if prohibidas else np.empty(0, np.uint64)
+
+    def filtrar(self, mascaras, bloque=1024):
+        """Devuelve un array booleano con los candidatos que cumplen las restricciones"""
+        mascaras = np.asarray(mascaras, dtype=np.uint64)
+        validas = np.ones(len(mascaras), dtype=bool)
+        if len(self.prohibidas):
+            pos = np.searchsorted(self.prohibidas, mascaras).clip(max=len(self.prohibidas) - 1)
+            validas &= self.prohibidas[pos] != mascaras
+
+        if self.max_coincidencias < 5 and len(self.sorteos_numeros):
+            indices = np.flatnonzero(validas)
+            for ini in range(0, len(indices), bloque):
+                sel = indices[ini:ini + bloque]
+                inter = (mascaras[sel] & MASCARA_NUMEROS)[:, None] & self.sorteos_numeros[None, :]
+                validas[sel] = contar_bits(inter).max(axis=1) <= self.max_coincidencias
+        return validas
+
+    def admite(self, nums, estrellas):
+        """Comprueba un único boleto"""
+        return bool(self.filtrar(mascaras_boletos(nums, estrellas))[0])
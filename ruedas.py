@@ -0,0 +1,174 @@
+import numpy as np
+from itertools import combinations
+from math import comb
+from boletos import contar_bits, formatear_combinacion
+
+MAX_CANDIDATOS = 6000   # boletos candidatos evaluados por iteración voraz
+MUESTRA_LOCAL = 512     # candidatos probados por posición en la búsqueda local
+
+# Bits activos de cada byte, para contar cobertura sobre bitsets empaquetados
+_BITS_8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _mascaras_subconjuntos(n, k):
+    """Máscaras (uint32) de todos los subconjuntos de tamaño k de range(n)"""
+    indices = np.array(list(combinations(range(n), k)), dtype=np.uint32).reshape(-1, k)
+    return np.bitwise_or.reduce(np.left_shift(np.uint32(1), indices), axis=1)
+
+
+def _matriz_cobertura(candidatos, elementos, garantia, bloque=256):
+    """Bitset empaquetado (candidatos x elementos): el boleto cubre el elemento si comparten >= garantia números"""
+    ancho = (len(elementos) + 7) // 8
+    cobertura = np.empty((len(candidatos), ancho), dtype=np.uint8)
+    for ini in range(0, len(candidatos), bloque):
+        inter = candidatos[ini:ini + bloque, None] & elementos[None, :]
+        cobertura[ini:ini + bloque] = np.packbits(contar_bits(inter) >= garantia, axis=1)
+    return cobertura
+
+
+def _ganancias(cobertura, libres):
+    """Número de elementos libres que cubre cada fila de la matriz de cobertura.
+
+    Solo se recorren los bytes de `libres` con algún bit activo: tras cada
+    boleto elegido cambian pocos elementos y la actualización es casi gratis.
+    """
+    columnas = np.flatnonzero(libres)
+    if 2 * len(columnas) > len(libres):
+        return _BITS_8[cobertura & libres].sum(axis=1, dtype=np.int64)
+    return _BITS_8[cobertura[:, columnas] & libres[columnas]].sum(axis=1, dtype=np.int64)
+
+
+def _busqueda_local(cobertura, elegidos, total, ganancia, rng, max_pasadas=3):
+    """Sustituye boletos de la rueda mientras alguna sustitución aumente la cobertura.
+
+    `ganancia` (elementos sin cubrir que cubre cada candidato) se mantiene al
+    día con cada sustitución; la de un candidato frente a la rueda sin el
+    boleto `pos` es esa ganancia más los elementos que solo cubría `pos`.
+    """
+    filas = np.unpackbits(cobertura[elegidos], axis=1, count=total).astype(np.int32)
+    cuenta = filas.sum(axis=0)
+    for _ in range(max_pasadas):
+        mejora = False
+        for pos in rng.permutation(len(elegidos)):
+            exclusivos = np.packbits((cuenta == 1) & (filas[pos] == 1))
+            muestra = rng.choice(len(cobertura), size=min(MUESTRA_LOCAL, len(cobertura)), replace=False)
+            candidata = ganancia[muestra] + _ganancias(cobertura[muestra], exclusivos)
+            actual = int(_BITS_8[exclusivos].sum())
+            mejor = int(np.argmax(candidata))
+            if candidata[mejor] > actual and muestra[mejor] not in elegidos:
+                ganancia += _ganancias(cobertura, exclusivos)
+                cuenta -= filas[pos]
+                elegidos[pos] = int(muestra[mejor])
+                filas[pos] = np.unpackbits(cobertura[elegidos[pos]], count=total)
+                ganancia -= _ganancias(cobertura, np.packbits((cuenta == 0) & (filas[pos] == 1)))
+                cuenta += filas[pos]
+                mejora = True
+        if not mejora or (cuenta > 0).all():
+            break
+    return elegidos
+
+
+def _validar(pool, aciertos, garantia):
+    pool = sorted(set(int(n) for n in pool))
+    if len(pool) < 5 or pool[0] < 1 or pool[-1] > 50:
+        raise ValueError("El pool debe tener al menos 5 números distintos entre 1 y 50")
+    if len(pool) > 25:
+        raise ValueError("El pool admite como máximo 25 números")
+    if not 1 <= garantia <= aciertos <= 5:
+        raise ValueError("Se requiere 1 <= garantía <= aciertos <= 5")
+    return pool
+
+
+def _repartir_estrellas(n_boletos, estrellas, rng):
+    """Reparte los pares de estrellas de forma equilibrada entre los boletos"""
+    estrellas = sorted(set(int(e) for e in (estrellas or range(1, 13))))
+    if len(estrellas) < 2:
+        raise ValueError("Se necesitan al menos 2 estrellas")
+    pares = list(combinations(estrellas, 2))
+    orden = rng.permutation(len(pares))
+    return [list(pares[orden[i % len(pares)]]) for i in range(n_boletos)]
+
+
+def evaluar_cobertura(boletos, pool, aciertos=3, garantia=3):
+    """Cobertura de un conjunto de boletos sobre el pool.
+
+    Devuelve qué fracción de los subconjuntos de `aciertos` números del pool
+    quedan con al menos `garantia` números en algún boleto.
+    """
+    pool = _validar(pool, aciertos, garantia)
+    posicion = {n: i for i, n in enumerate(pool)}
+    elementos = _mascaras_subconjuntos(len(pool), aciertos)
+    mascaras = np.array(
+        [sum(1 << posicion[n] for n in nums if n in posicion) for nums in boletos] or [0],
+        dtype=np.uint32
+    )
+    cubiertos = np.zeros(len(elementos), dtype=bool)
+    for ini in range(0, len(mascaras), 256):
+        inter = mascaras[ini:ini + 256, None] & elementos[None, :]
+        cubiertos |= (contar_bits(inter) >= garantia).any(axis=0)
+    return {
+        'cubiertos': int(cubiertos.sum()),
+        'total': len(elementos),
+        'cobertura': round(100 * cubiertos.mean(), 2)
+    }
+
+
+def generar_rueda(pool, max_boletos, aciertos=3, garantia=3, estrellas=None, rng=None):
+    """Construye un sistema reducido sobre un pool de números.
+
+    Con aciertos == garantia se maximiza la cobertura de pares/tríos del pool;
+    con garantia < aciertos se busca la garantía "si salen `aciertos` números
+    del pool, algún boleto tiene al menos `garantia`". La construcción es voraz
+    sobre bitsets de cobertura y se refina con búsqueda local si no se alcanza
+    el 100% con el presupuesto dado.
+    """
+    pool = _validar(pool, aciertos, garantia)
+    if max_boletos < 1:
+        raise ValueError("El presupuesto debe ser de al menos 1 boleto")
+    rng = rng if rng is not None else np.random.default_rng()
+
+    v = len(pool)
+    elementos = _mascaras_subconjuntos(v, aciertos)
+    if comb(v, 5) <= MAX_CANDIDATOS:
+        candidatos = _mascaras_subconjuntos(v, 5)
+    else:
+        # Muestra de boletos del pool sin repetición
+        claves = rng.random((MAX_CANDIDATOS * 2, v)).argsort(axis=1)[:, :5].astype(np.uint32)
+        candidatos = np.unique(np.bitwise_or.reduce(np.left_shift(np.uint32(1), claves), axis=1))
+        candidatos = rng.permutation(candidatos)[:MAX_CANDIDATOS]
+    cobertura = _matriz_cobertura(candidatos, elementos, garantia)
+
+    total = len(elementos)
+    libres = np.packbits(np.ones(total, dtype=bool))
+    ganancia = _ganancias(cobertura, libres)
+    elegidos = []
+    while len(elegidos) < max_boletos and libres.any():
+        # Desempate aleatorio entre candidatos con la misma ganancia
+        mejor = int(np.argmax(ganancia + rng.random(len(ganancia)) * 0.5))
+        if ganancia[mejor] == 0:
+            break
+        elegidos.append(mejor)
+        # Solo cambia la ganancia de las filas que cubren algún elemento recién cubierto
+        nuevos = cobertura[mejor] & libres
+        libres &= ~nuevos
+        ganancia -= _ganancias(cobertura, nuevos)
+    cubiertos = ~np.unpackbits(libres, count=total).astype(bool)
+
+    if not cubiertos.all() and len(elegidos) > 1:
+        elegidos = _busqueda_local(cobertura, elegidos, total, ganancia, rng)
+        filas = np.unpackbits(cobertura[elegidos], axis=1, count=total)
+        cubiertos = filas.any(axis=0)
+
+    boletos_nums = [
+        [pool[i] for i in range(v) if int(candidatos[idx]) >> i & 1]
+        for idx in elegidos
+    ]
+    boletos_estrellas = _repartir_estrellas(len(boletos_nums), estrellas, rng)
+    return {
+        'boletos': list(zip(boletos_nums, boletos_estrellas)),
+        'combinaciones': [formatear_combinacion(n, e) for n, e in zip(boletos_nums, boletos_estrellas)],
+        'cubiertos': int(cubiertos.sum()),
+        'total': total,
+        'cobertura': round(100 * cubiertos.mean(), 2),
+        'garantia_completa': bool(cubiertos.all())
+    }
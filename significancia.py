@@ -0,0 +1,201 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import pandas as pd
+
+SIMULACIONES = 1000
+SIMULACIONES_POR_TAREA = 50
+ALFA = 0.05
+
+_PAR_I, _PAR_J = np.triu_indices(50, k=1)
+
+
+# ============================================
+# 📐 Estadísticos de un histórico
+# ============================================
+
+def _huecos(incidencia):
+    """(hueco actual, hueco máximo) de cada columna de una matriz de incidencia (sorteos, elementos)"""
+    n = len(incidencia)
+    posiciones = np.arange(n)[:, None]
+    ultima = np.maximum.accumulate(np.where(incidencia, posiciones, -1), axis=0)
+    huecos = posiciones - ultima
+    return huecos[-1], huecos.max(axis=0)
+
+
+def estadisticos(nums, estrellas):
+    """Frecuencias, pares de números y huecos de un histórico (sorteos en orden cronológico)"""
+    nums = np.asarray(nums, dtype=np.int64)
+    estrellas = np.asarray(estrellas, dtype=np.int64)
+    n = len(nums)
+    incidencia = np.zeros((n, 50), dtype=np.float32)
+    incidencia[np.arange(n)[:, None], nums - 1] = 1
+    pares = (incidencia.T @ incidencia)[_PAR_I, _PAR_J]
+    hueco_actual, hueco_maximo = _huecos(incidencia.astype(bool))
+    return {
+        'frecuencia_numeros': incidencia.sum(axis=0).astype(np.int64),
+        'frecuencia_estrellas': np.bincount(estrellas.ravel() - 1, minlength=12),
+        'pares': pares.astype(np.int64),
+        'hueco_actual': hueco_actual,
+        'hueco_maximo': hueco_maximo,
+    }
+
+
+# Estrellas en juego según la fecha: 1-9 hasta mayo de 2011, 1-11 hasta septiembre de 2016
+CAMBIOS_ESTRELLAS = ((np.datetime64('2011-05-10'), 11), (np.datetime64('2016-09-24'), 12))
+
+
+def estrellas_en_juego(fechas):
+    """Número de estrellas posibles en cada sorteo"""
+    fechas = np.asarray(fechas, dtype='datetime64[D]')
+    en_juego = np.full(len(fechas), 9, dtype=np.int64)
+    for desde, total in CAMBIOS_ESTRELLAS:
+        en_juego[fechas >= desde] = total
+    return en_juego
+
+
+def _sorteos_uniformes(rng, en_juego):
+    """Sorteos uniformes; en_juego indica cuántas estrellas había disponibles en cada uno"""
+    n = len(en_juego)
+    nums = rng.random((n, 50)).argpartition(5, axis=1)[:, :5] + 1
+    claves = rng.random((n, 12))
+    claves[np.arange(12)[None, :] >= en_juego[:, None]] = 2.0  # nunca se eligen
+    estrellas = claves.argpartition(2, axis=1)[:, :2] + 1
+    return nums, estrellas
+
+
+def _simular_bloque(en_juego, n_simulaciones, semilla):
+    """Estadísticos de n_simulaciones históricos uniformes (se ejecuta en un proceso del pool)"""
+    rng = np.random.default_rng(semilla)
+    resultados = [estadisticos(*_sorteos_uniformes(rng, en_juego)) for _ in range(n_simulaciones)]
+    return {clave: np.stack([r[clave] for r in resultados]) for clave in resultados[0]}
+
+
+def simular_nulos(en_juego, n_simulaciones=SIMULACIONES, semilla=0, procesos=None):
+    """Distribuciones nulas: estadísticos de n_simulaciones históricos sintéticos del mismo tamaño.
+
+    Las simulaciones se reparten en tareas independientes por un pool de
+    procesos; cada tarea tiene su propia semilla derivada, así que el
+    resultado no depende del número de procesos. Si no se puede crear el pool
+    se calcula en el proceso actual.
+    """
+    tamanos = [SIMULACIONES_POR_TAREA] * (n_simulaciones // SIMULACIONES_POR_TAREA)
+    if n_simulaciones % SIMULACIONES_POR_TAREA:
+        tamanos.append(n_simulaciones % SIMULACIONES_POR_TAREA)
+    semillas = np.random.SeedSequence(semilla).spawn(len(tamanos))
+    procesos = procesos or min(len(tamanos), os.cpu_count() or 1)
+
+    bloques = None
+    if procesos > 1:
+        try:
+            contexto = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto) as pool:
+                bloques = list(pool.map(_simular_bloque, [en_juego] * len(tamanos), tamanos, semillas))
+        except (OSError, BrokenProcessPool):
+            bloques = None
+    if bloques is None:
+        bloques = [_simular_bloque(en_juego, t, s) for t, s in zip(tamanos, semillas)]
+    return {clave: np.concatenate([b[clave] for b in bloques]) for clave in bloques[0]}
+
+
+# ============================================
+# 🧪 p-valores y corrección por comparaciones múltiples
+# ============================================
+
+def benjamini_hochberg(p_valores):
+    """q-valores de Benjamini-Hochberg (control de la tasa de falsos descubrimientos)"""
+    p = np.asarray(p_valores, dtype=float)
+    if p.size == 0:
+        return p
+    orden = np.argsort(p)
+    ajustados = p[orden] * len(p) / np.arange(1, len(p) + 1)
+    ajustados = np.minimum.accumulate(ajustados[::-1])[::-1]
+    q = np.empty_like(p)
+    q[orden] = np.minimum(ajustados, 1)
+    return q
+
+
+def p_valores(observado, nulos, cola='superior', conjunta=True):
+    """p-valores empíricos de cada elemento frente a su distribución nula (simulaciones, elementos).
+
+    Con conjunta=True se juntan las muestras de todos los elementos en una
+    sola distribución nula, válido cuando bajo la hipótesis nula son
+    intercambiables (todos los números tienen la misma distribución).
+    """
+    nulos = np.asarray(nulos, dtype=float)
+    observado = np.asarray(observado, dtype=float)
+    if conjunta:
+        muestras = nulos.ravel()
+        centro = muestras.mean()
+        if cola == 'ambas':
+            muestras, observado = np.abs(muestras - centro), np.abs(observado - centro) - 1e-9
+        muestras = np.sort(muestras)
+        extremos = len(muestras) - np.searchsorted(muestras, observado, side='left')
+        return (extremos + 1) / (len(muestras) + 1)
+    if cola == 'ambas':
+        centro = nulos.mean(axis=0)
+        extremos = (np.abs(nulos - centro) >= np.abs(observado - centro) - 1e-9).sum(axis=0)
+    else:
+        extremos = (nulos >= observado).sum(axis=0)
+    return (extremos + 1) / (len(nulos) + 1)
+
+
+FAMILIAS = {
+    # clave: (cola del contraste, nula conjunta, descripción)
+    'frecuencia_numeros': ('ambas', True, "Frecuencia de cada número"),
+    'frecuencia_estrellas': ('ambas', False, "Frecuencia de cada estrella"),
+    'pares': ('superior', True, "Veces que sale cada par de números"),
+    'hueco_actual': ('superior', True, "Sorteos desde la última aparición"),
+    'hueco_maximo': ('superior', True, "Mayor racha sin salir"),
+}
+
+
+def _etiquetas(familia):
+    if familia == 'pares':
+        return [f"{a + 1}-{b + 1}" for a, b in zip(_PAR_I, _PAR_J)]
+    if familia == 'frecuencia_estrellas':
+        return [str(e) for e in range(1, 13)]
+    return [str(n) for n in range(1, 51)]
+
+
+def analizar_significancia(nums, estrellas, fechas=None, n_simulaciones=SIMULACIONES, alfa=ALFA, semilla=0,
+                           procesos=None):
+    """Contrasta el histórico frente a históricos uniformes simulados.
+
+    Las simulaciones respetan las estrellas en juego en cada fecha (sin
+    fechas se suponen 12). Devuelve {familia: DataFrame} con el valor
+    observado, la media nula, el p-valor, el q-valor (Benjamini-Hochberg
+    dentro de cada familia) y si la desviación es significativa al nivel alfa.
+    """
+    en_juego = estrellas_en_juego(fechas) if fechas is not None else np.full(len(nums), 12, dtype=np.int64)
+    observado = estadisticos(nums, estrellas)
+    nulos = simular_nulos(en_juego, n_simulaciones, semilla, procesos)
+    resultado = {}
+    for familia, (cola, conjunta, _) in FAMILIAS.items():
+        p = p_valores(observado[familia], nulos[familia], cola, conjunta)
+        q = benjamini_hochberg(p)
+        esperado = nulos[familia].mean() if conjunta else nulos[familia].mean(axis=0)
+        resultado[familia] = pd.DataFrame({
+            'elemento': _etiquetas(familia),
+            'observado': observado[familia],
+            'esperado': np.round(np.broadcast_to(esperado, observado[familia].shape).astype(float), 2),
+            'p_valor': np.round(p, 4),
+            'q_valor': np.round(q, 4),
+            'significativo': q < alfa,
+            'direccion': np.where(observado[familia] > esperado, 'alto', 'bajo'),
+        })
+    return resultado
+
+
+def inusuales(resultado):
+    """Solo los elementos con desviación significativa, de todas las familias"""
+    filas = [
+        df[df['significativo']].assign(familia=FAMILIAS[familia][2])
+        for familia, df in resultado.items()
+    ]
+    filas = [f for f in filas if len(f)]
+    if not filas:
+        return pd.DataFrame(columns=['familia', 'elemento', 'observado', 'esperado', 'p_valor', 'q_valor', 'direccion'])
+    return pd.concat(filas, ignore_index=True)[['familia', 'elemento', 'observado', 'esperado', 'p_valor', 'q_valor', 'direccion']]
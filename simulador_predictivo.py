@@ -3,6 +3,7 @@ import numpy as np
 import re
 from collections import defaultdict, Counter
 from itertools import combinations
+from estadisticas import FilasCrecientes
 
 class PredictorCombinaciones:
     """Clase para análisis predictivo de combinaciones de lotería"""
@@ -11,6 +12,34 @@ class PredictorCombinaciones:
         self.datos = self._procesar_datos(datos_historicos)
         self._precalcular_estadisticas()
     
+    @classmethod
+    def desde_sorteos(cls, nums, estrellas):
+        """Crea el predictor a partir de matrices de sorteos (n, 5) y (n, 2) ya leídas"""
+        predictor = object.__new__(cls)
+        predictor.datos = pd.DataFrame({
+            'numeros': np.sort(np.asarray(nums), axis=1).tolist(),
+            'estrellas': np.sort(np.asarray(estrellas), axis=1).tolist()
+        })
+        predictor._precalcular_estadisticas()
+        return predictor
+
+    @property
+    def datos(self):
+        """Sorteos (numeros, estrellas) como DataFrame; los añadidos con con_sorteo se unen al pedirlo"""
+        datos, pendientes = self._sorteos
+        if pendientes is not None:
+            filas = []
+            while pendientes is not None:
+                (nums, estrellas), pendientes = pendientes
+                filas.append({'numeros': nums, 'estrellas': estrellas})
+            datos = pd.concat([datos, pd.DataFrame(filas[::-1])], ignore_index=True)
+            self._sorteos = (datos, None)
+        return datos
+
+    @datos.setter
+    def datos(self, datos):
+        self._sorteos = (datos, None)
+
     def _procesar_datos(self, lineas):
         """Procesa datos históricos en bruto"""
         procesados = []
@@ -70,6 +99,88 @@ class PredictorCombinaciones:
             'pares_riesgo': self._buscar_pares_comunes(nums)
         }
     
+    def analizar_lote(self, nums, estrellas, bloque=20000):
+        """Versión vectorizada de analizar_combinacion para matrices (n, 5) y (n, 2)"""
+        nums = np.asarray(nums, dtype=np.int64)
+        estrellas = np.asarray(estrellas, dtype=np.int64)
+        freq_nums, freq_est, matriz_pares, conjuntos = self._tablas_lote()
+
+        max_freq = max(self.frecuencia_numeros.values())
+        fuerza = (freq_nums[nums].mean(axis=1) * 0.7 + freq_est[estrellas].mean(axis=1) * 0.3) * 100 / max_freq
+
+        # Similitud: máximo solapamiento con un sorteo, como producto de matrices 0/1
+        valores = np.zeros((len(nums), 51), dtype=np.float32)
+        filas = np.arange(len(nums))[:, None]
+        valores[filas, nums] = 1
+        valores[filas, estrellas] = 1
+        similitud = np.zeros(len(nums))
+        # Acota el producto intermedio (bloque × sorteos) a ~256 MB con históricos grandes
+        bloque = max(1, min(bloque, 2 ** 26 // max(len(conjuntos), 1)))
+        for ini in range(0, len(nums), bloque):
+            similitud[ini:ini + bloque] = (valores[ini:ini + bloque] @ conjuntos.T).max(axis=1, initial=0)
+
+        i, j = np.triu_indices(5, k=1)
+        conteo_pares = matriz_pares[nums[:, i], nums[:, j]]
+        media = np.mean(list(self.frecuencia_numeros.values()))
+        return pd.DataFrame({
+            'fuerza': np.round(fuerza, 2),
+            'similitud_parcial': np.round(similitud / 7 * 100, 2),
+            'comunes': (freq_nums[nums] > media).sum(axis=1),
+            'pares_riesgo': (conteo_pares > 1).sum(axis=1),
+            'max_par': conteo_pares.max(axis=1),
+        })
+
+    def _tablas_lote(self):
+        """Tablas densas (frecuencias, pares, sorteos 0/1) para el análisis por lotes"""
+        if not hasattr(self, '_tablas'):
+            freq_nums = np.zeros(51)
+            for n, f in self.frecuencia_numeros.items():
+                freq_nums[n] = f
+            freq_est = np.zeros(51)
+            for e, f in self.frecuencia_estrellas.items():
+                freq_est[e] = f
+            matriz_pares = np.zeros((51, 51), dtype=np.int32)
+            for (a, b), veces in self.pares_comunes.items():
+                matriz_pares[a, b] = matriz_pares[b, a] = veces
+            conjuntos = np.zeros((len(self.datos), 51), dtype=np.float32)
+            for fila, (numeros, estrellas) in enumerate(zip(self.datos['numeros'], self.datos['estrellas'])):
+                conjuntos[fila, numeros + estrellas] = 1
+            self._tablas = (freq_nums, freq_est, matriz_pares, conjuntos)
+            self._conjuntos = FilasCrecientes(conjuntos)
+        return self._tablas
+
+    def con_sorteo(self, nums, estrellas):
+        """Copia del predictor con un sorteo más, actualizando las métricas sin recalcularlas.
+
+        Nada se copia entero: el sorteo queda pendiente hasta que alguien pida
+        datos y la matriz de sorteos crece en su búfer.
+        """
+        nums, estrellas = sorted(nums), sorted(estrellas)
+        nuevo = object.__new__(PredictorCombinaciones)
+        datos, pendientes = self._sorteos
+        nuevo._sorteos = (datos, ((nums, estrellas), pendientes))
+        nuevo.frecuencia_numeros = dict(self.frecuencia_numeros)
+        for n in nums:
+            nuevo.frecuencia_numeros[n] = nuevo.frecuencia_numeros.get(n, 0) + 1
+        nuevo.frecuencia_estrellas = dict(self.frecuencia_estrellas)
+        for e in estrellas:
+            nuevo.frecuencia_estrellas[e] = nuevo.frecuencia_estrellas.get(e, 0) + 1
+        nuevo.pares_comunes = defaultdict(int, self.pares_comunes)
+        for combo in combinations(nums + estrellas, 2):
+            nuevo.pares_comunes[tuple(sorted(combo))] += 1
+
+        if hasattr(self, '_tablas'):
+            freq_nums, freq_est, matriz_pares = (t.copy() for t in self._tablas[:3])
+            freq_nums[nums] += 1
+            freq_est[estrellas] += 1
+            for a, b in combinations(nums + estrellas, 2):
+                matriz_pares[a, b] = matriz_pares[b, a] = nuevo.pares_comunes[tuple(sorted((a, b)))]
+            fila = np.zeros((1, 51), dtype=np.float32)
+            fila[0, nums + estrellas] = 1
+            nuevo._conjuntos, conjuntos = self._conjuntos.anexar(len(self._tablas[3]), fila)
+            nuevo._tablas = (freq_nums, freq_est, matriz_pares, conjuntos)
+        return nuevo
+
     def _calcular_fuerza(self, nums, estrellas):
         """Calcula puntuación de fuerza predictiva (0-100)"""
         freq_nums = [self.frecuencia_numeros.get(n, 0) for n in nums]
@@ -80,11 +191,10 @@ class PredictorCombinaciones:
     
     def _calcular_similitud(self, combinacion):
         """Calcula porcentaje de similitud histórica"""
-        max_coincidencias = 0
-        for _, fila in self.datos.iterrows():
-            coincidencias = len(set(combinacion) & set(fila['numeros'] + fila['estrellas']))
-            if coincidencias > max_coincidencias:
-                max_coincidencias = coincidencias
+        conjuntos = self._tablas_lote()[3]
+        valores = np.zeros(51, dtype=np.float32)
+        valores[list(combinacion)] = 1
+        max_coincidencias = int((conjuntos @ valores).max(initial=0))
         return round((max_coincidencias / 7) * 100, 2)  # 5 números + 2 estrellas
     
     def _clasificar_numeros(self, nums):
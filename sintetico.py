@@ -0,0 +1,128 @@
+import argparse
+import math
+import os
+from datetime import date
+import numpy as np
+from historico import ARCHIVO_BINARIO
+from registro_sorteos import ARCHIVOS_TEXTO, REGISTRO, BLOQUE, exportar_texto, guardar_registro
+
+# ============================================
+# 🧪 Históricos sintéticos para pruebas de escala
+# ============================================
+# Los sorteos salen de un muestreo sin reemplazo con pesos (Gumbel top-k): con
+# pesos iguales es uniforme; los números "calientes" multiplican su peso y los
+# pares inyectados se fuerzan en una fracción de los sorteos.
+
+INICIO = date(2004, 2, 13)  # primer sorteo real de Euromillones
+FECHA_MAXIMA = date(2262, 1, 1)  # límite de datetime64[ns], que usan las fechas del histórico cargado
+DIAS_SORTEO = (1, 4)  # martes y viernes
+FORMATOS = ('bin', *ARCHIVOS_TEXTO)
+
+
+def fechas_sorteo(n, inicio=INICIO, dias=DIAS_SORTEO):
+    """Días (desde 1970-01-01) de n sorteos en los días de la semana dados a partir de inicio.
+
+    Si no caben uno por fecha antes de FECHA_MAXIMA, se reparten varios
+    sorteos por fecha (como harían juegos con más de una extracción diaria).
+    """
+    semanas = (FECHA_MAXIMA - inicio).days // 7
+    disponibles = np.arange(inicio.toordinal(), inicio.toordinal() + semanas * 7)
+    disponibles = disponibles[np.isin(disponibles % 7, [(d + 1) % 7 for d in dias])]  # toordinal: lunes = 1
+    if not len(disponibles):
+        raise ValueError("No hay fechas de sorteo entre el inicio y la fecha máxima")
+    por_fecha = max(1, math.ceil(n / len(disponibles)))
+    return np.repeat(disponibles, por_fecha)[:n] - date(1970, 1, 1).toordinal()
+
+
+def _pesos(total, calientes, peso):
+    pesos = np.ones(total)
+    for valor in calientes:
+        if not 1 <= valor <= total:
+            raise ValueError(f"{valor} está fuera de 1-{total}")
+        pesos[valor - 1] = peso
+    return np.log(pesos)
+
+
+def _muestrear(rng, log_pesos, k, forzados):
+    """Valores 1..len(log_pesos) sin reemplazo, k por fila; forzados (n, total) bool entra siempre"""
+    claves = log_pesos - np.log(-np.log(rng.random((len(forzados), len(log_pesos)))))
+    claves[forzados] = np.inf
+    return np.sort(np.argpartition(-claves, k - 1, axis=1)[:, :k] + 1, axis=1)
+
+
+def generar_sorteos(n, semilla=0, calientes=(), peso_caliente=2.0, estrellas_calientes=(), pares=(), prob_par=0.0,
+                    inicio=INICIO, dias=DIAS_SORTEO):
+    """Registros (dtype REGISTRO, orden cronológico) de n sorteos sintéticos.
+
+    calientes / estrellas_calientes multiplican por peso_caliente la
+    probabilidad de esos valores; con prob_par, cada sorteo incluye uno de los
+    pares (a, b) dados, elegido al azar.
+    """
+    if n < 0:
+        raise ValueError("El número de sorteos no puede ser negativo")
+    rng = np.random.default_rng(semilla)
+    log_numeros = _pesos(50, calientes, peso_caliente)
+    log_estrellas = _pesos(12, estrellas_calientes, peso_caliente)
+    pares = np.array([sorted(p) for p in pares], dtype=np.int64).reshape(-1, 2)
+    if len(pares) and (((pares < 1) | (pares > 50)).any() or (pares[:, 0] == pares[:, 1]).any()):
+        raise ValueError("Los pares deben ser dos números distintos entre 1 y 50")
+
+    registros = np.zeros(n, dtype=REGISTRO)
+    registros['dias'] = fechas_sorteo(n, inicio, dias)
+    for ini in range(0, n, BLOQUE):
+        m = min(BLOQUE, n - ini)
+        forzados = np.zeros((m, 50), dtype=bool)
+        if len(pares) and prob_par > 0:
+            filas = np.flatnonzero(rng.random(m) < prob_par)
+            elegidos = pares[rng.integers(0, len(pares), len(filas))]
+            forzados[filas[:, None], elegidos - 1] = True
+        registros['numeros'][ini:ini + m] = _muestrear(rng, log_numeros, 5, forzados)
+        registros['estrellas'][ini:ini + m] = _muestrear(rng, log_estrellas, 2, np.zeros((m, 12), dtype=bool))
+    return registros
+
+
+def escribir_historico(registros, directorio, formatos=FORMATOS):
+    """Escribe los registros en el registro binario y en los formatos de texto pedidos; devuelve las rutas"""
+    os.makedirs(directorio, exist_ok=True)
+    rutas = []
+    for formato in formatos:
+        if formato == 'bin':
+            rutas.append(os.path.join(directorio, ARCHIVO_BINARIO))
+            guardar_registro(registros, rutas[-1])
+        else:
+            rutas.append(exportar_texto(formato, os.path.join(directorio, ARCHIVOS_TEXTO[formato]), registros))
+    return rutas
+
+
+def _lista(texto, separador=','):
+    return [int(x) for x in texto.split(separador) if x.strip()] if texto else []
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Genera históricos sintéticos de Euromillones")
+    parser.add_argument('sorteos', type=int)
+    parser.add_argument('--directorio', required=True)
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--formatos', default=",".join(FORMATOS), help=f"de {', '.join(FORMATOS)}")
+    parser.add_argument('--calientes', help="números con más probabilidad, p. ej. 7,23,44")
+    parser.add_argument('--estrellas-calientes')
+    parser.add_argument('--peso', type=float, default=2.0, help="multiplicador de probabilidad de los calientes")
+    parser.add_argument('--pares', help="pares inyectados, p. ej. 7-23,12-40")
+    parser.add_argument('--prob-par', type=float, default=0.0, help="fracción de sorteos con un par inyectado")
+    args = parser.parse_args(argumentos)
+
+    formatos = [f.strip() for f in args.formatos.split(',') if f.strip()]
+    desconocidos = set(formatos) - set(FORMATOS)
+    if desconocidos:
+        parser.error(f"Formatos desconocidos: {', '.join(sorted(desconocidos))}")
+    registros = generar_sorteos(
+        args.sorteos, args.semilla, _lista(args.calientes), args.peso, _lista(args.estrellas_calientes),
+        [_lista(par, '-') for par in (args.pares or "").split(',') if par.strip()], args.prob_par
+    )
+    for ruta in escribir_historico(registros, args.directorio, formatos):
+        print(f"Escrito {ruta}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,256 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from metricas import obtener_metricas
+
+logger = logging.getLogger(__name__)
+
+PROCESOS = int(os.environ.get('ELOTTOIA_PROCESOS', "0")) or max((os.cpu_count() or 1) - 1, 1)
+MAX_COLA = int(os.environ.get('ELOTTOIA_MAX_COLA', "16"))
+MAX_POR_SESION = 2
+TIEMPO_MAXIMO = 300.0
+MAX_RESULTADOS = 64
+PRIORIDAD_TRABAJADORES = 10  # nice: las sesiones interactivas tienen preferencia sobre los trabajos pesados
+
+EN_COLA, EJECUTANDO, TERMINADA, FALLIDA, AGOTADA = "en cola", "ejecutando", "terminada", "error", "tiempo agotado"
+
+
+class TareaRechazada(Exception):
+    """La tarea no se admite: cola llena o demasiadas tareas de la misma sesión"""
+
+
+class Tarea:
+    def __init__(self, clave, funcion, args, sesion):
+        self.clave = clave
+        self.funcion = funcion
+        self.args = args
+        self.sesion = sesion
+        self.estado = EN_COLA
+        self.resultado = None
+        self.error = None
+        self.creada = time.monotonic()
+        self.inicio = None
+        self.fin = None
+        self.hecha = threading.Event()
+
+    @property
+    def activa(self):
+        return self.estado in (EN_COLA, EJECUTANDO)
+
+    def posicion(self, pool):
+        return pool.posicion(self)
+
+
+def _iniciar_trabajador():
+    try:
+        os.nice(PRIORIDAD_TRABAJADORES)
+    except (AttributeError, OSError):
+        pass
+
+
+class PoolTareas:
+    """Pool de procesos acotado y compartido por todas las sesiones para el trabajo pesado.
+
+    Las tareas esperan en una cola propia y solo se entregan al pool cuando hay
+    un proceso libre, así que el estado (en cola / ejecutando) es exacto. La
+    admisión rechaza tareas si la cola está llena o la sesión ya tiene
+    `max_por_sesion` activas; dos peticiones con la misma clave comparten
+    tarea, y los resultados se guardan por clave (LRU). Una tarea que supera
+    su tiempo se da por perdida y se reinician los procesos del pool.
+    Si no se pueden crear procesos se usan hilos con los mismos límites.
+    """
+
+    def __init__(self, procesos=PROCESOS, max_cola=MAX_COLA, max_por_sesion=MAX_POR_SESION,
+                 tiempo_maximo=TIEMPO_MAXIMO, max_resultados=MAX_RESULTADOS):
+        self.procesos = procesos
+        self.max_cola = max_cola
+        self.max_por_sesion = max_por_sesion
+        self.tiempo_maximo = tiempo_maximo
+        self.max_resultados = max_resultados
+        self._lock = threading.RLock()
+        self._cola = deque()
+        self._activas = {}  # clave -> Tarea (en cola o ejecutando)
+        self._resultados = OrderedDict()
+        self._ejecutor = None
+        self._futuros = {}
+        self.estadisticas = {'admitidas': 0, 'rechazadas': 0, 'aciertos_cache': 0, 'agotadas': 0, 'fallidas': 0}
+
+    def _crear_ejecutor(self):
+        try:
+            contexto = multiprocessing.get_context("spawn")
+            return ProcessPoolExecutor(max_workers=self.procesos, mp_context=contexto, initializer=_iniciar_trabajador)
+        except (OSError, ValueError):
+            logger.warning("No se pudo crear el pool de procesos; se usan hilos")
+            return ThreadPoolExecutor(max_workers=self.procesos, thread_name_prefix="tarea-pesada")
+
+    # ---------- envío y admisión ----------
+
+    def enviar(self, clave, funcion, *args, sesion=None):
+        """Encola funcion(*args) bajo `clave` y devuelve la Tarea (ya terminada si el resultado estaba guardado)"""
+        with self._lock:
+            self._vigilar()
+            if clave in self._resultados:
+                self._resultados.move_to_end(clave)
+                self.estadisticas['aciertos_cache'] += 1
+                obtener_metricas().contar_cache('pool_resultados', True)
+                return self._resultados[clave]
+            if clave in self._activas:
+                return self._activas[clave]
+            if len(self._cola) >= self.max_cola:
+                self.estadisticas['rechazadas'] += 1
+                raise TareaRechazada(f"Hay {len(self._cola)} tareas en espera; inténtalo en unos segundos.")
+            if sesion is not None and sum(t.sesion == sesion for t in self._activas.values()) >= self.max_por_sesion:
+                self.estadisticas['rechazadas'] += 1
+                raise TareaRechazada(f"Ya tienes {self.max_por_sesion} análisis en marcha; espera a que terminen.")
+            tarea = Tarea(clave, funcion, args, sesion)
+            self._activas[clave] = tarea
+            self._cola.append(tarea)
+            self.estadisticas['admitidas'] += 1
+            obtener_metricas().contar_cache('pool_resultados', False)
+            self._despachar()
+            return tarea
+
+    def _despachar(self):
+        ejecutando = len(self._futuros)
+        while self._cola and ejecutando < self.procesos:
+            tarea = self._cola.popleft()
+            if self._ejecutor is None:
+                self._ejecutor = self._crear_ejecutor()
+            try:
+                futuro = self._ejecutor.submit(tarea.funcion, *tarea.args)
+            except (BrokenProcessPool, RuntimeError):
+                self._ejecutor = self._crear_ejecutor()
+                futuro = self._ejecutor.submit(tarea.funcion, *tarea.args)
+            tarea.estado, tarea.inicio = EJECUTANDO, time.monotonic()
+            self._futuros[futuro] = tarea
+            futuro.add_done_callback(self._al_terminar)
+            ejecutando += 1
+
+    def _al_terminar(self, futuro):
+        with self._lock:
+            tarea = self._futuros.pop(futuro, None)
+            if tarea is None or tarea.estado != EJECUTANDO:
+                self._despachar()
+                return
+            tarea.fin = time.monotonic()
+            try:
+                tarea.resultado = futuro.result()
+                tarea.estado = TERMINADA
+                self._resultados[tarea.clave] = tarea
+                while len(self._resultados) > self.max_resultados:
+                    self._resultados.popitem(last=False)
+            except Exception as e:
+                tarea.estado, tarea.error = FALLIDA, e
+                self.estadisticas['fallidas'] += 1
+                logger.warning("Tarea %s fallida: %s", tarea.clave, e)
+            self._activas.pop(tarea.clave, None)
+            tarea.hecha.set()
+            self._despachar()
+
+    def _vigilar(self):
+        """Da por perdidas las tareas que superan el tiempo máximo y reinicia los procesos"""
+        ahora = time.monotonic()
+        agotadas = [t for t in self._futuros.values() if ahora - t.inicio > self.tiempo_maximo]
+        if not agotadas:
+            return
+        for tarea in agotadas:
+            tarea.estado, tarea.fin = AGOTADA, ahora
+            tarea.error = TimeoutError(f"La tarea superó {self.tiempo_maximo:.0f} s")
+            self._activas.pop(tarea.clave, None)
+            tarea.hecha.set()
+            self.estadisticas['agotadas'] += 1
+        # Las demás tareas en ejecución vuelven a la cola y se relanzan en procesos nuevos
+        for tarea in self._futuros.values():
+            if tarea.estado == EJECUTANDO:
+                tarea.estado = EN_COLA
+                self._cola.appendleft(tarea)
+        self._futuros = {}
+        ejecutor, self._ejecutor = self._ejecutor, None
+        for proceso in list(getattr(ejecutor, '_processes', {}).values()):
+            proceso.terminate()
+        ejecutor.shutdown(wait=False, cancel_futures=True)
+        self._despachar()
+
+    # ---------- espera y estado ----------
+
+    def esperar(self, tarea, segundos):
+        """Espera hasta `segundos` a que termine; devuelve True si ya no está activa"""
+        fin = time.monotonic() + segundos
+        while tarea.activa and time.monotonic() < fin:
+            tarea.hecha.wait(min(0.5, max(fin - time.monotonic(), 0)))
+            with self._lock:
+                self._vigilar()
+        return not tarea.activa
+
+    def posicion(self, tarea):
+        """Puesto en la cola (1 = la siguiente) o 0 si no está en cola"""
+        with self._lock:
+            for i, t in enumerate(self._cola, 1):
+                if t is tarea:
+                    return i
+        return 0
+
+    def resumen(self):
+        with self._lock:
+            return {
+                'procesos': self.procesos,
+                'ejecutando': len(self._futuros),
+                'en_cola': len(self._cola),
+                'resultados_guardados': len(self._resultados),
+                **self.estadisticas,
+            }
+
+    def metricas(self):
+        """Familias de métricas del pool para el registro de métricas (se evalúan al exponer)"""
+        resumen = self.resumen()
+        return [
+            ('elottoia_pool_tareas_total', 'counter', "Tareas del pool por resultado de la admisión o la ejecución",
+             [({'resultado': clave}, resumen[clave]) for clave in self.estadisticas]),
+            ('elottoia_pool_ejecutando', 'gauge', "Tareas pesadas en ejecución", [({}, resumen['ejecutando'])]),
+            ('elottoia_pool_en_cola', 'gauge', "Tareas pesadas esperando un proceso", [({}, resumen['en_cola'])]),
+        ]
+
+    def cerrar(self):
+        with self._lock:
+            if self._ejecutor is not None:
+                self._ejecutor.shutdown(wait=False, cancel_futures=True)
+                self._ejecutor = None
+
+
+# ============================================
+# 🧮 Trabajos pesados (funciones de módulo: se ejecutan en otro proceso)
+# ============================================
+
+def mapa_calor_png(tabla, titulo):
+    """PNG del mapa de calor de una tabla de apariciones (matplotlib + seaborn)"""
+    import io
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    fig, ax = plt.subplots(figsize=(14, 10))
+    sns.heatmap(tabla, annot=True, fmt='d', cmap='Blues', ax=ax)
+    ax.set_title(titulo)
+    salida = io.BytesIO()
+    fig.savefig(salida, format='png', bbox_inches='tight')
+    plt.close(fig)
+    return salida.getvalue()
+
+
+_pool = None
+_lock_pool = threading.Lock()
+
+
+def obtener_pool():
+    """Pool de tareas único por proceso (compartido por todas las sesiones)"""
+    global _pool
+    with _lock_pool:
+        if _pool is None:
+            _pool = PoolTareas()
+            obtener_metricas().colector('pool', _pool.metricas)
+        return _pool
@@ -0,0 +1,347 @@
+import argparse
+import copy
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from boletos import mascaras_boletos
+from estadisticas import EstadisticasIncrementales, FilasCrecientes
+from historico import (
+    ARCHIVO_BINARIO, ARCHIVO_CONVERTIDO, ARCHIVO_CSV, ARCHIVO_MENSUAL, ARCHIVOS_HISTORICO,
+    agregar_sorteo, cargar_sorteos, linea_convertido, linea_csv
+)
+from metricas import obtener_metricas
+from registro_sorteos import cargar_registro, convertir_a_registro, sorteos_de_registro
+from simulador_predictivo import PredictorCombinaciones
+
+logger = logging.getLogger(__name__)
+
+_bytes_leidos = obtener_metricas().contador(
+    'elottoia_lectura_bytes_total', "Bytes leídos de los archivos del histórico", ('archivo', 'motivo'))
+_recargas = obtener_metricas().histograma(
+    'elottoia_recarga_historico_segundos', "Duración de la reconstrucción completa de los datos del histórico")
+
+# Arrays por sorteo que con_sorteo amplía sin copiarlos (vistas de un FilasCrecientes)
+_POR_SORTEO = ('fechas', 'numeros', 'estrellas', 'mascaras', 'lineas_convertido')
+
+
+def huella(ruta):
+    """(mtime, tamaño, sha1) de un archivo, o None si no existe"""
+    try:
+        info = os.stat(ruta)
+        with open(ruta, "rb") as f:
+            contenido = f.read()
+    except FileNotFoundError:
+        return None
+    _bytes_leidos.inc(os.path.basename(ruta), 'huella', cantidad=len(contenido))
+    resumen = hashlib.sha1(contenido).hexdigest()
+    return info.st_mtime_ns, info.st_size, resumen
+
+
+class EstadoDatos:
+    """Instantánea de solo lectura de todo lo derivado de los archivos de histórico.
+
+    Se construye entera antes de publicarse, así que una sesión nunca ve una
+    mezcla de datos viejos y nuevos.
+    """
+
+    def __init__(self, directorio=".", version=0, huellas=None):
+        inicio = time.perf_counter()
+        self.version = version
+        self.directorio = directorio
+        self.huellas = huellas if huellas is not None else {
+            nombre: huella(os.path.join(directorio, nombre)) for nombre in ARCHIVOS_HISTORICO
+        }
+
+        ruta_csv = os.path.join(directorio, ARCHIVO_CSV)
+        if self.huellas.get(ARCHIVO_BINARIO) is not None:
+            # El registro binario es la fuente canónica cuando existe
+            registros = cargar_registro(os.path.join(directorio, ARCHIVO_BINARIO), verificar=True)
+            self._leido(ARCHIVO_BINARIO)
+            self.fechas, self.numeros, self.estrellas = sorteos_de_registro(registros)
+        elif self.huellas[ARCHIVO_CSV] is not None:
+            self.fechas, self.numeros, self.estrellas = cargar_sorteos(ruta_csv)
+            self._leido(ARCHIVO_CSV)
+        else:
+            self.fechas = np.empty(0, dtype='datetime64[ns]')
+            self.numeros, self.estrellas = np.empty((0, 5), np.int8), np.empty((0, 2), np.int8)
+        self.mascaras = mascaras_boletos(self.numeros, self.estrellas)
+        self.estadisticas = EstadisticasIncrementales(self.fechas, self.numeros, self.estrellas)
+        self.frecuencia_numeros = self.estadisticas.ranking("numeros")
+        self.frecuencia_estrellas = self.estadisticas.ranking("estrellas")
+
+        self.lineas_convertido = np.empty(0, dtype=object)
+        if self.huellas[ARCHIVO_CONVERTIDO] is not None:
+            with open(os.path.join(directorio, ARCHIVO_CONVERTIDO), "r", encoding="utf-8") as f:
+                self.lineas_convertido = np.array(f.readlines(), dtype=object)
+            self._leido(ARCHIVO_CONVERTIDO)
+        self._crecientes = {nombre: FilasCrecientes(getattr(self, nombre)) for nombre in _POR_SORTEO}
+
+        self.predictor = None
+        if self.huellas.get(ARCHIVO_BINARIO) is not None:
+            self.predictor = PredictorCombinaciones.desde_sorteos(self.numeros, self.estrellas)
+        elif self.huellas[ARCHIVO_MENSUAL] is not None:
+            with open(os.path.join(directorio, ARCHIVO_MENSUAL), "r", encoding="utf-8") as f:
+                self.predictor = PredictorCombinaciones(f.readlines())
+            self._leido(ARCHIVO_MENSUAL)
+        _recargas.observar(time.perf_counter() - inicio)
+
+    def _leido(self, nombre, veces=1):
+        _bytes_leidos.inc(nombre, 'carga', cantidad=self.huellas[nombre][1] * veces)
+
+    def con_sorteo(self, fecha, nums, estrellas, version, huellas):
+        """Nueva instantánea con un sorteo más, derivada de esta sin releer los archivos.
+
+        No depende del tamaño del histórico: los arrays por sorteo crecen en su
+        búfer y las frecuencias se ordenan desde los 62 contadores incrementales.
+        """
+        nuevo = copy.copy(self)
+        nuevo.version = version
+        nuevo.huellas = huellas
+        nuevo._crecientes = dict(self._crecientes)
+        filas = {
+            'fechas': [np.datetime64(fecha, 'ns')],
+            'numeros': [nums],
+            'estrellas': [estrellas],
+            'mascaras': mascaras_boletos([nums], [estrellas]),
+            'lineas_convertido': [linea_convertido(fecha, nums, estrellas) + "\n"],
+        }
+        for nombre in _POR_SORTEO:
+            nuevo._crecientes[nombre], vista = self._crecientes[nombre].anexar(len(getattr(self, nombre)), filas[nombre])
+            setattr(nuevo, nombre, vista)
+        nuevo.estadisticas = self.estadisticas.copia()
+        nuevo.estadisticas.agregar(fecha, nums, estrellas)
+        nuevo.frecuencia_numeros = nuevo.estadisticas.ranking("numeros")
+        nuevo.frecuencia_estrellas = nuevo.estadisticas.ranking("estrellas")
+        if self.predictor is not None:
+            nuevo.predictor = self.predictor.con_sorteo(nums, estrellas)
+        return nuevo
+
+    def diferencias(self, otro):
+        """Nombres de lo derivado del histórico que no coincide con otra instantánea (vacío si son iguales)"""
+        distintas = [
+            nombre for nombre in _POR_SORTEO
+            if not np.array_equal(getattr(self, nombre), getattr(otro, nombre))
+        ]
+        distintas += [
+            nombre for nombre in ('frecuencia_numeros', 'frecuencia_estrellas')
+            if not getattr(self, nombre).equals(getattr(otro, nombre))  # compara también el orden del índice
+        ]
+        for tipo in ("numeros", "estrellas"):
+            if not self.estadisticas.frecuencias(tipo).equals(otro.estadisticas.frecuencias(tipo)):
+                distintas.append(f"estadisticas.frecuencias[{tipo}]")
+            if not self.estadisticas.huecos(tipo).equals(otro.estadisticas.huecos(tipo)):
+                distintas.append(f"estadisticas.huecos[{tipo}]")
+        return distintas
+
+    def frecuentes(self, top_n=15, tipo="numeros"):
+        """Los top_n números (o estrellas) más frecuentes"""
+        frecuencia = self.frecuencia_numeros if tipo == "numeros" else self.frecuencia_estrellas
+        return frecuencia.head(top_n).index.tolist()
+
+
+class VigilanteHistorico:
+    """Vigila los archivos de histórico y reconstruye los datos cuando cambian.
+
+    La reconstrucción se hace en un hilo en segundo plano y el nuevo
+    EstadoDatos se publica con una única asignación de referencia; las
+    sesiones siguen leyendo la instantánea anterior mientras tanto.
+    """
+
+    def __init__(self, directorio=".", intervalo=5.0, iniciar=True):
+        self.directorio = directorio
+        self.intervalo = intervalo
+        self._estado = EstadoDatos(directorio)
+        self._lock_reconstruccion = threading.Lock()
+        self._parar = threading.Event()
+        self._hilo = None
+        if iniciar:
+            self.iniciar()
+
+    def actual(self):
+        return self._estado
+
+    def huellas(self):
+        return {nombre: huella(os.path.join(self.directorio, nombre)) for nombre in ARCHIVOS_HISTORICO}
+
+    def _sincronizar_registro(self, huellas):
+        """Regenera sorteos.bin desde el CSV si el CSV ha cambiado por fuera y el registro no.
+
+        El registro es lo que se carga, así que sin esto una edición a mano del
+        CSV cambiaría la versión pero seguiría sirviendo los sorteos anteriores.
+        Solo el CSV coincide sorteo a sorteo con el registro; los .txt no se
+        usan como origen. Devuelve las huellas tras la regeneración.
+        """
+        anteriores = self._estado.huellas
+        if (huellas.get(ARCHIVO_BINARIO) is None or huellas[ARCHIVO_CSV] is None
+                or huellas[ARCHIVO_BINARIO] != anteriores.get(ARCHIVO_BINARIO)
+                or huellas[ARCHIVO_CSV] == anteriores.get(ARCHIVO_CSV)):
+            return huellas
+        n = convertir_a_registro(
+            'csv', os.path.join(self.directorio, ARCHIVO_CSV), os.path.join(self.directorio, ARCHIVO_BINARIO))
+        logger.info("%s regenerado desde %s (%s sorteos)", ARCHIVO_BINARIO, ARCHIVO_CSV, n)
+        return self.huellas()
+
+    def comprobar(self):
+        """Reconstruye si alguna huella ha cambiado; devuelve True si se publicó una nueva versión"""
+        with self._lock_reconstruccion:
+            huellas = self.huellas()
+            if huellas == self._estado.huellas:
+                return False
+            try:
+                huellas = self._sincronizar_registro(huellas)
+                nuevo = EstadoDatos(self.directorio, self._estado.version + 1, huellas)
+            except Exception:
+                logger.exception("No se pudo recargar el histórico; se mantienen los datos actuales")
+                return False
+            self._estado = nuevo
+            logger.info("Histórico recargado (versión %s)", nuevo.version)
+            return True
+
+    def agregar_sorteo(self, fecha, nums, estrellas):
+        """Registra un sorteo en los archivos y publica la nueva versión de forma incremental.
+
+        Si los archivos ya habían cambiado por fuera, se hace la recarga completa
+        en lugar de derivar la instantánea de una versión desactualizada.
+        """
+        with self._lock_reconstruccion:
+            huellas = self.huellas()
+            al_dia = huellas == self._estado.huellas
+            if not al_dia:
+                self._sincronizar_registro(huellas)
+            fecha, nums, estrellas = agregar_sorteo(fecha, nums, estrellas, self.directorio)
+            huellas = self.huellas()
+            anterior = self._estado
+            if al_dia:
+                self._estado = anterior.con_sorteo(fecha, nums, estrellas, anterior.version + 1, huellas)
+            else:
+                self._estado = EstadoDatos(self.directorio, anterior.version + 1, huellas)
+            logger.info("Sorteo del %s añadido (versión %s)", fecha, self._estado.version)
+            return self._estado
+
+    def _bucle(self):
+        while not self._parar.wait(self.intervalo):
+            self.comprobar()
+
+    def iniciar(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            self._parar.clear()
+            self._hilo = threading.Thread(target=self._bucle, name="vigilante-historico", daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        self._parar.set()
+
+
+_vigilante = None
+_lock_vigilante = threading.Lock()
+
+
+def obtener_vigilante(directorio="."):
+    """Vigilante único por proceso (compartido por todas las sesiones)"""
+    global _vigilante
+    with _lock_vigilante:
+        if _vigilante is None:
+            _vigilante = VigilanteHistorico(directorio)
+        return _vigilante
+
+
+def datos_actuales():
+    return obtener_vigilante().actual()
+
+
+def _copiar_historico(origen, destino, nombres=ARCHIVOS_HISTORICO):
+    for nombre in nombres:
+        if os.path.exists(os.path.join(origen, nombre)):
+            shutil.copy2(os.path.join(origen, nombre), destino)
+
+
+def _siguiente_sorteo(fechas):
+    """Primer martes o viernes tras el último sorteo; None si cae en el futuro"""
+    fecha = (pd.Timestamp(fechas[-1]).date() if len(fechas) else date(2004, 2, 10)) + timedelta(days=1)
+    while fecha.weekday() not in (1, 4):
+        fecha += timedelta(days=1)
+    return fecha if fecha <= date.today() else None
+
+
+def _sorteo_aleatorio(rng):
+    return (rng.choice(50, 5, replace=False) + 1).tolist(), (rng.choice(12, 2, replace=False) + 1).tolist()
+
+
+def comprobar_incremental(directorio=".", sorteos=5, semilla=0):
+    """Añade sorteos aleatorios a una copia del histórico de forma incremental y compara con la recarga completa.
+
+    Devuelve [(fecha, diferencias)] por sorteo añadido; las diferencias vacías
+    indican que la instantánea incremental coincide con la reconstruida.
+    """
+    rng = np.random.default_rng(semilla)
+    resultado = []
+    with tempfile.TemporaryDirectory() as copia:
+        _copiar_historico(directorio, copia)
+        vigilante = VigilanteHistorico(copia, iniciar=False)
+        for _ in range(sorteos):
+            fecha = _siguiente_sorteo(vigilante.actual().fechas)
+            if fecha is None:
+                break
+            incremental = vigilante.agregar_sorteo(fecha, *_sorteo_aleatorio(rng))
+            completo = EstadoDatos(copia, incremental.version, incremental.huellas)
+            resultado.append((fecha, incremental.diferencias(completo)))
+    return resultado
+
+
+def comprobar_edicion_texto(directorio=".", semilla=0):
+    """Añade un sorteo a mano solo al CSV de una copia del histórico y llama a comprobar().
+
+    Devuelve lo que no coincide con una carga desde los archivos de texto
+    (vacío si la recarga recoge la edición), o None si no hay CSV o no quedan
+    fechas de sorteo libres.
+    """
+    if not os.path.exists(os.path.join(directorio, ARCHIVO_CSV)):
+        return None
+    rng = np.random.default_rng(semilla)
+    with tempfile.TemporaryDirectory() as copia, tempfile.TemporaryDirectory() as solo_texto:
+        _copiar_historico(directorio, copia)
+        vigilante = VigilanteHistorico(copia, iniciar=False)
+        fecha = _siguiente_sorteo(vigilante.actual().fechas)
+        if fecha is None:
+            return None
+        ruta_csv = os.path.join(copia, ARCHIVO_CSV)
+        with open(ruta_csv, "r", encoding="utf-8", newline="") as f:
+            contenido = f.read()
+        salto = "\r\n" if "\r\n" in contenido else "\n"
+        cabecera, _, filas = contenido.partition(salto)
+        with open(ruta_csv, "w", encoding="utf-8", newline="") as f:
+            f.write(cabecera + salto + linea_csv(fecha, *_sorteo_aleatorio(rng)) + salto + filas)
+        if not vigilante.comprobar():
+            return ['comprobar()']
+        _copiar_historico(copia, solo_texto, (ARCHIVO_CSV, ARCHIVO_CONVERTIDO))
+        return vigilante.actual().diferencias(EstadoDatos(solo_texto))
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(
+        description="Comprueba que añadir sorteos de forma incremental, o editando el CSV, equivale a recargar")
+    parser.add_argument('--directorio', default=".")
+    parser.add_argument('--sorteos', type=int, default=5)
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args(argumentos)
+
+    resultado = comprobar_incremental(args.directorio, args.sorteos, args.semilla)
+    for fecha, diferencias in resultado:
+        print(f"{fecha:%d/%m/%Y}: " + (f"❌ distinto en {', '.join(diferencias)}" if diferencias else "✅ coincide"))
+    if not resultado:
+        print("No hay fechas de sorteo libres hasta hoy tras el último sorteo")
+    edicion = comprobar_edicion_texto(args.directorio, args.semilla)
+    if edicion is not None:
+        print("Edición del CSV + comprobar(): " + (f"❌ distinto en {', '.join(edicion)}" if edicion else "✅ coincide"))
+    return 1 if any(diferencias for _, diferencias in resultado) or edicion else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())